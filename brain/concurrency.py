@@ -0,0 +1,133 @@
+"""
+Блокировки для подсистем, с которыми работают несколько потоков.
+
+Разговор (поток ввода) и сон (фоновый поток) трогают одни и те же
+эмоции и память. Вместо одной общей блокировки — своя у каждой
+подсистемы, и блокировка чтения-записи: читателей сколько угодно
+одновременно, писатель — один и без читателей.
+"""
+
+import copy
+import inspect
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+
+# Изменяемые контейнеры: наружу — копия, снятая под блокировкой
+_CONTAINERS = (list, dict, set, np.ndarray)
+
+
+class RWLock:
+    """
+    Блокировка чтения-записи с приоритетом писателя.
+    
+    Писатель может повторно брать блокировку (и читать) внутри
+    своей записи. Чтение внутри чтения не вкладывается: ждущий
+    писатель его не пропустит.
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None          # Поток, который пишет
+        self._depth = 0              # Вложенность записи
+        self._waiting_writers = 0
+    
+    @contextmanager
+    def read(self):
+        """Общая блокировка (для чтения)"""
+        if self._writer == threading.get_ident():
+            # Писатель читает своё — уже под блокировкой
+            yield
+            return
+        
+        with self._cond:
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+    
+    @contextmanager
+    def write(self):
+        """Исключительная блокировка (для записи)"""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._depth += 1
+            else:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+                self._depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+class Guarded:
+    """
+    Подсистема за блокировкой чтения-записи.
+    
+    Методы из reads идут под общей блокировкой, остальные методы
+    и присваивания атрибутов — под исключительной. Каждый вызов
+    видит подсистему целиком до или целиком после чужого изменения.
+    
+    Списки, словари, множества и массивы (episodes, topic_counts)
+    возвращаются копией, снятой под блокировкой чтения, — без
+    доступа к живому контейнеру мимо блокировки. Элементы копии
+    (виды эпизодов) не защищены: согласованные чтения — методами
+    подсистемы из reads.
+    
+    Вложенные объекты (emotion.amygdala) возвращаются как есть:
+    составные действия с ними — внутри `with guarded.rwlock.write():`.
+    
+    Если объект сам пишет себя на диск в фоне (есть атрибут
+    state_lock), он получает ту же блокировку.
+    """
+    
+    def __init__(self, obj, reads=()):
+        """
+        Args:
+            obj: Подсистема (EmotionCore, EpisodicMemory, SemanticMemory...)
+            reads: Имена методов, которые ничего не меняют
+        """
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_reads", frozenset(reads))
+        object.__setattr__(self, "rwlock", RWLock())
+        if hasattr(obj, "state_lock"):
+            obj.state_lock = self.rwlock
+    
+    def __getattr__(self, name):
+        with self.rwlock.read():
+            value = getattr(self._obj, name)
+            if isinstance(value, _CONTAINERS):
+                return copy.copy(value)
+        if not inspect.ismethod(value):
+            return value
+        
+        lock = self.rwlock.read if name in self._reads else self.rwlock.write
+        
+        def locked(*args, **kwargs):
+            with lock():
+                return value(*args, **kwargs)
+        
+        return locked
+    
+    def __setattr__(self, name, value):
+        with self.rwlock.write():
+            setattr(self._obj, name, value)
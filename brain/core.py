@@ -7,23 +7,36 @@ import threading
 import time
 import ollama
 
-from config import OLLAMA_MODEL, DEBUG_MODE
+from config import OLLAMA_MODEL, DEBUG_MODE, SLEEP_AFTER_IDLE, SLEEP_SLICE, SLEEP_CYCLES
 from limbic.emotion_core import EmotionCore
+from limbic.tokenizer import tokenize
 from hippocampus.episodic import EpisodicMemory
 from hippocampus.semantic import SemanticMemory
+from hippocampus.semantic_sqlite import SQLiteSemanticMemory
 from hippocampus.consolidation import Consolidation
+from brain.concurrency import Guarded
 from brain.context_builder import ContextBuilder
 from body.voice import Voice
-from config import VOICE_ENABLED
+from config import VOICE_ENABLED, SEMANTIC_BACKEND
 from hippocampus.vector_memory import VectorMemory
 
 class Brain:
     
     def __init__(self):
-        # Подсистемы
-        self.emotion = EmotionCore()
-        self.episodic = EpisodicMemory()
-        self.semantic = SemanticMemory()
+        # Подсистемы. Их разделяют разговор и фоновый сон: у каждой
+        # своя блокировка чтения-записи (brain.concurrency)
+        self.emotion = Guarded(
+            EmotionCore(),
+            reads=("get_affect", "get_context_for_llm", "get_state_key", "get_status"),
+        )
+        self.episodic = Guarded(
+            EpisodicMemory(),
+            reads=("get_recent", "get_stats", "get_topic_counts", "replay_candidates", "replay_texts"),
+        )
+        self.semantic = Guarded(
+            SQLiteSemanticMemory() if SEMANTIC_BACKEND == "sqlite" else SemanticMemory(),
+            reads=("recall", "get_all", "get_stats"),
+        )
         self.consolidation = Consolidation(self.episodic, self.semantic)
         self.voice = Voice() if VOICE_ENABLED else None
         # Рабочая память (текущий диалог)
@@ -38,9 +51,13 @@ class Brain:
             self.semantic,
             self.vector_memory  # <-- добавили
         )
-        # Фоновый поток жизни (пока просто сон)
+        # Фоновый поток жизни (сон в паузах разговора)
         self.running = False
         self.thread = None
+        self._stop_event = threading.Event()
+        self._last_activity = time.monotonic()
+        self._sleep = None          # Недоделанный сон (генератор шагов)
+        self._needs_sleep = True    # Было ли что-то новое с прошлого сна
     
     def process_input(self, text):
         """
@@ -50,11 +67,14 @@ class Brain:
         # Сначала просто оцениваем, не меняем состояние (preview)
         # Но в текущей архитектуре emotion.process() сразу меняет состояние.
         # Это ок для начала.
-        emotion_state = self.emotion.process(text)
+        # Сообщение разбирается один раз и дальше переиспользуется
+        self._wake()
+        message = tokenize(text)
+        emotion_state = self.emotion.process(message)
         
         # 2. Извлечение фактов (параллельно)
-        self.semantic.extract_facts(text)
-                # 2.5 Сохраняем в векторную память
+        self.semantic.extract_facts(text, lowered=message.lower)
+        # 2.5 Сохраняем в векторную память
         self.vector_memory.add_fact(text)
         # 3. Сборка контекста
         messages = self.context_builder.build(text, self.working_memory)
@@ -78,11 +98,7 @@ class Brain:
                 
                 # Если голос включен — отправляем по предложениям
                 if self.voice and content in [".", "!", "?", "\n"]:
-                    self.voice.say(
-                        buffer, 
-                        self.emotion.amygdala.valence,
-                        self.emotion.amygdala.arousal
-                    )
+                    self.voice.say(buffer, *self.emotion.get_affect())
                     buffer = ""
                 
         except Exception as e:
@@ -96,7 +112,9 @@ class Brain:
         self.working_memory.append({"role": "assistant", "content": response_text})
         
         # Эмоциональная реакция на свой ответ (рефлексия)
-        self.emotion.amygdala.process(response_text)
+        with self.emotion.rwlock.write():
+            self.emotion.amygdala.process(response_text)
+        self._wake()
         
         # Сохраняем эпизод (если диалог закончится)
         # Пока просто накапливаем, сохранение будет при выходе или паузе
@@ -112,11 +130,13 @@ class Brain:
         summary = f"Разговор из {len(self.working_memory)//2} сообщений."
         # В будущем: Ollama генерирует summary
         
+        self._wake()
+        valence, arousal = self.emotion.get_affect()
         self.episodic.store(
             summary=summary,
             messages=self.working_memory,
-            valence=self.emotion.amygdala.valence,
-            arousal=self.emotion.amygdala.arousal
+            valence=valence,
+            arousal=arousal
         )
         self.working_memory = []  # Очищаем рабочую память
         print(" [Эпизод сохранён]")
@@ -124,24 +144,71 @@ class Brain:
     def start_life(self):
         """Запустить фоновые процессы"""
         self.running = True
+        self._stop_event.clear()
         self.thread = threading.Thread(target=self._life_loop, daemon=True)
         self.thread.start()
     
     def stop_life(self):
         """Остановить"""
         self.running = False
+        self._stop_event.set()
         if self.thread:
             self.thread.join(timeout=1.0)
+        
+        # Дописываем отложенное состояние
+        self.emotion.flush()
+    
+    def _wake(self):
+        """Активность: сон уступает после текущего шага"""
+        self._last_activity = time.monotonic()
+        self._needs_sleep = True
     
     def _life_loop(self):
-        """Фоновый цикл"""
+        """
+        Фоновый цикл: сон (консолидация) в паузах разговора.
+        
+        Энергия и настроение восстанавливаются лениво, по часам
+        (EmotionCore._apply_elapsed) — будить ядро не нужно.
+        После SLEEP_AFTER_IDLE секунд тишины идёт консолидация,
+        квантами по SLEEP_SLICE. Сообщение прерывает её после
+        текущего шага; в следующей паузе сон продолжается с того же места.
+        Шаг блокирует только ту подсистему, которую меняет.
+        """
         while self.running:
-            # Раз в минуту восстанавливаем энергию
-            time.sleep(60)
-            self.emotion.rest(minutes=1)
+            idle = time.monotonic() - self._last_activity
+            if idle < SLEEP_AFTER_IDLE:
+                self._stop_event.wait(SLEEP_AFTER_IDLE - idle)
+                continue
+            if self._sleep is None and not self._needs_sleep:
+                # Ничего нового — спать незачем, ждём активности
+                self._stop_event.wait(SLEEP_AFTER_IDLE)
+                continue
             
-            # Если долго нет активности — запускаем консолидацию
-            # (пока заглушка)
+            if self._sleep is None:
+                self._sleep = self.consolidation.steps(SLEEP_CYCLES)
+                self._needs_sleep = False
+            self._sleep_slice()
+            self._stop_event.wait(SLEEP_SLICE)
+    
+    def _sleep_slice(self):
+        """
+        Один квант сна: шаги консолидации, пока не кончилось время или не пришло сообщение.
+        
+        Ошибка шага (диск, битый эпизод) прерывает только этот сон:
+        поток жизни продолжает работать, следующий сон — после новой активности.
+        """
+        started = self._last_activity
+        deadline = time.monotonic() + SLEEP_SLICE
+        while self.running and self._last_activity == started and time.monotonic() < deadline:
+            try:
+                next(self._sleep)
+            except StopIteration:
+                self._sleep = None
+                return
+            except Exception as e:
+                print(f"\n[Ошибка сна: {e}]")
+                self._sleep = None
+                return
     
     def _print_debug(self, state):
         print("\n" + "="*30)
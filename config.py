@@ -13,10 +13,22 @@ DT = 0.1
 
 # === ЭМОЦИИ (пока заглушки, потом SNN) ===
 EMOTION_INERTIA = 0.6  # Насколько медленно меняются эмоции (0-1)
+EMOTION_SAVE_INTERVAL = 5.0  # Не чаще раза в столько секунд писать состояние на диск
+LEXICON_CAPACITY = 20000  # Максимум слов в эмоциональном словаре амигдалы
+HISTORY_SIZE = 1000  # Сколько последних значений эмоций хранить
+HISTORY_HOURS = 168  # Сколько часов почасовой статистики хранить (неделя)
+SESSIONS_DIR = "data/sessions"  # Состояния собеседников (многопользовательский режим)
 
 # === ПАМЯТЬ ===
 MEMORY_DIR = "data/memory"
 MAX_EPISODES = 1000  # Максимум эпизодов в памяти
+EPISODE_COMPACT_EVERY = 1000  # Через сколько записей журнала сворачивать его в снимок
+EPISODE_BODY_CACHE = 256  # Сколько тел эпизодов (сообщений) держать в памяти
+EPISODE_BODY_RECLAIM = 1 << 20  # С какого размера сегмента тел (байт) чистить его от удалённых при старте
+SLEEP_AFTER_IDLE = 300.0  # Секунд без сообщений до начала сна (консолидации)
+SLEEP_SLICE = 0.05  # Длина кванта сна (сек): между квантами сон уступает разговору
+SLEEP_CYCLES = 5  # Циклов консолидации за один сон
+SEMANTIC_BACKEND = "json"  # Факты: "json" (facts.json) или "sqlite" (facts.db, для больших баз)
 
 # === LLM ===
 OLLAMA_MODEL = "gemma2"
@@ -0,0 +1,327 @@
+"""
+Ассоциативная память — вспоминание по части.
+
+Сеть Хопфилда на разреженных паттернах TextEncoder:
+услышала пару слов → "достраивает" целое воспоминание.
+
+Полностью локальная, без внешних библиотек (только numpy).
+Подходит как быстрый путь вспоминания эпизодов и фактов.
+"""
+
+import numpy as np
+
+from neurons.encoding import TextEncoder
+
+
+PUNCTUATION = ".,!?;:\"'()[]{}…"
+
+
+def _gather(indptr, indices, rows):
+    """
+    Строки разреженной матрицы (CSR) одним массивом.
+
+    Args:
+        indptr, indices: Матрица в формате CSR
+        rows: Номера строк
+
+    Returns:
+        tuple: (значения строк подряд, длины строк)
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return indices[np.repeat(starts, lengths) + offsets], lengths
+
+
+class AssociativeMemory:
+    """
+    Ассоциативная память (современная сеть Хопфилда).
+
+    Каждый элемент (эпизод, факт) → разреженный паттерн:
+    объединение паттернов его слов из TextEncoder.
+
+    Веса — разреженная матрица "элемент × нейрон"
+    (1 там, где нейрон активен в паттерне элемента).
+    Хранится дважды (CSR): по элементам (паттерны) и
+    по нейронам (нейрон → элементы, для сходства).
+
+    Вспоминание — завершение паттерна по подсказке:
+      1. Подсказка → паттерн x
+      2. h = W·x — перекрытие x с каждым элементом
+      3. Победители голосуют за свои нейроны → новый x
+      4. Пара итераций — x сходится к сохранённому паттерну
+
+    Стоимость итерации зависит от активных нейронов x
+    и длины их списков, а не от всего числа элементов.
+    """
+
+    def __init__(self, n_neurons=8192, sparsity=0.00125, n_iterations=2,
+                 min_score=0.1, buffer_size=256):
+        """
+        Args:
+            n_neurons: Размер паттерна
+            sparsity: Доля активных нейронов на слово (~10 из 8192)
+            n_iterations: Итерации завершения паттерна
+            min_score: Минимальное сходство для результата (0-1)
+            buffer_size: Сколько новых элементов держать вне индекса
+        """
+        self.n = n_neurons
+        self.encoder = TextEncoder(n_neurons=n_neurons, sparsity=sparsity)
+        self.n_iterations = n_iterations
+        self.min_score = min_score
+        self.buffer_size = buffer_size
+
+        # Элементы
+        self.keys = []          # id → ключ
+        self.key_to_id = {}     # ключ → id
+        self._sizes = np.zeros(64, dtype=float)   # id → число активных нейронов
+        self._alive = np.zeros(64, dtype=bool)    # id → не удалён ли
+        self._inv_norm = np.zeros(64)             # id → 1/√size (0 у удалённых)
+
+        # Паттерны (CSR по элементам): нейроны элемента i —
+        # _item_neurons[_item_ptr[i]:_item_ptr[i + 1]], отсортированы
+        self._item_ptr = np.zeros(65, dtype=np.int64)
+        self._item_neurons = np.zeros(1024, dtype=np.int32)
+
+        # Индекс нейрон → элементы (CSR) для первых n_indexed элементов
+        self._indptr = np.zeros(n_neurons + 1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self.n_indexed = 0
+
+        # Буфер новых элементов одним массивом (собирается по требованию)
+        self._buffer = None
+        self._x_mask = np.zeros(n_neurons, dtype=bool)   # Переиспользуется в _similarity
+
+        # Кэш паттернов слов
+        self._word_cache = {}
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
+
+    @property
+    def sizes(self):
+        return self._sizes[:len(self.keys)]
+
+    @property
+    def alive(self):
+        return self._alive[:len(self.keys)]
+
+    def store(self, key, text):
+        """
+        Запомнить элемент.
+
+        Args:
+            key: Ключ (id эпизода, текст факта...)
+            text: Текст, по которому потом вспоминать
+        """
+        if key in self.key_to_id:
+            self.remove(key)
+
+        pattern = self.encode(text)
+        if len(pattern) == 0:
+            return
+
+        item_id = len(self.keys)
+        if item_id == len(self._sizes):
+            # Растём удвоением, чтобы добавление было O(1) в среднем
+            self._sizes = np.concatenate([self._sizes, np.zeros(item_id)])
+            self._alive = np.concatenate([self._alive, np.zeros(item_id, dtype=bool)])
+            self._inv_norm = np.concatenate([self._inv_norm, np.zeros(item_id)])
+            self._item_ptr = np.concatenate([self._item_ptr, np.zeros(item_id, dtype=np.int64)])
+
+        start = self._item_ptr[item_id]
+        end = start + len(pattern)
+        if end > len(self._item_neurons):
+            grown = np.zeros(max(end, 2 * len(self._item_neurons)), dtype=np.int32)
+            grown[:start] = self._item_neurons[:start]
+            self._item_neurons = grown
+        self._item_neurons[start:end] = pattern
+        self._item_ptr[item_id + 1] = end
+
+        self.keys.append(key)
+        self.key_to_id[key] = item_id
+        self._sizes[item_id] = len(pattern)
+        self._alive[item_id] = True
+        self._inv_norm[item_id] = 1.0 / np.sqrt(len(pattern))
+        self._buffer = None
+
+        # Новые элементы копятся в буфере, потом разом идут в индекс
+        if len(self.keys) - self.n_indexed > self.buffer_size:
+            self._rebuild()
+
+    def remove(self, key):
+        """Забыть элемент"""
+        item_id = self.key_to_id.pop(key, None)
+        if item_id is not None:
+            self._alive[item_id] = False
+            self._inv_norm[item_id] = 0.0
+
+    def recall(self, cue, top_k=3):
+        """
+        Вспомнить элементы по частичной подсказке.
+
+        Args:
+            cue: Текст-подсказка (несколько слов)
+            top_k: Сколько элементов вернуть
+
+        Returns:
+            list: [(ключ, сходство), ...] по убыванию сходства
+        """
+        x = self.encode(cue)
+        if len(x) == 0 or not self.keys:
+            return []
+
+        scores = self._similarity(x)
+
+        for _ in range(self.n_iterations):
+            winners = self._top(scores, top_k)
+            if len(winners) == 0:
+                return []
+
+            # Победители голосуют за свои нейроны (вес = сходство):
+            # считаем только по их нейронам, а не по всем n
+            neurons, lengths = _gather(self._item_ptr, self._item_neurons, winners)
+            voted, owner = np.unique(neurons, return_inverse=True)
+            votes = np.bincount(owner, weights=np.repeat(scores[winners], lengths))
+            x_new = voted[votes >= 0.5 * votes.max()]
+
+            if np.array_equal(x_new, x):
+                break  # Аттрактор
+            x = x_new
+            scores = self._similarity(x)
+
+        return [(self.keys[i], round(float(scores[i]), 3)) for i in self._top(scores, top_k)]
+
+    def encode(self, text):
+        """Текст → отсортированные активные нейроны"""
+        words = [w.strip(PUNCTUATION) for w in text.lower().split()]
+        parts = [self._word_pattern(w) for w in words if w]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+
+    def _word_pattern(self, word):
+        """Активные нейроны слова (с кэшем)"""
+        pattern = self._word_cache.get(word)
+        if pattern is None:
+            pattern = np.nonzero(self.encoder.encode_word(word))[0]
+            self._word_cache[word] = pattern
+        return pattern
+
+    def _similarity(self, x):
+        """Косинусное сходство x со всеми элементами"""
+        n_items = len(self.keys)
+
+        # Проиндексированная часть: собираем списки активных нейронов
+        hits, _ = _gather(self._indptr, self._indices, x)
+        overlap = np.bincount(hits, minlength=n_items)
+
+        # Буфер новых элементов — напрямую по маске x
+        if n_items > self.n_indexed:
+            if self._buffer is None:
+                neurons, owners = self._tail()
+                self._buffer = (neurons, owners - self.n_indexed)
+            neurons, owners = self._buffer
+            x_mask = self._x_mask
+            x_mask[x] = True
+            overlap[self.n_indexed:] = np.bincount(
+                owners, weights=x_mask[neurons], minlength=n_items - self.n_indexed
+            )
+            x_mask[x] = False
+
+        # Удалённые получают 0 через нулевую норму
+        return overlap * (self._inv_norm[:n_items] / np.sqrt(len(x)))
+
+    def _top(self, scores, k):
+        """Индексы top-k элементов выше порога (по убыванию, при равенстве — по id)"""
+        candidates = np.flatnonzero(scores >= self.min_score)
+        if len(candidates) > k:
+            # Граница k-го места: из равных берём ранние id, а не случайные
+            kth = -np.partition(-scores[candidates], k - 1)[k - 1]
+            above = scores[candidates] > kth
+            tied = np.flatnonzero(scores[candidates] == kth)[:k - int(above.sum())]
+            above[tied] = True
+            candidates = candidates[above]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def _tail(self):
+        """Нейроны элементов вне индекса подряд и их владельцы (id)"""
+        n_items = len(self.keys)
+        ptr = self._item_ptr[self.n_indexed:n_items + 1]
+        neurons = self._item_neurons[ptr[0]:ptr[-1]]
+        owners = np.repeat(np.arange(self.n_indexed, n_items, dtype=np.int32), np.diff(ptr))
+        return neurons, owners
+
+    def _rebuild(self):
+        """
+        Влить буфер в индекс нейрон → элементы.
+
+        Обычно — слияние без сортировки всего индекса (O(размер индекса)).
+        Если удалённых больше четверти — полная пересборка с уплотнением.
+        """
+        n_dead = len(self.keys) - len(self.key_to_id)
+        if n_dead > len(self.keys) // 4:
+            self._compact()
+            return
+
+        if self.n_indexed == len(self.keys):
+            return
+
+        new_neurons, new_items = self._tail()
+        order = np.argsort(new_neurons, kind="stable")
+        new_neurons = new_neurons[order]
+        new_items = new_items[order]
+
+        old_counts = np.diff(self._indptr)
+        new_counts = np.bincount(new_neurons, minlength=self.n)
+        indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(old_counts + new_counts, out=indptr[1:])
+
+        indices = np.empty(indptr[-1], dtype=np.int32)
+
+        # Старые записи сдвигаются на начало своего нейрона в новом индексе
+        old_neurons = np.repeat(np.arange(self.n), old_counts)
+        old_pos = np.arange(len(self._indices)) - self._indptr[old_neurons] + indptr[old_neurons]
+        indices[old_pos] = self._indices
+
+        # Новые — сразу после старых того же нейрона
+        rank = np.arange(len(new_neurons)) - np.repeat(np.cumsum(new_counts) - new_counts, new_counts)
+        new_pos = indptr[new_neurons] + old_counts[new_neurons] + rank
+        indices[new_pos] = new_items
+
+        self._indptr = indptr
+        self._indices = indices
+        self.n_indexed = len(self.keys)
+        self._buffer = None
+
+    def _compact(self):
+        """Полная пересборка индекса без удалённых элементов"""
+        live = np.nonzero(self.alive)[0]
+
+        self.keys = [self.keys[i] for i in live]
+        neurons, lengths = _gather(self._item_ptr, self._item_neurons, live)
+        self._item_neurons[:len(neurons)] = neurons
+        np.cumsum(lengths, out=self._item_ptr[1:len(live) + 1])
+        self._sizes[:len(live)] = self._sizes[live]
+        self._alive[:len(live)] = True
+        self._alive[len(live):] = False
+        self._inv_norm[:len(live)] = self._inv_norm[live]
+        self._inv_norm[len(live):] = 0.0
+        self.key_to_id = {key: i for i, key in enumerate(self.keys)}
+
+        self._indptr = np.zeros(self.n + 1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self.n_indexed = 0
+        self._buffer = None
+
+        if self.keys:
+            self._rebuild()
+
+    def get_stats(self):
+        """Статистика"""
+        return {
+            "count": len(self),
+            "indexed": self.n_indexed,
+            "synapses": len(self._indices),
+        }
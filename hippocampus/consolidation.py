@@ -5,17 +5,75 @@
 1. Важные эпизоды "прокручиваются" (replay)
 2. Слабые воспоминания забываются
 3. Из эпизодов извлекаются обобщения → семантическая память
+
+Если подключена синаптическая сеть — replay настоящий:
+эпизоды кодируются в спайки и прогоняются через сеть
+с STDP, пачками, в пределах бюджета времени.
+
+Консолидацию можно выполнять по шагам (steps): фоновый
+сон идёт короткими квантами и прерывается, когда приходит сообщение.
 """
 
+import time
+
+import numpy as np
+
+from config import DT
+from neurons.encoding import TextEncoder
+
+
+# Факт-обобщение о частой теме
+TOPIC_FACT = "Часто обсуждаемая тема: "
+
 
 class Consolidation:
     """
     Процесс консолидации памяти.
     """
     
-    def __init__(self, episodic_memory, semantic_memory):
+    def __init__(
+        self,
+        episodic_memory,
+        semantic_memory,
+        network=None,
+        replay_budget_s=2.0,
+        replay_batch=32,
+        replay_ms=50.0,
+        replay_rate=100.0,
+        replay_gain=200.0,
+    ):
+        """
+        Args:
+            episodic_memory: EpisodicMemory
+            semantic_memory: SemanticMemory
+            network: SynapticNetwork для replay (None = простое усиление)
+            replay_budget_s: Бюджет времени на replay через сеть (сек)
+            replay_batch: Сколько эпизодов прогонять параллельно
+            replay_ms: Длительность прогона одного эпизода (мс)
+            replay_rate: Максимальная частота входных спайков (Гц)
+            replay_gain: Усиление синаптического тока для post нейронов
+        """
         self.episodic = episodic_memory
         self.semantic = semantic_memory
+        
+        # Сон через спайковую сеть
+        self.network = network
+        self.replay_budget_s = replay_budget_s
+        self.replay_batch = replay_batch
+        self.replay_ms = replay_ms
+        self.replay_rate = replay_rate
+        self.replay_gain = replay_gain
+        if network is not None:
+            self.encoder = TextEncoder(n_neurons=network.n_pre)
+        
+        # Темы, по которым обобщение уже сделано. После перезапуска —
+        # из семантической памяти: частые темы, факт о которых уже есть
+        topic_counts = self.episodic.get_topic_counts()
+        self.generalized_topics = {
+            fact[len(TOPIC_FACT):] for fact in self.semantic.get_all()
+            if fact.startswith(TOPIC_FACT)
+            and topic_counts.get(fact[len(TOPIC_FACT):], 0) >= 3
+        }
     
     def run(self, cycles=5):
         """
@@ -27,61 +85,148 @@ class Consolidation:
         Returns:
             dict: Результаты консолидации
         """
+        for results in self.steps(cycles):
+            pass
+        return results
+    
+    def steps(self, cycles=5):
+        """
+        Консолидация по шагам (генератор).
+        
+        Каждый шаг короткий и законченный: между шагами память
+        свободна, а следующий шаг берёт её свежее состояние.
+        Недоделанный сон можно продолжить позже.
+        
+        Args:
+            cycles: Количество циклов
+            
+        Yields:
+            dict: Результаты на данный момент
+        """
         results = {
             "replayed": 0,
+            "network_replayed": 0,
             "forgotten_episodes": 0,
             "forgotten_facts": 0,
             "extracted_facts": 0,
         }
         
-        for _ in range(cycles):
-            # 1. Replay важных эпизодов (усиливает их)
-            results["replayed"] += self._replay()
-            
-            # 2. Забывание слабых
-            results["forgotten_episodes"] += self.episodic.decay_all()
-            results["forgotten_facts"] += self.semantic.decay_all()
+        # 0. Настоящий replay через сеть (если есть), один раз за сон
+        if self.network is not None:
+            for replayed in self._network_replay_steps():
+                results["network_replayed"] = replayed
+                yield results
+        
+        # 1-2. Все циклы сразу, в замкнутой форме (одна запись на диск):
+        #      replay важных эпизодов (усиливает их) и забывание слабых
+        replayed, forgotten = self.episodic.consolidate(cycles)
+        results["replayed"] = replayed
+        results["forgotten_episodes"] = forgotten
+        yield results
+        
+        results["forgotten_facts"] = self.semantic.decay_all(cycles)
+        yield results
         
-        # 3. Извлечение обобщений
+        # 3. Извлечение обобщений (только по изменившимся темам)
         results["extracted_facts"] += self._extract_generalizations()
+        yield results
+    
+    def _network_replay_steps(self):
+        """
+        Replay через сеть по пачкам (генератор).
         
-        return results
+        Эпизоды идут пачками по replay_batch: каждый кодируется
+        в паттерн (TextEncoder) и rate-кодом в спайки pre слоя,
+        post слой — LIF нейроны. Самые важные — первыми.
+        Останавливается, когда кончается replay_budget_s
+        (считается только время работы, не пауз между пачками).
+        Эпизоды, забытые во время паузы, пропускаются.
+        
+        Память читается только её методами (id и тексты пачки
+        берутся целиком под её блокировкой, если она есть).
+        
+        Yields:
+            int: Сколько эпизодов прогнано к этому моменту
+        """
+        episodes = self.episodic.replay_candidates()
+        
+        budget = self.replay_budget_s
+        n_steps = int(self.replay_ms / DT)
+        replayed = 0
+        
+        for start in range(0, len(episodes), self.replay_batch):
+            batch = self.episodic.replay_texts(episodes[start:start + self.replay_batch])
+            if not batch:
+                continue
+            
+            began = time.monotonic()
+            
+            # Паттерн эпизода → вероятность спайка на шаге
+            patterns = np.array([self.encoder.encode_text(text) for text in batch])
+            spike_prob = patterns * self.replay_rate * DT / 1000.0
+            
+            if not self._simulate(spike_prob, n_steps, began + budget):
+                break
+            budget -= time.monotonic() - began
+            replayed += len(batch)
+            yield replayed
     
-    def _replay(self):
+    def _simulate(self, spike_prob, n_steps, deadline):
         """
-        Replay: прокрутить важные эпизоды.
-        Усиливает их в памяти.
+        Прогон пачки через сеть (векторный LIF для post слоя).
+        
+        На каждом шаге: токи от pre спайков → post спайки этого
+        же шага → STDP по паре (pre, post) одного шага.
+        
+        Returns:
+            bool: True если прогон закончен до дедлайна
         """
-        count = 0
-        for ep in self.episodic.episodes:
-            # Прокручиваем только важные
-            if ep.importance > 0.5 and ep.strength > 0.3:
-                ep.strength = min(1.0, ep.strength + 0.05)
-                ep.recall_count += 1
-                count += 1
-        return count
+        net = self.network
+        batch = len(spike_prob)
+        net.reset_batch_traces(batch)
+        
+        # LIF параметры как у LIFNeuron по умолчанию
+        tau_m, v_rest, v_threshold, v_reset = 20.0, -65.0, -50.0, -65.0
+        v = np.full((batch, net.n_post), v_rest)
+        
+        for _ in range(n_steps):
+            if time.monotonic() > deadline:
+                return False
+            
+            pre_spikes = np.random.random_sample(spike_prob.shape) < spike_prob
+            currents = net.propagate_batch(pre_spikes)
+            
+            v += (-(v - v_rest) + currents * self.replay_gain) / tau_m * DT
+            post_spikes = v >= v_threshold
+            v[post_spikes] = v_reset
+            
+            net.learn_batch(pre_spikes, post_spikes)
+        
+        return True
     
     def _extract_generalizations(self):
         """
         Извлечь обобщения из эпизодов.
         Например: если в 3 эпизодах обсуждали музыку →
         факт "собеседник интересуется музыкой".
+        
+        Частоту тем эпизодическая память считает сама, при
+        сохранении и забывании эпизодов. Здесь смотрим только
+        изменившиеся темы: факт — когда тема впервые стала частой.
         """
-        count = 0
-        
-        # Считаем частоту тем
-        topic_counts = {}
-        for ep in self.episodic.episodes:
-            words = ep.summary.lower().split()
-            for word in words:
-                if len(word) > 4:  # Только значимые слова
-                    topic_counts[word] = topic_counts.get(word, 0) + 1
-        
-        # Частые темы → факты
-        for topic, freq in topic_counts.items():
-            if freq >= 3:
-                fact = f"Часто обсуждаемая тема: {topic}"
-                self.semantic.store(fact, source="консолидация", importance=0.4)
-                count += 1
-        
-        return count
\ No newline at end of file
+        changed = self.episodic.changed_topics()
+        
+        new_topics = []
+        for topic in sorted(changed):
+            if changed[topic] >= 3:
+                if topic not in self.generalized_topics:
+                    self.generalized_topics.add(topic)
+                    new_topics.append(topic)
+            else:
+                # Тема снова редкая — сможет стать частой ещё раз
+                self.generalized_topics.discard(topic)
+        
+        # Частые темы → факты, одной записью
+        facts = [TOPIC_FACT + topic for topic in new_topics]
+        self.semantic.store_many(facts, source="консолидация", importance=0.4)
+        return len(facts)
\ No newline at end of file
@@ -11,50 +11,99 @@
 Неважные — забываются.
 """
 
-import json
+import heapq
 import os
 import time
 from datetime import datetime
 
 import numpy as np
 
+from config import EPISODE_BODY_CACHE, EPISODE_BODY_RECLAIM, EPISODE_COMPACT_EVERY
+from hippocampus.journal import Journal
+from hippocampus.segment import Segment
+
+
+# Числовые поля эпизода — столбцы в EpisodicMemory
+COLUMNS = {
+    "id": np.int64,
+    "timestamp": np.float64,
+    "importance": np.float64,   # Важность: сильные эмоции → важнее
+    "strength": np.float64,     # Сила воспоминания (слабеет со временем)
+    "recall_count": np.int64,   # Сколько раз вспоминали (replay усиливает)
+    "valence": np.float64,      # Эмоциональная окраска
+    "arousal": np.float64,      # Возбуждение
+    "body_offset": np.int64,    # Адрес сообщений в сегменте на диске
+    "body_length": np.int64,
+}
+
+
+def _column(name, writable=False):
+    """Свойство эпизода, читающее (и пишущее) его ячейку в столбце"""
+    def get(self):
+        return self._mem._cols[name][self.row].item()
+    
+    def set(self, value):
+        self._mem._cols[name][self.row] = value
+    
+    return property(get, set if writable else None)
+
 
 class Episode:
-    """Один эпизод (воспоминание)"""
+    """
+    Один эпизод (воспоминание).
     
-    def __init__(self, summary, messages, emotion_valence, emotion_arousal):
-        self.timestamp = time.time()
-        self.date = datetime.now().strftime("%Y-%m-%d %H:%M")
-        self.summary = summary          # Краткое содержание
-        self.messages = messages[-10:]   # Последние 10 сообщений
-        self.valence = emotion_valence   # Эмоциональная окраска
-        self.arousal = emotion_arousal   # Возбуждение
-        
-        # Важность: сильные эмоции → важнее
-        self.importance = min(1.0, abs(emotion_valence) * 0.6 + emotion_arousal * 0.3 + 0.1)
-        
-        # Сила воспоминания (слабеет со временем)
-        self.strength = 1.0
-        
-        # Сколько раз вспоминали (replay усиливает)
-        self.recall_count = 0
+    Сам ничего не хранит: это окно в строку row столбцов
+    EpisodicMemory (числа — в numpy массивах, summary и слова — списками,
+    сообщения — на диске, читаются по требованию).
+    """
+    
+    __slots__ = ("_mem", "row")
+    
+    id = _column("id")
+    timestamp = _column("timestamp")
+    importance = _column("importance")
+    strength = _column("strength", writable=True)
+    recall_count = _column("recall_count", writable=True)
+    valence = _column("valence")
+    arousal = _column("arousal")
+    body_offset = _column("body_offset")
+    body_length = _column("body_length")
+    
+    def __init__(self, mem, row):
+        self._mem = mem
+        self.row = row
+    
+    @property
+    def summary(self):
+        """Краткое содержание"""
+        return self._mem._summaries[self.row]
+    
+    @property
+    def messages(self):
+        """Последние 10 сообщений (читаются с диска при первом обращении)"""
+        return self._mem._body(self.row)
+    
+    @property
+    def alive(self):
+        """Эпизод ещё в памяти (не забыт и не вытеснен)"""
+        return self._mem._views[self.row] is self
+    
+    @property
+    def date(self):
+        return datetime.fromtimestamp(self.timestamp).strftime("%Y-%m-%d %H:%M")
+    
+    def words(self):
+        """Слова эпизода (summary и сообщения) — для поиска"""
+        return set(self._mem._terms[self.row])
     
     def decay(self, hours_passed):
         """
-        Забывание со временем.
-        Важные воспоминания забываются медленнее.
+        Забывание со временем (для одного эпизода;
+        EpisodicMemory забывает все разом — _decay).
         """
-        # Кривая забывания Эббингауза (упрощённая)
-        # strength = importance^(time / rate)
-        decay_rate = 24.0 / (self.importance + 0.1)  # Важные = медленнее
-        
-        # Каждое вспоминание усиливает
-        recall_bonus = self.recall_count * 0.1
-        
-        self.strength = min(1.0, 
-            (self.importance + recall_bonus) * np.exp(-hours_passed / (decay_rate * 24))
-        )
-        
+        self.strength = float(_decayed_strength(
+            self.importance, self.recall_count, hours_passed
+        ))
         return self.strength > 0.05  # True если ещё помнит
     
     def recall(self):
@@ -63,49 +112,120 @@ class Episode:
         self.strength = min(1.0, self.strength + 0.2)
     
     def to_dict(self):
-        """Сериализация"""
+        """Сериализация (сообщения читаются с диска)"""
+        data = self._fields()
+        data["messages"] = self.messages
+        return data
+    
+    def to_record(self):
+        """Запись для снимка и журнала: вместо сообщений — их адрес и слова (тело не читается)"""
+        record = self._fields()
+        record["body"] = [self.body_offset, self.body_length]
+        record["words"] = self._mem._terms[self.row]
+        return record
+    
+    def _fields(self):
+        """Метаданные эпизода (только столбцы)"""
         return {
+            "id": self.id,
             "timestamp": self.timestamp,
             "date": self.date,
             "summary": self.summary,
-            "messages": self.messages,
             "valence": self.valence,
             "arousal": self.arousal,
             "importance": round(self.importance, 3),
             "strength": round(self.strength, 3),
             "recall_count": self.recall_count,
         }
+
+
+def _importance(valence, arousal):
+    """Важность: сильные эмоции → важнее"""
+    return min(1.0, abs(valence) * 0.6 + arousal * 0.3 + 0.1)
+
+
+def _terms(summary, messages):
+    """Слова summary и сообщений (для обратного индекса)"""
+    text = summary.lower()
+    for msg in messages:
+        text += " " + msg.get("content", "").lower()
+    return sorted(set(text.split()))
+
+
+def _topics(summary):
+    """Темы эпизода — значимые слова summary (с повторами)"""
+    return [word for word in summary.lower().split() if len(word) > 4]
+
+
+def _decayed_strength(importance, recall_count, hours_passed):
+    """
+    Кривая забывания Эббингауза (упрощённая).
+    Работает и со скалярами, и с массивами.
+    """
+    decay_rate = 24.0 / (importance + 0.1)  # Важные = медленнее
     
-    @staticmethod
-    def from_dict(data):
-        """Десериализация"""
-        ep = Episode(
-            summary=data["summary"],
-            messages=data.get("messages", []),
-            emotion_valence=data["valence"],
-            emotion_arousal=data.get("arousal", 0.5),
-        )
-        ep.timestamp = data["timestamp"]
-        ep.date = data["date"]
-        ep.importance = data["importance"]
-        ep.strength = data["strength"]
-        ep.recall_count = data.get("recall_count", 0)
-        return ep
+    # Каждое вспоминание усиливает
+    recall_bonus = recall_count * 0.1
+    
+    return np.minimum(1.0, (importance + recall_bonus) * np.exp(-hours_passed / (decay_rate * 24)))
 
 
 class EpisodicMemory:
     """
     Эпизодическая память.
     Хранит воспоминания о событиях.
+    
+    Для вспоминания держит обратный индекс слово → номера эпизодов:
+    стоимость запроса зависит от слов запроса и совпадений,
+    а не от размера архива.
+    
+    На диске — снимок + журнал изменений (hippocampus.journal):
+    каждое изменение дописывает одну строку, а не весь архив.
+    Сообщения эпизодов — отдельно, в сжатом сегменте (hippocampus.segment):
+    в памяти только метаданные, тела читаются по требованию.
+    Тела удалённых эпизодов остаются в сегменте до следующего старта:
+    если их больше половины файла, живые переписываются в новый.
     """
     
     SAVE_PATH = os.path.join("data", "memory", "episodes.json")
     
     def __init__(self, max_episodes=500):
-        self.episodes = []
         self.max_episodes = max_episodes
+        
+        # Числа — столбцами, тексты — списками; строка = эпизод.
+        # Строки удалённых эпизодов переиспользуются.
+        self._cols = {name: np.zeros(64, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._alive = np.zeros(64, dtype=bool)
+        self._summaries = [None] * 64
+        self._terms = [None] * 64     # Слова эпизода (для индекса)
+        self._views = [None] * 64
+        self._n_rows = 0
+        self._free = []
+        self._order = None    # Кэш списка эпизодов
+        
+        # Обратный индекс
+        self._postings = {}   # слово → {id эпизода}
+        self._by_id = {}      # id → строка
+        self._next_id = 0
+        
+        # Частота тем по живым эпизодам (для обобщений при консолидации)
+        self.topic_counts = {}
+        self._changed_topics = set()
+        
+        self.journal = Journal(self.SAVE_PATH)
+        self.segment = None           # Открывается в _load: поколение — из снимка
+        self._segment_gen = 0
         self._load()
     
+    @property
+    def episodes(self):
+        """Эпизоды по порядку сохранения (список только для чтения)"""
+        if self._order is None:
+            rows = self._rows()
+            rows = rows[np.argsort(self._cols["id"][rows], kind="stable")]
+            self._order = [self._views[row] for row in rows.tolist()]
+        return self._order
+    
     def store(self, summary, messages, valence, arousal):
         """
         Сохранить новый эпизод.
@@ -116,15 +236,29 @@ class EpisodicMemory:
             valence: Эмоциональная валентность (-1 до +1)
             arousal: Возбуждение (0 до 1)
         """
-        episode = Episode(summary, messages, valence, arousal)
-        self.episodes.append(episode)
+        episode = self._add({
+            "id": self._next_id,
+            "timestamp": time.time(),
+            "summary": summary,
+            "body": self.segment.append(messages[-10:]),
+            "words": _terms(summary, messages[-10:]),
+            "valence": valence,
+            "arousal": arousal,
+            "importance": _importance(valence, arousal),
+            "strength": 1.0,
+            "recall_count": 0,
+        })
+        self._log({"op": "insert", "episode": episode.to_record()})
         
         # Удаляем самые слабые если переполнение
-        if len(self.episodes) > self.max_episodes:
-            self.episodes.sort(key=lambda e: e.strength, reverse=True)
-            self.episodes = self.episodes[:self.max_episodes]
-        
-        self._save()
+        n_over = len(self._by_id) - self.max_episodes
+        if n_over > 0:
+            rows = self._rows()
+            weakest = np.argpartition(self._cols["strength"][rows], n_over - 1)[:n_over]
+            evicted = rows[weakest]
+            ids = self._cols["id"][evicted].tolist()
+            self._remove(evicted)
+            self._log({"op": "delete", "ids": ids})
     
     def recall(self, query, top_k=3):
         """
@@ -137,90 +271,427 @@ class EpisodicMemory:
         Returns:
             list: Список эпизодов (словари)
         """
-        if not self.episodes:
+        if not self._by_id:
             return []
         
-        query_words = set(query.lower().split())
+        # Совпадение слов запроса со словами эпизодов — по индексу
+        overlap = {}
+        for word in set(query.lower().split()):
+            for ep_id in self._postings.get(word, ()):
+                overlap[ep_id] = overlap.get(ep_id, 0) + 1
         
-        scored = []
-        for ep in self.episodes:
-            # Совпадение слов в summary и messages
-            ep_text = ep.summary.lower()
-            for msg in ep.messages:
-                ep_text += " " + msg.get("content", "").lower()
-            
-            ep_words = set(ep_text.split())
-            overlap = len(query_words & ep_words)
-            
-            if overlap > 0:
-                # Оценка = совпадение * сила * важность
-                score = overlap * ep.strength * ep.importance
-                scored.append((ep, score))
+        # Оценка = совпадение * сила * важность; top-k через кучу
+        # (при равной оценке — более старый эпизод)
+        strength = self._cols["strength"]
+        importance = self._cols["importance"]
         
-        # Сортируем по оценке
-        scored.sort(key=lambda x: x[1], reverse=True)
+        def score(ep_id):
+            row = self._by_id[ep_id]
+            return (overlap[ep_id] * strength[row] * importance[row], -ep_id)
+        
+        best = heapq.nlargest(top_k, overlap, key=score)
         
         # Отмечаем что вспомнили (усиливает память)
         results = []
-        for ep, score in scored[:top_k]:
+        for ep_id in best:
+            ep = self._views[self._by_id[ep_id]]
             ep.recall()
             results.append(ep.to_dict())
         
-        self._save()
+        if best:
+            self._log({"op": "recall", "ids": best})
         return results
     
+    def reinforce(self, episodes, amount=0.05):
+        """
+        Усилить эпизоды (replay во сне).
+        
+        Args:
+            episodes: Какие эпизоды
+            amount: Прибавка к силе
+        """
+        ids = [ep.id for ep in episodes]
+        self._reinforce(ids, amount)
+        if ids:
+            self._log({"op": "reinforce", "ids": ids, "amount": amount})
+    
     def get_recent(self, n=5):
         """Последние n эпизодов"""
-        sorted_eps = sorted(self.episodes, key=lambda e: e.timestamp, reverse=True)
-        return [ep.to_dict() for ep in sorted_eps[:n]]
+        rows = self._rows()
+        if n < len(rows):
+            rows = rows[np.argpartition(-self._cols["timestamp"][rows], n - 1)[:n]]
+        rows = rows[np.argsort(-self._cols["timestamp"][rows], kind="stable")]
+        return [self._views[row].to_dict() for row in rows.tolist()]
     
     def decay_all(self, hours=1):
         """
         Забывание: ослабить все воспоминания.
         Вызывается периодически.
         """
-        alive = []
-        for ep in self.episodes:
-            hours_since = (time.time() - ep.timestamp) / 3600
-            if ep.decay(hours_since):
-                alive.append(ep)
+        now = time.time()
+        forgotten = self._decay(now)
         
-        forgotten = len(self.episodes) - len(alive)
-        self.episodes = alive
+        # Забывание детерминировано — в журнал идёт только время
+        self._log({"op": "decay", "now": now})
+        return forgotten
+    
+    def consolidate(self, cycles, min_importance=0.5, min_strength=0.3):
+        """
+        Несколько циклов сна (replay важных + забывание) одним проходом.
         
-        if forgotten > 0:
-            self._save()
+        Args:
+            cycles: Сколько циклов
+            min_importance: Прокручиваются эпизоды важнее этого...
+            min_strength: ...и сильнее этого
+            
+        Returns:
+            tuple: (сколько раз эпизоды прокручены, сколько забыто)
+        """
+        if cycles <= 0:
+            return 0, 0
         
-        return forgotten
+        now = time.time()
+        result = self._consolidate(now, cycles, min_importance, min_strength)
+        
+        # В журнал — одна запись на весь сон
+        self._log({
+            "op": "consolidate", "now": now, "cycles": cycles,
+            "min_importance": min_importance, "min_strength": min_strength,
+        })
+        return result
     
     def get_stats(self):
         """Статистика"""
-        if not self.episodes:
+        rows = self._rows()
+        if len(rows) == 0:
             return {"count": 0, "avg_strength": 0, "avg_importance": 0}
         
         return {
-            "count": len(self.episodes),
-            "avg_strength": round(np.mean([e.strength for e in self.episodes]), 3),
-            "avg_importance": round(np.mean([e.importance for e in self.episodes]), 3),
+            "count": len(rows),
+            "avg_strength": round(float(self._cols["strength"][rows].mean()), 3),
+            "avg_importance": round(float(self._cols["importance"][rows].mean()), 3),
         }
     
-    def _save(self):
-        """Сохранить на диск"""
-        os.makedirs(os.path.dirname(self.SAVE_PATH), exist_ok=True)
-        data = [ep.to_dict() for ep in self.episodes]
+    def changed_topics(self):
+        """
+        Темы, частота которых менялась с прошлого вызова.
+        
+        Returns:
+            dict: {тема: текущая частота}
+        """
+        changed, self._changed_topics = self._changed_topics, set()
+        return {topic: self.topic_counts.get(topic, 0) for topic in changed}
+    
+    def get_topic_counts(self):
+        """Частота тем по живым эпизодам (копия)"""
+        return dict(self.topic_counts)
+    
+    def replay_candidates(self, min_importance=0.5, min_strength=0.3):
+        """
+        Эпизоды для replay во сне: важные и ещё не забытые.
+        
+        Returns:
+            list: id эпизодов, самые важные первыми (при равенстве — по порядку сохранения)
+        """
+        c = self._cols
+        rows = self._rows()
+        rows = rows[(c["importance"][rows] > min_importance) & (c["strength"][rows] > min_strength)]
+        rows = rows[np.argsort(c["id"][rows], kind="stable")]
+        rows = rows[np.argsort(-c["importance"][rows], kind="stable")]
+        return c["id"][rows].tolist()
+    
+    def replay_texts(self, ids):
+        """
+        Тексты эпизодов (summary + сообщения) для replay.
+        
+        Args:
+            ids: id эпизодов
+        
+        Returns:
+            list: Тексты только ещё живых эпизодов, в порядке ids
+        """
+        texts = []
+        for ep_id in ids:
+            row = self._by_id.get(ep_id)
+            if row is None:
+                continue  # Забыт, пока сон ждал
+            episode = self._views[row]
+            texts.append(" ".join([episode.summary] + [m.get("content", "") for m in episode.messages]))
+        return texts
+    
+    def compact(self, background=True):
+        """
+        Свернуть журнал в снимок (обычно вызывается само).
+        
+        Returns:
+            bool: Без background — записан ли снимок
+        """
+        data = {
+            "next_id": self._next_id,
+            "segment": self._segment_gen,
+            "episodes": [ep.to_record() for ep in self.episodes],
+        }
+        return self.journal.compact(data, background=background)
+    
+    def _body(self, row):
+        """Сообщения эпизода из сегмента (через LRU кэш)"""
+        c = self._cols
+        if c["body_length"][row] == 0:
+            return []
+        messages = self.segment.read(int(c["body_offset"][row]), int(c["body_length"][row]))
+        return messages if messages is not None else []
+    
+    def _segment_path(self, gen):
+        """Файл сегмента тел данного поколения"""
+        base = os.path.splitext(self.SAVE_PATH)[0]
+        return base + ".bodies" if gen == 0 else f"{base}.{gen}.bodies"
+    
+    def _reclaim(self):
+        """
+        Убрать из сегмента тела удалённых эпизодов (при старте).
+        
+        Живые тела копируются в файл следующего поколения, снимок
+        переключается на него, старый файл удаляется. Сбой до записи
+        снимка оставляет старый файл и старый снимок в силе.
+        
+        Returns:
+            bool: Переписан ли сегмент
+        """
+        size = self.segment.size()
+        rows = self._rows()
+        c = self._cols
+        if size < EPISODE_BODY_RECLAIM or 2 * int(c["body_length"][rows].sum()) >= size:
+            return False
+        
+        gen = self._segment_gen + 1
+        old = (self.segment, self._segment_gen, c["body_offset"][rows], c["body_length"][rows])
         try:
-            with open(self.SAVE_PATH, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            addresses = self.segment.copy(zip(old[2].tolist(), old[3].tolist()), self._segment_path(gen))
         except Exception:
-            pass
+            return False
+        if addresses:
+            c["body_offset"][rows], c["body_length"][rows] = np.array(addresses).T
+        self.segment = Segment(self._segment_path(gen), cache_size=EPISODE_BODY_CACHE)
+        self._segment_gen = gen
+        
+        if not self.compact(background=False):
+            # Снимок не записан — он по-прежнему ссылается на старый файл
+            self.segment, self._segment_gen, c["body_offset"][rows], c["body_length"][rows] = old
+            return False
+        old[0].close()
+        try:
+            os.remove(old[0].path)
+        except OSError:
+            pass  # Уберётся при следующем старте
+        return True
+    
+    def _rows(self):
+        """Строки живых эпизодов"""
+        return np.nonzero(self._alive[:self._n_rows])[0]
+    
+    def _decay(self, now):
+        """Забывание на момент now (одним выражением); возвращает число забытых"""
+        rows = self._rows()
+        c = self._cols
+        hours_since = (now - c["timestamp"][rows]) / 3600
+        strength = _decayed_strength(c["importance"][rows], c["recall_count"][rows], hours_since)
+        c["strength"][rows] = strength
+        
+        forgotten = rows[strength <= 0.05]
+        self._remove(forgotten)
+        return len(forgotten)
+    
+    def _consolidate(self, now, cycles, min_importance, min_strength):
+        """
+        Циклы сна в замкнутой форме.
+        
+        Цикл: replay (recall_count + 1 важным и сильным), потом
+        забывание — сила пересчитывается из важности, recall_count и
+        возраста. После первого цикла сила растёт с recall_count:
+        кто прошёл отбор во втором цикле, проходит и во всех следующих.
+        """
+        rows = self._rows()
+        c = self._cols
+        importance = c["importance"][rows]
+        recall_count = c["recall_count"][rows]
+        hours_since = (now - c["timestamp"][rows]) / 3600
+        
+        first = (importance > min_importance) & (c["strength"][rows] > min_strength)
+        after_first = _decayed_strength(importance, recall_count + first, hours_since)
+        later = (importance > min_importance) & (after_first > min_strength)
+        
+        replays = first.astype(np.int64) + (cycles - 1) * later
+        c["recall_count"][rows] = recall_count + replays
+        
+        forgotten = self._decay(now)
+        return int(replays.sum()), forgotten
+    
+    def _reinforce(self, ids, amount):
+        rows = np.array([self._by_id[i] for i in ids if i in self._by_id], dtype=np.int64)
+        c = self._cols
+        c["strength"][rows] = np.minimum(1.0, c["strength"][rows] + amount)
+        np.add.at(c["recall_count"], rows, 1)
+    
+    def _log(self, record):
+        """Записать изменение в журнал; изредка — свернуть в снимок"""
+        self.journal.append(record)
+        if self.journal.pending >= EPISODE_COMPACT_EVERY:
+            self.compact()
+    
+    def _apply(self, record):
+        """Повторить запись журнала при загрузке"""
+        op = record["op"]
+        if op == "insert":
+            data = record["episode"]
+            if data.get("id") in self._by_id:
+                self._remove(np.array([self._by_id[data["id"]]]))
+            self._add(data)
+        elif op == "delete":
+            rows = [self._by_id[i] for i in record["ids"] if i in self._by_id]
+            self._remove(np.array(rows, dtype=np.int64))
+        elif op == "recall":
+            for ep_id in record["ids"]:
+                row = self._by_id.get(ep_id)
+                if row is not None:
+                    self._views[row].recall()
+        elif op == "reinforce":
+            self._reinforce(record["ids"], record["amount"])
+        elif op == "decay":
+            self._decay(record["now"])
+        elif op == "consolidate":
+            self._consolidate(record["now"], record["cycles"],
+                              record["min_importance"], record["min_strength"])
     
     def _load(self):
-        """Загрузить с диска"""
-        if not os.path.exists(self.SAVE_PATH):
-            return
+        """Загрузить с диска: снимок + хвост журнала"""
+        snapshot, records = self.journal.load()
+        self._migrated = False
+        
+        # Старый формат снимка — просто список эпизодов
+        if isinstance(snapshot, dict):
+            episodes = snapshot.get("episodes", [])
+            self._next_id = snapshot.get("next_id", 0)
+            self._segment_gen = snapshot.get("segment", 0)
+        else:
+            episodes = snapshot or []
+        self.segment = Segment(self._segment_path(self._segment_gen), cache_size=EPISODE_BODY_CACHE)
+        
+        # Файлы соседних поколений — остатки прерванной чистки сегмента
+        for gen in (self._segment_gen - 1, self._segment_gen + 1):
+            path = self._segment_path(gen)
+            if gen >= 0 and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        
+        # Старые файлы — без id: раздаём после максимального
+        self._next_id = max(
+            self._next_id,
+            1 + max((d["id"] for d in episodes if d.get("id") is not None), default=-1),
+        )
         try:
-            with open(self.SAVE_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            self.episodes = [Episode.from_dict(d) for d in data]
+            for data in episodes:
+                self._add(data)
         except Exception:
-            self.episodes = []
\ No newline at end of file
+            self._remove(self._rows())
+        
+        for record in records:
+            try:
+                self._apply(record)
+            except Exception:
+                pass
+        
+        # Сообщения из старого формата перенесены в сегмент — снимок без них
+        if self._migrated:
+            self.compact(background=False)
+        self._reclaim()
+    
+    def _add(self, data):
+        """Новая строка из словаря (формат Episode.to_dict); возвращает эпизод"""
+        if self._free:
+            row = self._free.pop()
+        else:
+            row = self._n_rows
+            if row == len(self._alive):
+                self._grow()
+            self._n_rows += 1
+        
+        ep_id = data.get("id")
+        if ep_id is None:
+            ep_id = self._next_id
+        self._next_id = max(self._next_id, ep_id + 1)
+        
+        c = self._cols
+        c["id"][row] = ep_id
+        c["timestamp"][row] = data["timestamp"]
+        c["valence"][row] = data["valence"]
+        c["arousal"][row] = data.get("arousal", 0.5)
+        c["importance"][row] = data["importance"]
+        c["strength"][row] = data["strength"]
+        c["recall_count"][row] = data.get("recall_count", 0)
+        self._summaries[row] = data["summary"]
+        if "body" in data:
+            offset, length = data["body"]
+            terms = data.get("words")
+        else:
+            # Старый формат: сообщения прямо в записи → переносим в сегмент
+            messages = data.get("messages", [])[-10:]
+            offset, length = self.segment.append(messages)
+            terms = _terms(data["summary"], messages)
+            self._migrated = True
+        c["body_offset"][row] = offset
+        c["body_length"][row] = length
+        self._terms[row] = terms if terms is not None else _terms(data["summary"], [])
+        self._alive[row] = True
+        
+        episode = Episode(self, row)
+        self._views[row] = episode
+        self._by_id[ep_id] = row
+        self._order = None
+        
+        # Обратный индекс
+        for word in episode.words():
+            self._postings.setdefault(word, set()).add(ep_id)
+        self._count_topics(episode.summary, +1)
+        return episode
+    
+    def _remove(self, rows):
+        """Удалить строки (и убрать эпизоды из индекса)"""
+        for row in rows.tolist():
+            episode = self._views[row]
+            ep_id = episode.id
+            for word in episode.words():
+                ids = self._postings.get(word)
+                if ids is not None:
+                    ids.discard(ep_id)
+                    if not ids:
+                        del self._postings[word]
+            del self._by_id[ep_id]
+            self._count_topics(episode.summary, -1)
+            
+            self._alive[row] = False
+            self._summaries[row] = None
+            self._terms[row] = None
+            self._views[row] = None
+            self._free.append(row)
+        self._order = None
+    
+    def _count_topics(self, summary, delta):
+        for topic in _topics(summary):
+            count = self.topic_counts.get(topic, 0) + delta
+            if count > 0:
+                self.topic_counts[topic] = count
+            else:
+                self.topic_counts.pop(topic, None)
+            self._changed_topics.add(topic)
+    
+    def _grow(self):
+        """Удвоить ёмкость столбцов"""
+        n = len(self._alive)
+        for name, column in self._cols.items():
+            self._cols[name] = np.concatenate([column, np.zeros(n, dtype=column.dtype)])
+        self._alive = np.concatenate([self._alive, np.zeros(n, dtype=bool)])
+        self._summaries.extend([None] * n)
+        self._terms.extend([None] * n)
+        self._views.extend([None] * n)
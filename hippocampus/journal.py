@@ -0,0 +1,168 @@
+"""
+Журнал изменений памяти (append-only).
+
+Вместо перезаписи всего архива на каждое изменение —
+одна строка JSON в конец файла: запись O(1).
+
+Время от времени журнал сворачивается в снимок (compaction):
+  1. Текущий журнал переименовывается в .old, новые записи идут в новый
+  2. В фоне снимок пишется атомарно, потом .old удаляется
+При старте: снимок + хвост журнала (.old и текущий).
+
+Каждая запись получает номер (seq), снимок помнит последний
+учтённый номер — записи, уже вошедшие в снимок, не применяются дважды.
+"""
+
+import json
+import os
+import threading
+
+from limbic.persistence import atomic_write_json
+
+
+class Journal:
+    """
+    Снимок + журнал одного хранилища.
+
+    Один писатель на файл (один экземпляр в процессе).
+    """
+
+    def __init__(self, snapshot_path, journal_path=None):
+        """
+        Args:
+            snapshot_path: Файл снимка (JSON)
+            journal_path: Файл журнала (по умолчанию рядом, .journal)
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + ".journal"
+        self.old_path = self.journal_path + ".old"
+
+        self.seq = 0        # Номер последней записи
+        self.pending = 0    # Записей со времени последнего снимка
+
+        self._file = None
+        self._lock = threading.Lock()
+        self._compactor = None
+
+    def load(self):
+        """
+        Прочитать снимок и хвост журнала.
+
+        Returns:
+            tuple: (данные снимка или None, [записи журнала после снимка])
+        """
+        snapshot = None
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                if isinstance(stored, dict) and "seq" in stored:
+                    snapshot, snapshot_seq = stored["data"], stored["seq"]
+                else:
+                    snapshot = stored  # Старый формат: просто данные
+            except Exception:
+                pass
+
+        records = []
+        for path in (self.old_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Недописанная строка (сбой при записи)
+                    if record.get("seq", 0) > snapshot_seq:
+                        records.append(record)
+
+        self.seq = max([snapshot_seq] + [r["seq"] for r in records])
+        self.pending = len(records)
+        return snapshot, records
+
+    def append(self, record):
+        """
+        Дописать запись в конец журнала.
+
+        Args:
+            record: dict (сериализуемый в JSON); получает поле seq
+        """
+        with self._lock:
+            self.seq += 1
+            record["seq"] = self.seq
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+                    self._file = open(self.journal_path, "a", encoding="utf-8")
+                self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                self._file.flush()
+            except Exception:
+                pass
+            self.pending += 1
+
+    def compact(self, data, background=True):
+        """
+        Свернуть журнал в снимок.
+
+        Args:
+            data: Текущее состояние целиком (снимок)
+            background: Писать снимок в фоновом потоке
+
+        Returns:
+            bool: False если предыдущая свёртка ещё идёт
+                (без background — записан ли снимок)
+        """
+        if self._compactor is not None and self._compactor.is_alive():
+            return False
+
+        with self._lock:
+            # Новые записи — уже в новый журнал
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.exists(self.journal_path):
+                try:
+                    if os.path.exists(self.old_path):
+                        # Прошлый снимок не записался — .old ещё нужен, дописываем в него
+                        with open(self.journal_path, "r", encoding="utf-8") as src, \
+                                open(self.old_path, "a", encoding="utf-8") as dst:
+                            dst.write(src.read())
+                        os.remove(self.journal_path)
+                    else:
+                        os.replace(self.journal_path, self.old_path)
+                except OSError:
+                    return False
+            snapshot = {"seq": self.seq, "data": data}
+            self.pending = 0
+
+        if background:
+            self._compactor = threading.Thread(target=self._write_snapshot, args=(snapshot,), daemon=True)
+            self._compactor.start()
+            return True
+        return self._write_snapshot(snapshot)
+
+    def wait(self):
+        """Дождаться фоновой свёртки"""
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def close(self):
+        """Закрыть файл журнала"""
+        self.wait()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write_snapshot(self, snapshot):
+        try:
+            atomic_write_json(self.snapshot_path, snapshot)
+        except Exception:
+            return False  # .old останется и будет прочитан при старте
+        try:
+            if os.path.exists(self.old_path):
+                os.remove(self.old_path)
+        except OSError:
+            pass  # Его записи уже в снимке (seq) и не применятся повторно
+        return True
@@ -0,0 +1,128 @@
+"""
+Сегмент тел эпизодов на диске (холодный уровень памяти).
+
+Метаданные эпизодов (время, сила, эмоции) живут в памяти,
+а сообщения — здесь: каждое тело сжимается zlib и дописывается
+в конец файла. Эпизод помнит только (смещение, длину), тело
+читается с диска, когда понадобилось, и кэшируется (LRU).
+
+Удалённые тела остаются в файле, пока владелец не перепишет
+живые записи в новый файл (copy) — EpisodicMemory делает это при старте.
+"""
+
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+
+class Segment:
+    """
+    Файл сжатых записей, адресуемых смещением.
+
+    Один писатель на файл (один экземпляр в процессе).
+    """
+
+    def __init__(self, path, cache_size=256):
+        """
+        Args:
+            path: Файл сегмента
+            cache_size: Сколько прочитанных записей держать в памяти
+        """
+        self.path = path
+        self.cache_size = cache_size
+
+        self._cache = OrderedDict()   # смещение → запись
+        self._writer = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def append(self, obj):
+        """
+        Дописать запись.
+
+        Args:
+            obj: Сериализуемое в JSON
+
+        Returns:
+            tuple: (смещение, длина) — адрес записи
+        """
+        blob = zlib.compress(json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            if self._writer is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._writer = open(self.path, "ab")
+            self._writer.seek(0, os.SEEK_END)
+            offset = self._writer.tell()
+            self._writer.write(blob)
+            self._writer.flush()
+            self._remember(offset, obj)
+        return offset, len(blob)
+
+    def read(self, offset, length):
+        """
+        Прочитать запись по адресу.
+
+        Returns:
+            Запись или None, если её не прочитать (файл повреждён)
+        """
+        with self._lock:
+            if offset in self._cache:
+                self._cache.move_to_end(offset)
+                return self._cache[offset]
+            try:
+                if self._reader is None:
+                    self._reader = open(self.path, "rb")
+                self._reader.seek(offset)
+                obj = json.loads(zlib.decompress(self._reader.read(length)).decode("utf-8"))
+            except Exception:
+                return None
+            self._remember(offset, obj)
+            return obj
+
+    def copy(self, addresses, path):
+        """
+        Переписать записи в новый файл как есть, без распаковки (сборка мусора).
+
+        Args:
+            addresses: Список адресов (смещение, длина)
+            path: Новый файл (перезаписывается)
+
+        Returns:
+            list: Новые адреса (смещение, длина) в том же порядке
+        """
+        copied = []
+        with self._lock:
+            if self._reader is None:
+                self._reader = open(self.path, "rb")
+            with open(path, "wb") as dst:
+                for offset, length in addresses:
+                    self._reader.seek(offset)
+                    blob = self._reader.read(length)
+                    copied.append((dst.tell(), len(blob)))
+                    dst.write(blob)
+                dst.flush()
+                os.fsync(dst.fileno())
+        return copied
+
+    def size(self):
+        """Размер файла в байтах (0 если его ещё нет)"""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def close(self):
+        """Закрыть файлы"""
+        with self._lock:
+            for f in (self._writer, self._reader):
+                if f is not None:
+                    f.close()
+            self._writer = self._reader = None
+
+    def _remember(self, offset, obj):
+        self._cache[offset] = obj
+        self._cache.move_to_end(offset)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -9,12 +9,37 @@
 
 import json
 import os
+import re
 import time
 from datetime import datetime
 
 import numpy as np
 
 
+# Шаблоны для извлечения: триггер → начало факта
+PATTERNS = {
+    "меня зовут ": "Имя собеседника: ",
+    "я люблю ": "Собеседник любит ",
+    "мне нравится ": "Собеседнику нравится ",
+    "я работаю ": "Собеседник работает ",
+    "я живу в ": "Собеседник живёт в ",
+    "я не люблю ": "Собеседник не любит ",
+    "я ненавижу ": "Собеседник ненавидит ",
+    "мой любимый ": "Любимый у собеседника — ",
+    "моя любимая ": "Любимая у собеседника — ",
+    "я хочу ": "Собеседник хочет ",
+    "я мечтаю ": "Собеседник мечтает ",
+    "я боюсь ": "Собеседник боится ",
+    "я умею ": "Собеседник умеет ",
+}
+
+# Все триггеры — одна регулярка (длинные первыми): один проход по тексту
+_TRIGGERS = re.compile("|".join(re.escape(t) for t in sorted(PATTERNS, key=len, reverse=True)))
+
+# Значение — до конца фразы
+_VALUE = re.compile(r"[^.,!]*")
+
+
 class SemanticMemory:
     """
     Память фактов и знаний.
@@ -35,22 +60,38 @@ class SemanticMemory:
             source: Откуда узнала
             importance: Важность (0-1)
         """
-        key = fact.lower().strip()
+        self.store_many([fact], source=source, importance=importance)
+    
+    def store_many(self, facts, source="разговор", importance=0.5):
+        """
+        Запомнить несколько фактов одной записью на диск.
         
-        if key in self.facts:
-            # Уже знаем — усиливаем
-            self.facts[key]["strength"] = min(1.0, self.facts[key]["strength"] + 0.2)
-            self.facts[key]["updated"] = datetime.now().strftime("%Y-%m-%d %H:%M")
-        else:
-            # Новый факт
-            self.facts[key] = {
-                "text": fact,
-                "source": source,
-                "strength": min(1.0, 0.5 + importance * 0.5),
-                "importance": importance,
-                "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "updated": datetime.now().strftime("%Y-%m-%d %H:%M"),
-            }
+        Args:
+            facts: Тексты фактов
+            source: Откуда узнала
+            importance: Важность (0-1)
+        """
+        if not facts:
+            return
+        
+        now = datetime.now().strftime("%Y-%m-%d %H:%M")
+        for fact in facts:
+            key = fact.lower().strip()
+            
+            if key in self.facts:
+                # Уже знаем — усиливаем
+                self.facts[key]["strength"] = min(1.0, self.facts[key]["strength"] + 0.2)
+                self.facts[key]["updated"] = now
+            else:
+                # Новый факт
+                self.facts[key] = {
+                    "text": fact,
+                    "source": source,
+                    "strength": min(1.0, 0.5 + importance * 0.5),
+                    "importance": importance,
+                    "created": now,
+                    "updated": now,
+                }
         
         self._save()
     
@@ -82,38 +123,30 @@ class SemanticMemory:
         scored.sort(key=lambda x: x[1], reverse=True)
         return [text for text, score in scored[:top_k]]
     
-    def extract_facts(self, user_text):
+    def extract_facts(self, user_text, lowered=None):
         """
         Автоматически извлечь факты из текста пользователя.
         
         Args:
             user_text: Что сказал пользователь
+            lowered: Тот же текст в нижнем регистре, если уже есть
         """
-        text = user_text.lower()
+        text = lowered if lowered is not None else user_text.lower()
         
-        # Шаблоны для извлечения
-        patterns = [
-            ("меня зовут ", "Имя собеседника: "),
-            ("я люблю ", "Собеседник любит "),
-            ("мне нравится ", "Собеседнику нравится "),
-            ("я работаю ", "Собеседник работает "),
-            ("я живу в ", "Собеседник живёт в "),
-            ("я не люблю ", "Собеседник не любит "),
-            ("я ненавижу ", "Собеседник ненавидит "),
-            ("мой любимый ", "Любимый у собеседника — "),
-            ("моя любимая ", "Любимая у собеседника — "),
-            ("я хочу ", "Собеседник хочет "),
-            ("я мечтаю ", "Собеседник мечтает "),
-            ("я боюсь ", "Собеседник боится "),
-            ("я умею ", "Собеседник умеет "),
-        ]
+        # Все триггеры за один проход; каждый — по первому вхождению
+        found = {}
+        for match in _TRIGGERS.finditer(text):
+            trigger = match.group()
+            if trigger not in found:
+                value = _VALUE.match(user_text, match.end()).group().strip()
+                found[trigger] = value
         
-        for trigger, prefix in patterns:
-            if trigger in text:
-                idx = text.index(trigger) + len(trigger)
-                value = user_text[idx:].split(".")[0].split(",")[0].split("!")[0].strip()
-                if value and len(value) < 100:
-                    self.store(prefix + value, source="разговор", importance=0.7)
+        facts = [
+            PATTERNS[trigger] + value
+            for trigger, value in found.items()
+            if value and len(value) < 100
+        ]
+        self.store_many(facts, source="разговор", importance=0.7)
     
     def get_all(self):
         """Все факты"""
@@ -126,11 +159,17 @@ class SemanticMemory:
             "strong": sum(1 for f in self.facts.values() if f["strength"] > 0.5),
         }
     
-    def decay_all(self):
-        """Ослабить старые факты"""
+    def decay_all(self, cycles=1):
+        """
+        Ослабить старые факты.
+        
+        Args:
+            cycles: Сколько циклов забывания применить разом
+        """
+        factor = 0.999 ** cycles  # Очень медленное забывание
         to_delete = []
         for key, fact in self.facts.items():
-            fact["strength"] *= 0.999  # Очень медленное забывание
+            fact["strength"] *= factor
             if fact["strength"] < 0.05:
                 to_delete.append(key)
         
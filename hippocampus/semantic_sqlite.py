@@ -0,0 +1,223 @@
+"""
+Семантическая память на SQLite — для большой базы фактов.
+
+SemanticMemory держит все факты в словаре и на каждое
+изменение переписывает facts.json. Здесь:
+- Факт — строка таблицы, запоминание — upsert (пачка — одна транзакция)
+- Поиск — полнотекстовый индекс FTS5, ранжирование bm25 × сила
+- Забывание — один UPDATE и один DELETE на всю базу
+- Режим WAL: чтение не ждёт записи
+
+Включается в config: SEMANTIC_BACKEND = "sqlite".
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime
+
+from hippocampus.semantic import SemanticMemory
+
+
+_WORD = re.compile(r"\w+")
+
+_FIELDS = ("text", "source", "strength", "importance", "created", "updated")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL,
+    source TEXT,
+    strength REAL NOT NULL,
+    importance REAL,
+    created TEXT,
+    updated TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS facts_fts USING fts5(
+    key, content='facts', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS facts_ai AFTER INSERT ON facts BEGIN
+    INSERT INTO facts_fts(rowid, key) VALUES (new.id, new.key);
+END;
+CREATE TRIGGER IF NOT EXISTS facts_ad AFTER DELETE ON facts BEGIN
+    INSERT INTO facts_fts(facts_fts, rowid, key) VALUES ('delete', old.id, old.key);
+END;
+"""
+
+
+class SQLiteSemanticMemory(SemanticMemory):
+    """
+    Память фактов и знаний в SQLite.
+    
+    Интерфейс как у SemanticMemory; facts — словарь только
+    для чтения, который читает базу.
+    """
+    
+    DB_PATH = os.path.join("data", "memory", "facts.db")
+    
+    def __init__(self):
+        os.makedirs(os.path.dirname(self.DB_PATH), exist_ok=True)
+        self._db = sqlite3.connect(self.DB_PATH, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        
+        self.facts = _FactsView(self)
+        self._load()
+    
+    def store(self, fact, source="разговор", importance=0.5):
+        """
+        Запомнить факт (уже знакомый — усиливается).
+        
+        Args:
+            fact: Текст факта
+            source: Откуда узнала
+            importance: Важность (0-1)
+        """
+        self.store_many([fact], source=source, importance=importance)
+    
+    def store_many(self, facts, source="разговор", importance=0.5):
+        """
+        Запомнить несколько фактов одной транзакцией.
+        
+        Args:
+            facts: Тексты фактов
+            source: Откуда узнала
+            importance: Важность (0-1)
+        """
+        if not facts:
+            return
+        
+        now = datetime.now().strftime("%Y-%m-%d %H:%M")
+        strength = min(1.0, 0.5 + importance * 0.5)
+        rows = [(fact.lower().strip(), fact, source, strength, importance, now, now) for fact in facts]
+        with self._lock, self._transaction():
+            self._db.executemany(
+                "INSERT INTO facts (key, text, source, strength, importance, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "strength = min(1.0, strength + 0.2), updated = excluded.updated",
+                rows,
+            )
+    
+    def recall(self, query, top_k=5):
+        """
+        Вспомнить факты по теме.
+        
+        Args:
+            query: Текст запроса
+            top_k: Сколько фактов вернуть
+            
+        Returns:
+            list: Список фактов (строки)
+        """
+        words = set(_WORD.findall(query.lower()))
+        if not words:
+            return []
+        
+        # Любое из слов; bm25 отрицателен — чем меньше, тем лучше
+        match = " OR ".join(f'"{word}"' for word in sorted(words))
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT f.text FROM facts_fts JOIN facts f ON f.id = facts_fts.rowid "
+                "WHERE facts_fts MATCH ? ORDER BY bm25(facts_fts) * f.strength LIMIT ?",
+                (match, top_k),
+            ).fetchall()
+        return [text for (text,) in rows]
+    
+    def get_all(self):
+        """Все факты"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT text FROM facts WHERE strength > 0.1 ORDER BY id"
+            ).fetchall()
+        return [text for (text,) in rows]
+    
+    def get_stats(self):
+        """Статистика"""
+        with self._lock:
+            count, strong = self._db.execute(
+                "SELECT count(*), coalesce(sum(strength > 0.5), 0) FROM facts"
+            ).fetchone()
+        return {"count": count, "strong": strong}
+    
+    def decay_all(self, cycles=1):
+        """
+        Ослабить старые факты.
+        
+        Args:
+            cycles: Сколько циклов забывания применить разом
+        """
+        factor = 0.999 ** cycles  # Очень медленное забывание
+        with self._lock, self._transaction():
+            self._db.execute("UPDATE facts SET strength = strength * ?", (factor,))
+            forgotten = self._db.execute("DELETE FROM facts WHERE strength < 0.05").rowcount
+        return forgotten
+    
+    def close(self):
+        """Закрыть базу"""
+        with self._lock:
+            self._db.close()
+    
+    @contextmanager
+    def _transaction(self):
+        """BEGIN … COMMIT; при ошибке — ROLLBACK (соединение остаётся рабочим)"""
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+    
+    def _save(self):
+        """Каждое изменение уже в базе"""
+    
+    def _load(self):
+        """Пустая база — перенести факты из facts.json (если есть)"""
+        if self.facts or not os.path.exists(self.SAVE_PATH):
+            return
+        try:
+            with open(self.SAVE_PATH, "r", encoding="utf-8") as f:
+                facts = json.load(f)
+            rows = [(key,) + tuple(fact.get(name) for name in _FIELDS) for key, fact in facts.items()]
+        except Exception:
+            return
+        
+        with self._lock, self._transaction():
+            self._db.executemany(
+                "INSERT OR IGNORE INTO facts (key, text, source, strength, importance, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+
+class _FactsView(Mapping):
+    """facts как словарь ключ → {text, source, strength, ...} (только чтение)"""
+    
+    def __init__(self, memory):
+        self._memory = memory
+    
+    def __getitem__(self, key):
+        with self._memory._lock:
+            row = self._memory._db.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM facts WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return dict(zip(_FIELDS, row))
+    
+    def __iter__(self):
+        with self._memory._lock:
+            keys = self._memory._db.execute("SELECT key FROM facts ORDER BY id").fetchall()
+        return iter([key for (key,) in keys])
+    
+    def __len__(self):
+        with self._memory._lock:
+            return self._memory._db.execute("SELECT count(*) FROM facts").fetchone()[0]
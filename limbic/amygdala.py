@@ -10,7 +10,12 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from config import LEXICON_CAPACITY, HISTORY_SIZE, HISTORY_HOURS
 from neurons.encoding import TextEncoder
+from limbic.lexicon import Lexicon
+from limbic.history import History
+from limbic.tokenizer import tokenize
+from limbic.morphology import normalize
 
 
 class Amygdala:
@@ -18,16 +23,18 @@ class Amygdala:
     Амигдала — центр эмоциональной оценки.
     
     Каждое слово получает эмоциональный вес (от -1 до +1).
+    Веса хранятся по основам слов ("рад", "рада", "радость" → "рад").
     Текст оценивается как среднее весов известных слов.
     Обучается: новые слова получают веса через обратную связь.
     """
     
-    def __init__(self, input_size=100):
+    def __init__(self, input_size=100, lexicon_capacity=LEXICON_CAPACITY):
         self.input_size = input_size
+        self.lexicon_capacity = lexicon_capacity
         self.encoder = TextEncoder(n_neurons=input_size)
         
-        # Эмоциональный словарь: слово → вес (-1 до +1)
-        self.word_valence = {}
+        # Эмоциональный словарь: слово → вес (-1 до +1), ограниченного размера
+        self.word_valence = None
         
         # Текущее состояние
         self.valence = 0.0      # -1 (плохо) до +1 (хорошо)
@@ -39,9 +46,9 @@ class Amygdala:
         # Затухание к нейтральному
         self.decay_rate = 0.005
         
-        # История
-        self.valence_history = []
-        self.arousal_history = []
+        # История (последние значения + почасовая статистика)
+        self.valence_history = History(HISTORY_SIZE, HISTORY_HOURS)
+        self.arousal_history = History(HISTORY_SIZE, HISTORY_HOURS)
         
         # Врождённые слова
         self._pretrain()
@@ -81,59 +88,186 @@ class Amygdala:
             "terrible": -0.8, "awful": -0.8, "ugly": -0.6,
         }
         
-        self.word_valence = innate.copy()
+        # Врождённые слова не вытесняются из словаря
+        self.word_valence = Lexicon(self.lexicon_capacity, innate=_by_stem(innate))
+    
+    def valence_of(self, word):
+        """Вес слова (по его основе) или None если неизвестно"""
+        return self.word_valence.get(normalize(word.lower()))
+    
+    def lexicon_state(self):
+        """Снимок словаря для сохранения (ключи — основы)"""
+        state = self.word_valence.to_state()
+        state["stemmed"] = True
+        return state
+    
+    def load_lexicon(self, state):
+        """
+        Загрузить сохранённый словарь.
+        
+        Args:
+            state: Снимок lexicon_state() или старый формат
+                   ({слово: вес} либо снимок без основ) — тогда слова
+                   приводятся к основам, совпавшие усредняются
+        """
+        if state.get("stemmed"):
+            self.word_valence.load_state(state)
+            return
+        
+        if "words" in state:
+            words, values = state["words"], state["values"]
+            counts = state.get("counts") or [1.0] * len(words)
+        else:
+            words, values = list(state), list(state.values())
+            counts = [1.0] * len(words)
+        
+        merged = {}
+        for word, value, count in zip(words, values, counts):
+            stem = normalize(word)
+            total, n, uses = merged.get(stem, (0.0, 0, 0.0))
+            merged[stem] = (total + value, n + 1, uses + count)
+        
+        self.word_valence.load_state({
+            "words": list(merged),
+            "values": [total / n for total, n, _ in merged.values()],
+            "counts": [uses for _, _, uses in merged.values()],
+        })
     
     def process(self, text, n_steps=50):
         """
         Обработать текст и получить эмоциональную оценку.
         
         Args:
-            text: Входной текст
+            text: Входной текст (или уже разобранный TokenizedText)
             n_steps: Не используется (для совместимости)
         
         Returns:
             dict: {valence, arousal, emotion}
         """
-        words = text.lower().split()
+        return self.integrate(self.appraise(text))
+    
+    def appraise(self, text):
+        """
+        Оценить текст, не меняя состояния (и счётчиков словаря:
+        обращения к словам учтёт integrate).
         
-        if not words:
-            return self._make_result()
+        Args:
+            text: Текст или TokenizedText
+        
+        Returns:
+            dict: {valence, arousal, direct_valence, words} — сырые оценки текста
+                  и известные слова, или None для пустого текста
+        """
+        message = tokenize(text)
+        
+        if message.is_blank():
+            return None
         
         # Собираем оценки известных слов
-        known_valences = []
-        for word in words:
-            # Убираем знаки препинания
-            clean = word.strip(".,!?;:\"'()[]{}…")
-            if clean in self.word_valence:
-                known_valences.append(self.word_valence[clean])
+        valences = [self.word_valence.get(stem) for stem in message.stems]
+        known_words = [stem for stem, v in zip(message.stems, valences) if v is not None]
+        known_valences = [v for v in valences if v is not None]
         
         if known_valences:
             # Среднее эмоциональных слов
             raw_valence = float(np.mean(known_valences))
+            direct_valence = raw_valence
             
             # Возбуждение: чем сильнее эмоция, тем выше
             raw_arousal = float(np.mean([abs(v) for v in known_valences]))
             
             # Усиливаем если много эмоциональных слов
-            emotion_ratio = len(known_valences) / len(words)
+            emotion_ratio = len(known_valences) / len(message.tokens)
             raw_valence *= (0.5 + emotion_ratio)
             raw_arousal *= (0.5 + emotion_ratio)
         else:
             # Неизвестные слова → слабый сдвиг к нейтральному
             raw_valence = 0.0
             raw_arousal = 0.1
+            direct_valence = 0.0
         
         # Ограничиваем
-        raw_valence = float(np.clip(raw_valence, -1, 1))
-        raw_arousal = float(np.clip(raw_arousal, 0, 1))
+        return {
+            "valence": float(np.clip(raw_valence, -1, 1)),
+            "arousal": float(np.clip(raw_arousal, 0, 1)),
+            "direct_valence": direct_valence,
+            "words": known_words,
+        }
+    
+    def score_batch(self, texts):
+        """
+        Оценить много текстов разом, не меняя состояния.
+        
+        Та же оценка, что appraise(), но одним векторным проходом:
+        все токены → номера слов в словаре → bincount по текстам.
+        Не трогает valence/arousal, историю и счётчики словаря.
+        
+        Args:
+            texts: Список текстов (или TokenizedText)
+        
+        Returns:
+            dict: {valence, arousal, direct_valence, known} — массивы длины len(texts);
+                  direct_valence — среднее весов без усиления,
+                  known — сколько эмоциональных слов нашлось.
+                  Пустой текст → 0, 0, 0.
+        """
+        messages = [tokenize(t) for t in texts]
+        n = len(messages)
+        
+        lengths = np.array([len(m.tokens) for m in messages], dtype=np.int64)
+        rows = np.repeat(np.arange(n), lengths)
+        slots = self.word_valence.slots_of([stem for m in messages for stem in m.stems])
+        
+        known = slots >= 0
+        rows = rows[known]
+        values = self.word_valence.values[slots[known]].astype(float)
+        
+        n_known = np.bincount(rows, minlength=n)
+        total = np.bincount(rows, weights=values, minlength=n)
+        total_abs = np.bincount(rows, weights=np.abs(values), minlength=n)
+        
+        has_known = n_known > 0
+        safe_known = np.maximum(n_known, 1)
+        gain = 0.5 + n_known / np.maximum(lengths, 1)
+        
+        # Неизвестные слова → слабый сдвиг к нейтральному (как в appraise)
+        direct = np.where(has_known, total / safe_known, 0.0)
+        valence = direct * gain
+        arousal = np.where(has_known, total_abs / safe_known * gain, 0.1)
+        
+        blank = np.array([m.is_blank() for m in messages], dtype=bool)
+        arousal[blank] = 0.0
+        
+        return {
+            "valence": np.clip(valence, -1, 1),
+            "arousal": np.clip(arousal, 0, 1),
+            "direct_valence": direct,
+            "known": n_known,
+        }
+    
+    def integrate(self, appraisal):
+        """
+        Учесть оценку текста в текущем состоянии (инерция, затухание).
+        Обращения к словам текста засчитываются словарю (для вытеснения).
+        
+        Args:
+            appraisal: Результат appraise() (None — ничего не меняем)
+        
+        Returns:
+            dict: {valence, arousal, emotion}
+        """
+        if appraisal is None:
+            return self._make_result()
+        
+        self.word_valence.touch(appraisal.get("words", ()))
         
         # Затухание к нейтральному
         self.valence *= (1 - self.decay_rate)
         self.arousal *= (1 - self.decay_rate)
         
         # Инерция
-        self.valence = self.inertia * self.valence + (1 - self.inertia) * raw_valence
-        self.arousal = self.inertia * self.arousal + (1 - self.inertia) * raw_arousal
+        self.valence = self.inertia * self.valence + (1 - self.inertia) * appraisal["valence"]
+        self.arousal = self.inertia * self.arousal + (1 - self.inertia) * appraisal["arousal"]
         
         # Ограничиваем
         self.valence = float(np.clip(self.valence, -1, 1))
@@ -153,9 +287,15 @@ class Amygdala:
             "emotion": self._get_emotion_name()
         }
     
-    def _get_emotion_name(self):
-        """Название эмоции"""
-        v, a = self.valence, self.arousal
+    def _get_emotion_name(self, v=None, a=None):
+        """
+        Название эмоции.
+        
+        Args:
+            v, a: Валентность и arousal (по умолчанию — текущие)
+        """
+        if v is None:
+            v, a = self.valence, self.arousal
         
         if v > 0.3:
             if a > 0.5:
@@ -178,30 +318,23 @@ class Amygdala:
         Обучить: связать слова из текста с эмоцией.
         
         Args:
-            text: Текст
+            text: Текст или TokenizedText
             target_valence: Целевая валентность (-1 до +1)
             n_iterations: Сила обучения (больше = сильнее)
         """
-        words = text.lower().split()
         lr = 0.05 * n_iterations
         
-        for word in words:
-            clean = word.strip(".,!?;:\"'()[]{}…")
-            if not clean:
-                continue
-            
-            if clean in self.word_valence:
+        for clean in tokenize(text).stems:
+            current = self.word_valence.get(clean)
+            if current is not None:
                 # Сдвигаем существующий вес к цели
-                current = self.word_valence[clean]
-                self.word_valence[clean] = current + lr * (target_valence - current)
+                value = current + lr * (target_valence - current)
             else:
                 # Новое слово — записываем
-                self.word_valence[clean] = target_valence * lr
+                value = target_valence * lr
             
             # Ограничиваем
-            self.word_valence[clean] = float(np.clip(
-                self.word_valence[clean], -1, 1
-            ))
+            self.word_valence[clean] = float(np.clip(value, -1, 1))
     
     def feedback(self, text, is_positive):
         """
@@ -222,8 +355,8 @@ class Amygdala:
         """Сброс состояния (не словаря!)"""
         self.valence = 0.0
         self.arousal = 0.0
-        self.valence_history = []
-        self.arousal_history = []
+        self.valence_history.clear()
+        self.arousal_history.clear()
     
     def get_status(self):
         """Статус для отладки"""
@@ -232,4 +365,12 @@ class Amygdala:
             "arousal": round(self.arousal, 3),
             "emotion": self._get_emotion_name(),
             "known_words": self.get_known_words_count(),
-        }
\ No newline at end of file
+        }
+
+
+def _by_stem(words):
+    """{слово: вес} → {основа: средний вес}"""
+    groups = {}
+    for word, value in words.items():
+        groups.setdefault(normalize(word), []).append(value)
+    return {stem: float(np.mean(values)) for stem, values in groups.items()}
@@ -11,6 +11,9 @@
 
 import numpy as np
 
+from config import HISTORY_SIZE, HISTORY_HOURS
+from limbic.history import History
+
 
 class DopamineSystem:
     """
@@ -38,8 +41,8 @@ class DopamineSystem:
         self.baseline = 0.0
         
         # История
-        self.level_history = []
-        self.rpe_history = []  # Reward Prediction Error
+        self.level_history = History(HISTORY_SIZE, HISTORY_HOURS)
+        self.rpe_history = History(HISTORY_SIZE, HISTORY_HOURS)  # Reward Prediction Error
     
     def process(self, actual_reward):
         """
@@ -97,8 +100,8 @@ class DopamineSystem:
     def reset(self):
         """Сброс (не ожиданий!)"""
         self.level = 0.0
-        self.level_history = []
-        self.rpe_history = []
+        self.level_history.clear()
+        self.rpe_history.clear()
     
     def get_status(self):
         """Статус"""
@@ -10,9 +10,14 @@
 import numpy as np
 import json
 import os
+import time
+from functools import lru_cache
 
+from config import EMOTION_SAVE_INTERVAL
 from limbic.amygdala import Amygdala
 from limbic.dopamine import DopamineSystem
+from limbic.persistence import WriteBehind
+from limbic.tokenizer import tokenize
 
 
 EMOTION_STATE_FILE = os.path.join("data", "emotion_state.json")
@@ -23,7 +28,13 @@ class EmotionCore:
     Центральное эмоциональное ядро Элли.
     """
     
-    def __init__(self):
+    def __init__(self, state_file=EMOTION_STATE_FILE):
+        """
+        Args:
+            state_file: Файл сохранённого состояния
+        """
+        self.state_file = state_file
+        
         # Компоненты
         self.amygdala = Amygdala()
         self.dopamine = DopamineSystem()
@@ -35,32 +46,43 @@ class EmotionCore:
         # Энергия (усталость)
         self.energy = 1.0  # 0 (устала) до 1 (бодрая)
         self.energy_decay = 0.005  # Энергия падает с каждым взаимодействием
-        self.energy_recovery = 0.001  # Восстанавливается со временем
+        self.energy_recovery = 0.001  # Восстанавливается со временем (за минуту)
+        
+        # Затухание к нейтральному без общения (множитель за минуту)
+        self.mood_rest_decay = 0.99
+        self.affect_rest_decay = 0.95  # Валентность и arousal амигдалы
         
         # Сложные эмоции (формируются из базовых)
         self.attachment = 0.0  # Привязанность к собеседнику (0 до 1)
         self.trust = 0.5  # Доверие (0 до 1)
         
-        # Загружаем сохранённое состояние
+        # Когда состояние последний раз приводилось к текущему времени
+        self.updated_at = time.time()
+        
+        # Загружаем сохранённое состояние и учитываем время простоя
         self._load_state()
+        self._apply_elapsed()
+        
+        # Запись на диск — отложенная, в фоне; снимок берётся под
+        # блокировкой чтения, если ядро разделяют потоки (brain.concurrency)
+        self.state_lock = None
+        self._persister = WriteBehind(self.state_file, self._snapshot_state, EMOTION_SAVE_INTERVAL)
         
     def process(self, text):
+        # Сначала — отдых с прошлого обновления
+        self._apply_elapsed()
+        
+        # Разбираем сообщение один раз — дальше все работают с токенами
+        message = tokenize(text)
+        
         # 1. Амигдала оценивает текст
-        amygdala_result = self.amygdala.process(text)
+        appraisal = self.amygdala.appraise(message)
+        amygdala_result = self.amygdala.integrate(appraisal)
         valence = amygdala_result["valence"]
         arousal = amygdala_result["arousal"]
         
         # Прямая оценка текста (без инерции)
-        words = text.lower().split()
-        direct_valence = 0.0
-        count = 0
-        for w in words:
-            clean = w.strip(".,!?;:\"'()[]{}…")
-            if clean in self.amygdala.word_valence:
-                direct_valence += self.amygdala.word_valence[clean]
-                count += 1
-        if count > 0:
-            direct_valence = direct_valence / count
+        direct_valence = appraisal["direct_valence"] if appraisal else 0.0
         
         # 2. Дофамин оценивает неожиданность
         dopamine_result = self.dopamine.process(valence)
@@ -87,10 +109,10 @@ class EmotionCore:
         # 7. Дофамин влияет на обучение амигдалы
         boost = self.dopamine.get_learning_boost()
         if abs(dopamine_result["rpe"]) > 0.3:
-            self.amygdala.learn(text, valence, n_iterations=int(5 * boost))
+            self.amygdala.learn(message, valence, n_iterations=int(5 * boost))
         
-        # Сохраняем состояние
-        self._save_state()
+        # Состояние изменилось — запишется в фоне
+        self._persister.mark_dirty()
         
         return self._make_result(amygdala_result, dopamine_result)
     
@@ -119,120 +141,215 @@ class EmotionCore:
         """
         Отдых (когда нет взаимодействия).
         
+        Реальное время простоя учитывается само (_apply_elapsed),
+        rest() — для явного "прошло столько-то минут".
+        
         Args:
             minutes: Сколько минут отдыхала
         """
-        # Энергия восстанавливается
-        recovery = self.energy_recovery * minutes
-        self.energy = min(1.0, self.energy + recovery)
+        self._apply_elapsed()
+        self._decay(minutes)
+        self._persister.mark_dirty()
+    
+    def _decay(self, minutes):
+        """
+        Отдых в замкнутой форме: результат за N минут тот же,
+        что N раз по одной минуте, но за одно вычисление.
+        """
+        if minutes <= 0:
+            return
+        self.energy, self.mood, self.amygdala.valence, self.amygdala.arousal = self._rested(minutes)
+    
+    def _rested(self, minutes):
+        """
+        Состояние после minutes минут отдыха (текущее не меняется).
         
-        # Настроение стремится к нейтральному
-        self.mood *= 0.99
+        Returns:
+            tuple: (энергия, настроение, валентность, arousal)
+        """
+        minutes = max(0.0, minutes)
         
         # Валентность и arousal затухают
-        self.amygdala.valence *= 0.95
-        self.amygdala.arousal *= 0.95
+        affect = self.affect_rest_decay ** minutes
+        return (
+            min(1.0, self.energy + self.energy_recovery * minutes),  # Энергия восстанавливается
+            self.mood * self.mood_rest_decay ** minutes,             # Настроение → к нейтральному
+            self.amygdala.valence * affect,
+            self.amygdala.arousal * affect,
+        )
+    
+    def _current(self):
+        """Состояние на сейчас, с учётом простоя — без записи (для чтений)"""
+        return self._rested((time.time() - self.updated_at) / 60.0)
+    
+    def _apply_elapsed(self, now=None):
+        """Привести состояние к текущему времени (лениво, перед изменением)"""
+        if now is None:
+            now = time.time()
+        self._decay((now - self.updated_at) / 60.0)
+        self.updated_at = max(self.updated_at, now)
+    
+    def get_affect(self):
+        """
+        Валентность и arousal на текущий момент (с учётом простоя).
+        
+        Returns:
+            tuple: (valence, arousal)
+        """
+        _, _, valence, arousal = self._current()
+        return valence, arousal
     
     def get_context_for_llm(self):
         """
         Сформировать эмоциональный контекст для LLM.
         Это будет добавляться в промпт Ollama.
         
+        Одинаковое квантованное состояние (get_state_key) даёт
+        побайтно одинаковый текст — LLM переиспользует кэш промпта.
+        
         Returns:
             str: Описание эмоционального состояния
         """
-        v = self.amygdala.valence
-        a = self.amygdala.arousal
-        emotion = self.amygdala._get_emotion_name()
+        return _render_context(self.get_state_key())
+    
+    def get_state_key(self):
+        """
+        Квантованное состояние: только то, что различает текст контекста.
         
-        # Основная эмоция
-        parts = [f"\nТвоё эмоциональное состояние сейчас: {emotion}."]
+        Returns:
+            tuple: (эмоция, тон, энергия, дофамин, привязанность, доверие, настроение)
+        """
+        energy, mood, v, a = self._current()
         
-        # Тон общения
         if v > 0.5:
-            parts.append("Говоришь тепло, радостно, открыто.")
+            tone = "warm"
         elif v > 0.2:
-            parts.append("Говоришь дружелюбно и спокойно.")
+            tone = "friendly"
         elif v < -0.5:
-            parts.append("Говоришь сдержанно, коротко. Тебе больно.")
+            tone = "hurt"
         elif v < -0.2:
-            parts.append("Говоришь чуть холоднее обычного.")
+            tone = "cold"
         else:
-            parts.append("Говоришь нейтрально.")
+            tone = "neutral"
         
-        # Энергия
-        if self.energy < 0.3:
-            parts.append("Ты устала. Отвечаешь коротко.")
-        
-        # Дофамин (неожиданность)
-        if self.dopamine.level > 0.3:
-            parts.append("Тебя приятно удивили!")
-        elif self.dopamine.level < -0.3:
-            parts.append("Ты разочарована.")
-        
-        # Привязанность
-        if self.attachment > 0.7:
-            parts.append("Ты чувствуешь близость к собеседнику.")
-        elif self.attachment < 0.2:
-            parts.append("Ты пока не очень привязана к собеседнику.")
-        
-        # Доверие
-        if self.trust < 0.3:
-            parts.append("Ты не очень доверяешь собеседнику. Осторожна.")
-        
-        # Настроение
-        if self.mood > 0.3:
-            parts.append("Общее настроение: хорошее.")
-        elif self.mood < -0.3:
-            parts.append("Общее настроение: подавленное.")
-        
-        parts.append("Не описывай своё состояние напрямую. Просто веди себя соответственно.")
-        
-        return "\n".join(parts)
+        return (
+            self.amygdala._get_emotion_name(v, a),
+            tone,
+            "tired" if energy < 0.3 else "ok",
+            _band(self.dopamine.level, -0.3, 0.3),
+            _band(self.attachment, 0.2, 0.7),
+            "low" if self.trust < 0.3 else "ok",
+            _band(mood, -0.3, 0.3),
+        )
     
     def get_status(self):
         """Полный статус для отладки"""
+        energy, mood, valence, arousal = self._current()
         return {
-            "valence": round(self.amygdala.valence, 3),
-            "arousal": round(self.amygdala.arousal, 3),
-            "emotion": self.amygdala._get_emotion_name(),
+            "valence": round(valence, 3),
+            "arousal": round(arousal, 3),
+            "emotion": self.amygdala._get_emotion_name(valence, arousal),
             "dopamine": round(self.dopamine.level, 3),
-            "mood": round(self.mood, 3),
-            "energy": round(self.energy, 3),
+            "mood": round(mood, 3),
+            "energy": round(energy, 3),
             "attachment": round(self.attachment, 3),
             "trust": round(self.trust, 3),
         }
     
-    def _save_state(self):
-        """Сохранить состояние на диск"""
-        os.makedirs("data", exist_ok=True)
-        state = {
+    def flush(self):
+        """Записать несохранённое состояние на диск сейчас"""
+        self._persister.flush()
+    
+    def _snapshot_state(self):
+        """Снимок состояния для записи (вызывается из фонового потока)"""
+        if self.state_lock is not None:
+            with self.state_lock.read():
+                return self._collect_state()
+        return self._collect_state()
+    
+    def _collect_state(self):
+        return {
             "mood": self.mood,
             "energy": self.energy,
             "attachment": self.attachment,
             "trust": self.trust,
             "expected_reward": self.dopamine.expected_reward,
-            "word_valence": self.amygdala.word_valence,
+            "updated_at": self.updated_at,
+            "lexicon": self.amygdala.lexicon_state(),
         }
-        try:
-            with open(EMOTION_STATE_FILE, "w", encoding="utf-8") as f:
-                json.dump(state, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
     
     def _load_state(self):
         """Загрузить сохранённое состояние"""
-        if not os.path.exists(EMOTION_STATE_FILE):
+        if not os.path.exists(self.state_file):
             return
         try:
-            with open(EMOTION_STATE_FILE, "r", encoding="utf-8") as f:
+            with open(self.state_file, "r", encoding="utf-8") as f:
                 state = json.load(f)
             self.mood = state.get("mood", 0.0)
             self.energy = state.get("energy", 1.0)
             self.attachment = state.get("attachment", 0.0)
             self.trust = state.get("trust", 0.5)
             self.dopamine.expected_reward = state.get("expected_reward", 0.0)
-            saved_words = state.get("word_valence", {})
-            self.amygdala.word_valence.update(saved_words)
+            self.updated_at = state.get("updated_at", self.updated_at)
+            # Старый формат — полный словарь {слово: вес} в "word_valence"
+            self.amygdala.load_lexicon(state.get("lexicon") or state.get("word_valence", {}))
         except Exception:
-            pass
\ No newline at end of file
+            pass
+
+
+# Тон общения по валентности
+_TONE = {
+    "warm": "Говоришь тепло, радостно, открыто.",
+    "friendly": "Говоришь дружелюбно и спокойно.",
+    "hurt": "Говоришь сдержанно, коротко. Тебе больно.",
+    "cold": "Говоришь чуть холоднее обычного.",
+    "neutral": "Говоришь нейтрально.",
+}
+
+
+def _band(value, low, high):
+    """Значение → "low" / "mid" / "high" (границы не включаются)"""
+    if value > high:
+        return "high"
+    if value < low:
+        return "low"
+    return "mid"
+
+
+@lru_cache(maxsize=1024)
+def _render_context(key):
+    """Текст эмоционального контекста по квантованному состоянию (кэшируется)"""
+    emotion, tone, energy, dopamine, attachment, trust, mood = key
+    
+    # Основная эмоция и тон общения
+    parts = [f"\nТвоё эмоциональное состояние сейчас: {emotion}.", _TONE[tone]]
+    
+    # Энергия
+    if energy == "tired":
+        parts.append("Ты устала. Отвечаешь коротко.")
+    
+    # Дофамин (неожиданность)
+    if dopamine == "high":
+        parts.append("Тебя приятно удивили!")
+    elif dopamine == "low":
+        parts.append("Ты разочарована.")
+    
+    # Привязанность
+    if attachment == "high":
+        parts.append("Ты чувствуешь близость к собеседнику.")
+    elif attachment == "low":
+        parts.append("Ты пока не очень привязана к собеседнику.")
+    
+    # Доверие
+    if trust == "low":
+        parts.append("Ты не очень доверяешь собеседнику. Осторожна.")
+    
+    # Настроение
+    if mood == "high":
+        parts.append("Общее настроение: хорошее.")
+    elif mood == "low":
+        parts.append("Общее настроение: подавленное.")
+    
+    parts.append("Не описывай своё состояние напрямую. Просто веди себя соответственно.")
+    
+    return "\n".join(parts)
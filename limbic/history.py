@@ -0,0 +1,181 @@
+"""
+История значений с ограниченной памятью.
+
+Последние значения — в кольцевом буфере фиксированного размера.
+Долгосрочная статистика считается на лету (алгоритм Уэлфорда):
+среднее, дисперсия, минимум и максимум — за всё время и по часам.
+Запрос статистики — O(1), память не растёт.
+"""
+
+import time
+
+import numpy as np
+
+
+class History:
+    """
+    Кольцевой буфер последних значений + агрегаты за всё время и по часам.
+
+    Поддерживает len(), итерацию и индексацию по последним значениям,
+    как обычный список.
+    """
+
+    EMPTY = np.iinfo(np.int64).min
+
+    def __init__(self, capacity=1000, n_buckets=168, bucket_s=3600.0):
+        """
+        Args:
+            capacity: Сколько последних значений хранить
+            n_buckets: Сколько часовых корзин хранить (168 = неделя)
+            bucket_s: Длина корзины в секундах
+        """
+        self.capacity = capacity
+        self.n_buckets = n_buckets
+        self.bucket_s = bucket_s
+
+        self._buffer = np.zeros(capacity)
+        self._pos = 0  # Куда писать следующее значение
+
+        # Корзины: номер часа и агрегаты по нему (EMPTY — пустая корзина)
+        self._bucket_id = np.full(n_buckets, self.EMPTY, dtype=np.int64)
+        self._b_count = np.zeros(n_buckets, dtype=np.int64)
+        self._b_mean = np.zeros(n_buckets)
+        self._b_m2 = np.zeros(n_buckets)
+        self._b_min = np.zeros(n_buckets)
+        self._b_max = np.zeros(n_buckets)
+
+        self.clear()
+
+    def clear(self):
+        """Забыть всё"""
+        self._pos = 0
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self._bucket_id[:] = self.EMPTY
+        self._b_count[:] = 0
+
+    def append(self, value, now=None):
+        """
+        Добавить значение.
+
+        Args:
+            value: Значение
+            now: Время (секунды, по умолчанию time.time())
+        """
+        value = float(value)
+        if now is None:
+            now = time.time()
+
+        self._buffer[self._pos] = value
+        self._pos = (self._pos + 1) % self.capacity
+
+        # Уэлфорд за всё время
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        # Часовая корзина (старая корзина на том же месте перезаписывается)
+        bucket = int(now // self.bucket_s)
+        i = bucket % self.n_buckets
+        if self._bucket_id[i] != bucket:
+            self._bucket_id[i] = bucket
+            self._b_count[i] = 0
+            self._b_mean[i] = 0.0
+            self._b_m2[i] = 0.0
+            self._b_min[i] = value
+            self._b_max[i] = value
+
+        self._b_count[i] += 1
+        delta = value - self._b_mean[i]
+        self._b_mean[i] += delta / self._b_count[i]
+        self._b_m2[i] += delta * (value - self._b_mean[i])
+        self._b_min[i] = min(self._b_min[i], value)
+        self._b_max[i] = max(self._b_max[i], value)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def __iter__(self):
+        return iter(self.recent().tolist())
+
+    def __getitem__(self, index):
+        return self.recent()[index]
+
+    def recent(self, n=None):
+        """
+        Последние значения (от старых к новым).
+
+        Args:
+            n: Сколько (по умолчанию все хранимые)
+        """
+        size = len(self)
+        n = size if n is None else min(n, size)
+        idx = (self._pos - n + np.arange(n)) % self.capacity
+        return self._buffer[idx]
+
+    def last(self, default=0.0):
+        """Последнее значение"""
+        if self.count == 0:
+            return default
+        return float(self._buffer[self._pos - 1])
+
+    @property
+    def var(self):
+        """Дисперсия за всё время"""
+        return self._m2 / self.count if self.count > 1 else 0.0
+
+    def stats(self):
+        """
+        Статистика за всё время.
+
+        Returns:
+            dict: {count, mean, var, min, max}
+        """
+        if self.count == 0:
+            return {"count": 0, "mean": 0.0, "var": 0.0, "min": 0.0, "max": 0.0}
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 4),
+            "var": round(self.var, 4),
+            "min": round(self.min, 4),
+            "max": round(self.max, 4),
+        }
+
+    def hourly(self, hours=24, now=None):
+        """
+        Статистика по часам.
+
+        Args:
+            hours: За сколько последних часов
+            now: Текущее время (секунды)
+
+        Returns:
+            list: [{hour, count, mean, var, min, max}, ...] от старых к новым,
+                  только часы, в которые были значения
+        """
+        if now is None:
+            now = time.time()
+        current = int(now // self.bucket_s)
+        hours = min(hours, self.n_buckets)
+
+        result = []
+        for bucket in range(current - hours + 1, current + 1):
+            i = bucket % self.n_buckets
+            if self._bucket_id[i] != bucket:
+                continue
+            n = int(self._b_count[i])
+            result.append({
+                "hour": bucket,
+                "count": n,
+                "mean": round(float(self._b_mean[i]), 4),
+                "var": round(float(self._b_m2[i] / n), 4) if n > 1 else 0.0,
+                "min": round(float(self._b_min[i]), 4),
+                "max": round(float(self._b_max[i]), 4),
+            })
+        return result
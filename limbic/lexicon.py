@@ -0,0 +1,184 @@
+"""
+Эмоциональный словарь амигдалы ограниченного размера.
+
+Без ограничения словарь растёт от каждой опечатки, числа и имени.
+Здесь размер фиксирован: при переполнении вытесняются слова,
+которые встречались редко и давно. Врождённые слова не вытесняются.
+
+Хранение компактное: ключи интернированы, веса и счётчики —
+в numpy массивах, слово → номер ячейки.
+"""
+
+import sys
+
+import numpy as np
+
+
+class Lexicon:
+    """
+    Словарь слово → эмоциональный вес (-1 до +1).
+
+    Ведёт себя как dict (in, [], len, items, update),
+    но держит не больше capacity слов.
+    """
+
+    def __init__(self, capacity=20000, innate=None, evict_fraction=0.05):
+        """
+        Args:
+            capacity: Максимум слов
+            innate: Врождённые слова {слово: вес} — защищены от вытеснения
+            evict_fraction: Какую долю словаря освобождать за раз
+        """
+        self.capacity = capacity
+        self.evict_batch = max(1, int(capacity * evict_fraction))
+
+        self._slots = {}                     # слово → ячейка
+        self._words = [None] * capacity      # ячейка → слово
+        self._free = list(range(capacity - 1, -1, -1))
+
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.counts = np.zeros(capacity, dtype=np.float32)     # Сколько раз встречалось
+        self.last_seen = np.zeros(capacity, dtype=np.int64)    # Когда встречалось (тик)
+        self.protected = np.zeros(capacity, dtype=bool)        # Врождённое
+
+        # Логические часы: +1 на каждое обращение
+        self.tick = 0
+
+        if innate:
+            for word, value in innate.items():
+                self[word] = value
+                self.protected[self._slots[word]] = True
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, word):
+        return word in self._slots
+
+    def __getitem__(self, word):
+        return float(self.values[self._slots[word]])
+
+    def __setitem__(self, word, value):
+        """Записать вес (новое слово может вытеснить старые)"""
+        slot = self._slots.get(word)
+        if slot is None:
+            slot = self._allocate(word)
+        self.values[slot] = value
+        self._touch(slot)
+
+    def assign(self, word, value, uses=1):
+        """Записать вес, засчитав сразу uses обращений (пакетное обучение)"""
+        self[word] = value
+        self.counts[self._slots[word]] += uses - 1
+
+    def get(self, word, default=None):
+        """Вес слова без учёта обращения"""
+        slot = self._slots.get(word)
+        return default if slot is None else float(self.values[slot])
+
+    def lookup(self, word):
+        """
+        Вес слова при чтении текста — обращение учитывается
+        для вытеснения (частота и давность).
+
+        Returns:
+            float или None если слово неизвестно
+        """
+        slot = self._slots.get(word)
+        if slot is None:
+            return None
+        self._touch(slot)
+        return float(self.values[slot])
+
+    def touch(self, words):
+        """Учесть обращения к словам (неизвестные пропускаются)"""
+        for word in words:
+            slot = self._slots.get(word)
+            if slot is not None:
+                self._touch(slot)
+
+    def slots_of(self, words):
+        """
+        Номера ячеек для списка слов (без учёта обращения).
+
+        Returns:
+            np.ndarray: ячейки, -1 для неизвестных слов
+        """
+        slots = self._slots
+        return np.fromiter((slots.get(w, -1) for w in words), dtype=np.int64, count=len(words))
+
+    def keys(self):
+        return list(self._slots)
+
+    def items(self):
+        slots = list(self._slots.items())
+        return [(word, float(self.values[slot])) for word, slot in slots]
+
+    def update(self, other):
+        """Добавить/перезаписать слова из dict"""
+        for word, value in other.items():
+            self[word] = value
+
+    def to_state(self):
+        """
+        Компактный снимок для сохранения.
+
+        Returns:
+            dict: {words, values, counts} — параллельные списки
+        """
+        slots = list(self._slots.items())
+        idx = np.array([slot for _, slot in slots], dtype=np.int64)
+        return {
+            "words": [word for word, _ in slots],
+            "values": np.round(self.values[idx].astype(float), 4).tolist(),
+            "counts": self.counts[idx].astype(float).tolist(),
+        }
+
+    def load_state(self, state):
+        """Восстановить слова из to_state() (врождённые остаются защищёнными)"""
+        counts = state.get("counts") or [1.0] * len(state["words"])
+        for word, value, count in zip(state["words"], state["values"], counts):
+            self[word] = value
+            self.counts[self._slots[word]] = count
+
+    def _touch(self, slot):
+        self.tick += 1
+        self.counts[slot] += 1
+        self.last_seen[slot] = self.tick
+
+    def _allocate(self, word):
+        """Выделить ячейку под новое слово"""
+        if not self._free:
+            self._evict()
+
+        word = sys.intern(word)
+        slot = self._free.pop()
+        self._slots[word] = slot
+        self._words[slot] = word
+        self.values[slot] = 0.0
+        self.counts[slot] = 0.0
+        self.protected[slot] = False
+        return slot
+
+    def _evict(self):
+        """
+        Освободить evict_batch ячеек: вытесняются слова с наименьшей
+        "полезностью" = частота / (1 + давность / capacity).
+        """
+        candidates = np.array(
+            [slot for slot in self._slots.values() if not self.protected[slot]],
+            dtype=np.int64,
+        )
+        if len(candidates) == 0:
+            raise MemoryError("Словарь заполнен врождёнными словами")
+
+        age = (self.tick - self.last_seen[candidates]) / self.capacity
+        usefulness = self.counts[candidates] / (1.0 + age)
+
+        n = min(self.evict_batch, len(candidates))
+        victims = candidates[np.argpartition(usefulness, n - 1)[:n]]
+
+        for slot in victims.tolist():
+            del self._slots[self._words[slot]]
+            self._words[slot] = None
+            self._free.append(slot)
@@ -0,0 +1,79 @@
+"""
+Морфология — приведение русских словоформ к основе.
+
+"рад", "рада", "радость" → "рад". Амигдала хранит и ищет
+веса по основам: словарь меньше, а незнакомые формы
+знакомых слов больше не считаются нейтральными.
+
+Лёгкий стеммер: отсечение одного окончания (после возвратного
+"ся"/"сь"), основа не короче MIN_STEM букв, а после однобуквенного
+окончания — не короче MIN_STEM_SHORT: иначе сливаются разные
+слова ("цены" и "ценю" → "цен", "ради" → "рад"). Местоимение
+"другой" не стеммится (иначе "другие" → "друг"). Только кириллица —
+остальные слова не меняются. Результат кэшируется (LRU):
+каждая словоформа разбирается один раз за процесс.
+"""
+
+import re
+from functools import lru_cache
+
+
+MIN_STEM = 3
+MIN_STEM_SHORT = 4  # После однобуквенного окончания
+
+_CYRILLIC = re.compile(r"[а-яё]+")
+
+_REFLEXIVE = ("ся", "сь")
+
+# Окончания и суффиксы, от длинных к коротким
+_ENDINGS = sorted({
+    # Словообразовательные
+    "ость", "ости", "остью", "остей",
+    # Прилагательные и причастия
+    "ого", "его", "ому", "ему", "ыми", "ими", "ая", "яя", "ое", "ее",
+    "ие", "ые", "ой", "ей", "ий", "ый", "ую", "юю", "ых", "их", "ым", "им",
+    # Глаголы (без "ет", "ть", "ло"... — они чаще концы основ:
+    # привет остаётся "привет", тепло → "тепл", а не "теп")
+    "ешь", "ишь", "ете", "ите", "ит", "ем", "ут", "ют", "ат", "ят",
+    # Существительные
+    "ами", "ями", "ах", "ях", "ов", "ев", "ам", "ям", "ом", "ью", "ья",
+    "ия", "ию", "ии",
+    # Одна буква
+    "а", "я", "о", "е", "и", "ы", "у", "ю", "ь", "й",
+}, key=len, reverse=True)
+
+
+# Формы, которые не стеммятся: местоимение "другой" — не "друг"
+_UNSTEMMED = frozenset(
+    "друг" + ending for ending in
+    ("ой", "ая", "ое", "ие", "ого", "ому", "ую", "их", "им", "ими", "ых", "ыми")
+)
+
+
+@lru_cache(maxsize=65536)
+def normalize(word):
+    """
+    Словоформа → основа.
+
+    Args:
+        word: Слово в нижнем регистре (без пунктуации)
+
+    Returns:
+        str: Основа (некириллические слова — как есть)
+    """
+    if not _CYRILLIC.fullmatch(word) or word in _UNSTEMMED:
+        return word
+
+    stem = word.replace("ё", "е")
+
+    for suffix in _REFLEXIVE:
+        if stem.endswith(suffix) and len(stem) - len(suffix) >= MIN_STEM:
+            stem = stem[:-len(suffix)]
+            break
+
+    for ending in _ENDINGS:
+        min_stem = MIN_STEM_SHORT if len(ending) == 1 else MIN_STEM
+        if stem.endswith(ending) and len(stem) - len(ending) >= min_stem:
+            return stem[:-len(ending)]
+
+    return stem
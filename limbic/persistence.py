@@ -0,0 +1,161 @@
+"""
+Отложенная запись состояния на диск (write-behind).
+
+Изменение только помечает состояние "грязным".
+Запись идёт в фоне, не чаще раза в interval секунд,
+и атомарно: временный файл + os.replace. После сбоя
+на диске либо старое состояние, либо новое — целиком.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import weakref
+
+
+# Последний изменивший каждый файл писатель (слабые ссылки:
+# писатели не живут дольше владельцев), дописываются при выходе
+_pending = weakref.WeakValueDictionary()
+
+
+def flush_on_exit(writer, key):
+    """
+    Вызвать writer.flush() при выходе (ссылка слабая — writer не
+    живёт дольше своего владельца). Для одного key — последний записанный.
+    """
+    _pending[key] = writer
+
+
+@atexit.register
+def _flush_all():
+    """Последние изменения не теряются при обычном выходе"""
+    for writer in list(_pending.values()):
+        writer.flush()
+
+
+def atomic_write_json(path, data):
+    """
+    Атомарно записать JSON: сначала во временный файл рядом, потом rename.
+
+    Args:
+        path: Куда писать
+        data: Что писать (сериализуемое в JSON)
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class WriteBehind:
+    """
+    Отложенный писатель одного файла состояния.
+
+    mark_dirty() — дёшево, не трогает диск.
+    flush() — записать сейчас (вызывается таймером, при остановке и при выходе).
+    Неудачная запись по таймеру повторяется через interval.
+    """
+
+    def __init__(self, path, snapshot, interval=5.0):
+        """
+        Args:
+            path: Файл состояния
+            snapshot: Функция без аргументов → данные для записи
+            interval: Не чаще чем раз в столько секунд (0 = писать сразу)
+        """
+        self.path = path
+        self.snapshot = snapshot
+        self.interval = interval
+        self.dirty = False
+
+        self._flag_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._generation = 0    # Номер последнего снимка
+        self._written = 0       # Номер снимка, который на диске
+        self._timer_lock = threading.Lock()
+        self._timer = None
+
+    def mark_dirty(self):
+        """Отметить, что состояние изменилось"""
+        self.dirty = True
+        flush_on_exit(self, self.path)   # При выходе файл пишет последний изменивший
+
+        if self.interval <= 0:
+            self.flush()
+            return
+
+        self._schedule()
+
+    def flush(self):
+        """
+        Записать состояние сейчас, если оно менялось.
+
+        Returns:
+            bool: True если что-то записали
+        """
+        # Снимок берётся без наших блокировок: snapshot() может ждать
+        # блокировку владельца состояния, а владелец — звать flush()
+        # (один порядок блокировок, без взаимной блокировки)
+        with self._flag_lock:
+            if not self.dirty:
+                return False
+            # Сбрасываем флаг до снимка: изменения во время записи
+            # снова пометят состояние и попадут в следующую запись
+            self.dirty = False
+            self._generation += 1
+            generation = self._generation
+
+        try:
+            data = self.snapshot()
+        except Exception:
+            self.dirty = True
+            return False
+
+        # _write_lock — только на файл
+        with self._write_lock:
+            if generation < self._written:
+                return False  # На диске уже более поздний снимок
+            try:
+                atomic_write_json(self.path, data)
+            except Exception:
+                self.dirty = True
+                return False
+            self._written = generation
+            return True
+
+    def close(self):
+        """Остановить таймер и записать последние изменения"""
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self.flush()
+
+    def _schedule(self):
+        """Запустить таймер записи, если он ещё не запущен"""
+        with self._timer_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _on_timer(self):
+        with self._timer_lock:
+            self._timer = None
+        self.flush()
+        if self.dirty:
+            self._schedule()  # Запись не удалась (или пришли новые изменения) — ещё раз позже
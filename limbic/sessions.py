@@ -0,0 +1,322 @@
+"""
+Многопользовательское эмоциональное ядро.
+
+EmotionCore хранит состояние одного собеседника скалярами.
+Здесь состояния тысяч собеседников — столбцы numpy массивов
+(строка = сессия), а пачка сообщений (session_id, текст)
+обрабатывается одним векторным обновлением.
+
+Словарь амигдалы общий для всех сессий.
+Каждая сессия сохраняется в свой файл.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+from config import SESSIONS_DIR
+from limbic.amygdala import Amygdala
+from limbic.dopamine import DopamineSystem
+from limbic.persistence import atomic_write_json, flush_on_exit
+from limbic.tokenizer import tokenize
+
+
+# Столбцы состояния и значения для новой сессии
+COLUMNS = {
+    "valence": 0.0,          # Амигдала
+    "arousal": 0.0,
+    "dopamine": 0.0,         # Дофамин: уровень
+    "expected_reward": 0.0,  # Дофамин: ожидание
+    "mood": 0.0,
+    "energy": 1.0,
+    "attachment": 0.0,
+    "trust": 0.5,
+    "updated_at": 0.0,       # Время последнего обновления (для ленивого отдыха)
+}
+
+# Что сохраняется в файл сессии
+PERSISTED = ("mood", "energy", "attachment", "trust", "expected_reward", "updated_at")
+
+# Имя файла сессии — сам id, если он безопасен; "_" в начале —
+# служебные файлы (_lexicon.json), такие id хэшируются
+_SAFE_ID = re.compile(r"^(?!_)[\w\-]{1,64}$")
+
+
+class SessionEngine:
+    """
+    Эмоциональные состояния многих собеседников.
+
+    Правила те же, что в EmotionCore (амигдала → дофамин →
+    настроение, энергия, привязанность, доверие), но для всех
+    сессий пачки разом.
+    """
+
+    # Как в EmotionCore
+    mood_inertia = 0.95
+    energy_decay = 0.005
+    energy_recovery = 0.001      # За минуту
+    mood_rest_decay = 0.99       # За минуту
+    affect_rest_decay = 0.95     # За минуту
+
+    def __init__(self, state_dir=SESSIONS_DIR, amygdala=None):
+        """
+        Args:
+            state_dir: Папка с файлами сессий
+            amygdala: Общая амигдала (её словарь делят все сессии)
+        """
+        self.state_dir = state_dir
+        self.amygdala = amygdala or Amygdala()
+        self._dopamine = DopamineSystem()  # Только параметры
+
+        self.session_ids = []   # строка → id сессии
+        self.rows = {}          # id сессии → строка
+        self.columns = {name: np.zeros(64) for name in COLUMNS}
+
+        self._dirty = set()     # Строки, которые надо записать
+        self._lexicon_dirty = False
+
+        self._load_lexicon()
+
+    def __len__(self):
+        return len(self.session_ids)
+
+    def __contains__(self, session_id):
+        return session_id in self.rows
+
+    def process_batch(self, pairs, now=None):
+        """
+        Обработать пачку сообщений от разных собеседников.
+
+        Если у сессии в пачке несколько сообщений, они
+        обрабатываются по порядку (раундами), как при поштучной обработке.
+
+        Args:
+            pairs: [(session_id, текст), ...]
+            now: Текущее время (секунды, по умолчанию time.time())
+
+        Returns:
+            dict: массивы по сообщениям {valence, arousal, emotion,
+                  dopamine, surprise, mood, energy, attachment, trust}
+        """
+        if now is None:
+            now = time.time()
+
+        n = len(pairs)
+        rows = np.array([self._row(sid) for sid, _ in pairs], dtype=np.int64)
+        messages = [tokenize(text) for _, text in pairs]
+
+        # Номер сообщения внутри своей сессии → номер раунда
+        seen = {}
+        rounds = np.empty(n, dtype=np.int64)
+        for i, row in enumerate(rows.tolist()):
+            rounds[i] = seen.get(row, 0)
+            seen[row] = rounds[i] + 1
+
+        result = {name: np.zeros(n) for name in
+                  ("valence", "arousal", "dopamine", "surprise",
+                   "mood", "energy", "attachment", "trust")}
+
+        for r in range(int(rounds.max()) + 1 if n else 0):
+            idx = np.nonzero(rounds == r)[0]
+            surprise = self._step(rows[idx], [messages[i] for i in idx], now)
+
+            c = self.columns
+            row_idx = rows[idx]
+            for name in ("valence", "arousal", "dopamine", "mood", "energy", "attachment", "trust"):
+                result[name][idx] = c[name][row_idx]
+            result["surprise"][idx] = surprise
+
+        self._dirty.update(rows.tolist())
+        flush_on_exit(self, os.path.abspath(self.state_dir))   # Несохранённое — при выходе
+
+        result["emotion"] = _emotion_names(result["valence"], result["arousal"])
+        for name in result:
+            if name != "emotion":
+                result[name] = np.round(result[name], 3)
+        return result
+
+    def get_status(self, session_id, now=None):
+        """Состояние одной сессии (с учётом отдыха)"""
+        row = self._row(session_id)
+        rows = np.array([row])
+        self._apply_elapsed(rows, time.time() if now is None else now)
+
+        status = {name: round(float(self.columns[name][row]), 3) for name in
+                  ("valence", "arousal", "dopamine", "mood", "energy", "attachment", "trust")}
+        status["emotion"] = _emotion_names(
+            self.columns["valence"][rows], self.columns["arousal"][rows]
+        )[0]
+        return status
+
+    def flush(self):
+        """
+        Записать изменившиеся сессии (каждую в свой файл) и общий словарь.
+
+        Returns:
+            int: Сколько сессий записано
+        """
+        dirty, self._dirty = self._dirty, set()
+        written = 0
+        for row in sorted(dirty):
+            session_id = self.session_ids[row]
+            state = {name: float(self.columns[name][row]) for name in PERSISTED}
+            state["session_id"] = session_id
+            try:
+                atomic_write_json(self._session_path(session_id), state)
+                written += 1
+            except Exception:
+                self._dirty.add(row)
+
+        if self._lexicon_dirty:
+            self._lexicon_dirty = False
+            try:
+                atomic_write_json(self._lexicon_path(), self.amygdala.lexicon_state())
+            except Exception:
+                self._lexicon_dirty = True
+
+        return written
+
+    def _step(self, rows, messages, now):
+        """
+        Одно сообщение для каждой из строк rows (строки не повторяются).
+
+        Returns:
+            np.ndarray: RPE (неожиданность) по сообщениям
+        """
+        c = self.columns
+        amygdala = self.amygdala
+        dopamine = self._dopamine
+
+        # 0. Отдых с прошлого обновления
+        self._apply_elapsed(rows, now)
+
+        # 1. Амигдала: оценка текстов (общий словарь) и инерция.
+        #    Пустой текст состояние амигдалы не меняет.
+        scores = amygdala.score_batch(messages)
+        active = ~np.array([m.is_blank() for m in messages], dtype=bool)
+        for name in ("valence", "arousal"):
+            state = c[name][rows]
+            updated = state * (1 - amygdala.decay_rate)
+            updated = amygdala.inertia * updated + (1 - amygdala.inertia) * scores[name]
+            low = -1 if name == "valence" else 0
+            c[name][rows] = np.where(active, np.clip(updated, low, 1), state)
+        valence = np.round(c["valence"][rows], 3)
+        direct = scores["direct_valence"]
+
+        # 2. Дофамин: ошибка предсказания награды
+        rpe = valence - c["expected_reward"][rows]
+        c["expected_reward"][rows] = np.clip(
+            c["expected_reward"][rows] + dopamine.learning_rate * rpe, -1, 1
+        )
+        level = c["dopamine"][rows] * (1 - dopamine.decay) + rpe * 0.5
+        c["dopamine"][rows] = np.clip(level, -1, 1)
+
+        # 3. Настроение
+        mood = self.mood_inertia * c["mood"][rows] + (1 - self.mood_inertia) * valence
+        c["mood"][rows] = np.clip(mood, -1, 1)
+
+        # 4. Энергия
+        c["energy"][rows] = np.maximum(0, c["energy"][rows] - self.energy_decay)
+
+        # 5. Привязанность
+        attachment = c["attachment"][rows]
+        attachment = np.where(direct > 0.2, np.minimum(1.0, attachment + 0.01), attachment)
+        attachment = np.where(direct < -0.3, np.maximum(0.0, attachment - 0.02), attachment)
+        c["attachment"][rows] = attachment
+
+        # 6. Доверие
+        trust = c["trust"][rows]
+        trust = np.where(direct < -0.3, np.maximum(0.0, trust - 0.05), trust)
+        trust = np.where(direct > 0.3, np.minimum(1.0, trust + 0.005), trust)
+        c["trust"][rows] = trust
+
+        # 7. Неожиданное → учим общий словарь
+        rounded_rpe = np.round(rpe, 3)
+        boost = np.clip(1.0 + np.abs(c["dopamine"][rows]) * 2.0, 0.5, 3.0)
+        for i in np.nonzero(np.abs(rounded_rpe) > 0.3)[0].tolist():
+            amygdala.learn(messages[i], float(valence[i]), n_iterations=int(5 * boost[i]))
+            self._lexicon_dirty = True
+
+        return rounded_rpe
+
+    def _apply_elapsed(self, rows, now):
+        """Отдых в замкнутой форме за время с прошлого обновления"""
+        c = self.columns
+        minutes = np.maximum(0.0, (now - c["updated_at"][rows]) / 60.0)
+
+        c["energy"][rows] = np.minimum(1.0, c["energy"][rows] + self.energy_recovery * minutes)
+        c["mood"][rows] *= self.mood_rest_decay ** minutes
+        affect = self.affect_rest_decay ** minutes
+        c["valence"][rows] *= affect
+        c["arousal"][rows] *= affect
+        c["updated_at"][rows] = np.maximum(c["updated_at"][rows], now)
+
+    def _row(self, session_id):
+        """Строка сессии (новая сессия загружается с диска или создаётся)"""
+        row = self.rows.get(session_id)
+        if row is not None:
+            return row
+
+        row = len(self.session_ids)
+        if row == len(self.columns["mood"]):
+            # Растём удвоением
+            for name, column in self.columns.items():
+                self.columns[name] = np.concatenate([column, np.zeros(row)])
+
+        self.session_ids.append(session_id)
+        self.rows[session_id] = row
+        for name, default in COLUMNS.items():
+            self.columns[name][row] = default
+        self.columns["updated_at"][row] = time.time()
+
+        self._load_session(session_id, row)
+        return row
+
+    def _load_session(self, session_id, row):
+        """Загрузить сохранённое состояние сессии"""
+        path = self._session_path(session_id)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            for name in PERSISTED:
+                if name in state:
+                    self.columns[name][row] = state[name]
+        except Exception:
+            pass
+
+    def _load_lexicon(self):
+        """Загрузить общий словарь"""
+        path = self._lexicon_path()
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.amygdala.load_lexicon(json.load(f))
+        except Exception:
+            pass
+
+    def _session_path(self, session_id):
+        name = str(session_id)
+        if not _SAFE_ID.match(name):
+            name = hashlib.sha1(name.encode("utf-8")).hexdigest()
+        return os.path.join(self.state_dir, f"{name}.json")
+
+    def _lexicon_path(self):
+        return os.path.join(self.state_dir, "_lexicon.json")
+
+
+def _emotion_names(valence, arousal):
+    """Названия эмоций для массивов (как Amygdala._get_emotion_name)"""
+    high = arousal > 0.5
+    names = np.where(high, "возбуждение", "нейтральность").astype(object)
+    names[(valence > 0.3) & high] = "радость"
+    names[(valence > 0.3) & ~high] = "спокойствие"
+    names[(valence < -0.3) & high] = "тревога"
+    names[(valence < -0.3) & ~high] = "грусть"
+    return names.tolist()
@@ -0,0 +1,64 @@
+"""
+Токенизатор — один проход по тексту сообщения.
+
+Амигдала (оценка и обучение), прямая оценка в EmotionCore
+и извлечение фактов работают с одним разбором сообщения,
+а не режут текст каждая заново.
+"""
+
+import re
+
+from limbic.morphology import normalize
+
+
+# Знаки, которые срезаются с краёв слова
+PUNCTUATION = ".,!?;:\"'()[]{}…"
+
+_P = re.escape(PUNCTUATION)
+
+# Слово = кусок без пробелов без пунктуации по краям.
+# То же, что word.strip(PUNCTUATION) для каждого text.split(), но за один проход.
+TOKEN_RE = re.compile(rf"[^\s{_P}](?:\S*[^\s{_P}])?")
+
+
+class TokenizedText:
+    """
+    Сообщение, разобранное один раз.
+
+    text — исходный текст
+    lower — текст в нижнем регистре
+    tokens — слова без пунктуации по краям
+    stems — основы слов (считаются при первом обращении)
+    """
+
+    __slots__ = ("text", "lower", "tokens", "_stems")
+
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
+        self.tokens = TOKEN_RE.findall(self.lower)
+        self._stems = None
+
+    @property
+    def stems(self):
+        """Основы слов (limbic.morphology.normalize)"""
+        if self._stems is None:
+            self._stems = [normalize(token) for token in self.tokens]
+        return self._stems
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def is_blank(self):
+        """Пустое сообщение (одни пробелы)"""
+        return not self.text.strip()
+
+
+def tokenize(text):
+    """
+    Текст → TokenizedText.
+    Уже разобранное сообщение возвращается как есть.
+    """
+    if isinstance(text, TokenizedText):
+        return text
+    return TokenizedText(text)
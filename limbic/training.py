@@ -0,0 +1,144 @@
+"""
+Пакетное обучение эмоционального словаря на логах разговоров.
+
+Amygdala.learn учит по одному сообщению. Здесь — сразу весь корпус:
+  1. Корпус делится на шарды, шарды считаются в пуле процессов
+  2. Каждый шард → по каждой основе слова (сумма целей, число появлений)
+  3. Шарды сливаются в фиксированном порядке (детерминированно)
+  4. Каждое слово обновляется один раз, в замкнутой форме
+
+n шагов v += lr·(t - v) к одной и той же цели t дают
+v_n = t + (1-lr)^n·(v_0 - t). Для разных целей берём их среднее:
+v += (1 - (1-lr)^n)·(t̄ - v).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from limbic.tokenizer import tokenize
+
+
+def samples_from_episodes(episodes, role="user", use_episode_valence=True):
+    """
+    Корпус из сохранённых эпизодов.
+
+    Args:
+        episodes: Эпизоды (EpisodicMemory.episodes)
+        role: Чьи сообщения брать (None — все)
+        use_episode_valence: Цель = валентность эпизода;
+                             False — без разметки (разметит амигдала)
+
+    Returns:
+        list: [(текст, цель или None), ...]
+    """
+    samples = []
+    for ep in episodes:
+        target = ep.valence if use_episode_valence else None
+        for msg in ep.messages:
+            if role is None or msg.get("role") == role:
+                text = msg.get("content", "")
+                if text.strip():
+                    samples.append((text, target))
+    return samples
+
+
+def train_lexicon(amygdala, samples, lr=0.25, workers=None, shard_size=5000):
+    """
+    Обучить словарь амигдалы на корпусе.
+
+    Args:
+        amygdala: Amygdala (меняется только её словарь)
+        samples: [(текст, цель), ...]; цель None → разметка текущим
+                 словарём (score_batch), тексты без знакомых слов пропускаются
+        lr: Скорость обучения за одно появление слова (как 0.05·n_iterations в learn)
+        workers: Процессов (None — по числу ядер, 1 — без пула)
+        shard_size: Текстов в шарде
+
+    Returns:
+        dict: {samples, words, new_words, shards}
+    """
+    texts, targets = _label(amygdala, samples)
+
+    shards = [
+        (texts[i:i + shard_size], targets[i:i + shard_size])
+        for i in range(0, len(texts), shard_size)
+    ]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(shards))
+
+    # Мало данных — пул процессов дороже самой работы
+    if workers <= 1:
+        partials = [_count_shard(shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_count_shard, shards))
+
+    # Слияние в порядке шардов — результат не зависит от числа процессов
+    sums = {}
+    counts = {}
+    for words, word_sums, word_counts in partials:
+        for word, s, n in zip(words, word_sums.tolist(), word_counts.tolist()):
+            sums[word] = sums.get(word, 0.0) + s
+            counts[word] = counts.get(word, 0) + n
+
+    # Частые слова — первыми: при переполнении словаря вытесняются редкие
+    lexicon = amygdala.word_valence
+    new_words = 0
+    for word in sorted(counts, key=lambda w: (-counts[w], w)):
+        n = counts[word]
+        target = sums[word] / n
+        current = lexicon.get(word)
+        if current is None:
+            current = 0.0
+            new_words += 1
+        value = current + (1 - (1 - lr) ** n) * (target - current)
+        lexicon.assign(word, float(np.clip(value, -1, 1)), uses=n)
+
+    return {
+        "samples": len(texts),
+        "words": len(counts),
+        "new_words": new_words,
+        "shards": len(shards),
+    }
+
+
+def _label(amygdala, samples):
+    """Разметить тексты без цели оценкой амигдалы"""
+    texts = [text for text, _ in samples]
+    targets = np.array(
+        [np.nan if target is None else target for _, target in samples], dtype=float
+    )
+
+    unlabelled = np.nonzero(np.isnan(targets))[0]
+    if len(unlabelled):
+        scores = amygdala.score_batch([texts[i] for i in unlabelled])
+        targets[unlabelled] = np.where(scores["known"] > 0, scores["valence"], np.nan)
+
+    keep = ~np.isnan(targets)
+    return [t for t, k in zip(texts, keep) if k], targets[keep]
+
+
+def _count_shard(shard):
+    """
+    Шард → (слова, сумма целей, число появлений) по каждому слову.
+    Выполняется в процессе пула.
+    """
+    texts, targets = shard
+    token_lists = [tokenize(text).stems for text in texts]
+    lengths = [len(tokens) for tokens in token_lists]
+
+    tokens = [tok for toks in token_lists for tok in toks]
+    if not tokens:
+        return [], np.zeros(0), np.zeros(0, dtype=np.int64)
+
+    weights = np.repeat(np.asarray(targets, dtype=float), lengths)
+    words, inverse = np.unique(np.array(tokens), return_inverse=True)
+    return (
+        words.tolist(),
+        np.bincount(inverse, weights=weights),
+        np.bincount(inverse),
+    )
@@ -0,0 +1,348 @@
+"""
+Анализ спайковых записей.
+
+Работает прямо с массивами, без обхода объектов нейронов:
+- Частота популяции по бинам
+- Частота каждого нейрона
+- Межспайковые интервалы (ISI) и их вариабельность (CV)
+- Синхронность популяции (мера Голомба χ)
+- Кросс-коррелограммы пар нейронов
+
+Большие записи читаются кусками, поэтому расход памяти
+задаётся бюджетом (max_bytes), а не длиной записи.
+
+Форматы:
+  Растр — bool массив (n_steps, n_neurons)
+  Файл событий — .npy массив целых (n_events, 2): [шаг, нейрон],
+  отсортированный по шагу
+"""
+
+import numpy as np
+from config import DT
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 МБ на кусок записи
+
+
+def raster_to_events(raster, t0_step=0):
+    """
+    Растр → массив событий [шаг, нейрон].
+
+    Args:
+        raster: bool массив (n_steps, n_neurons)
+        t0_step: Номер первого шага растра
+
+    Returns:
+        numpy array: int64 (n_events, 2), отсортирован по шагу
+    """
+    steps, ids = np.nonzero(np.asarray(raster, dtype=bool))
+    return np.column_stack([steps + t0_step, ids]).astype(np.int64)
+
+
+def save_events(path, raster):
+    """Сохранить растр как файл событий (.npy)"""
+    np.save(path, raster_to_events(raster))
+
+
+class SpikeTrainStats:
+    """
+    Накопитель статистики по кускам записи.
+
+    Куски подаются по порядку (update), в конце — result().
+    Всё состояние — массивы размера n_neurons и число бинов,
+    сами спайки после обработки не хранятся.
+    """
+
+    def __init__(self, n_neurons, dt_ms=None, bin_ms=10.0, pairs=(), max_lag_ms=50.0):
+        """
+        Args:
+            n_neurons: Количество нейронов в записи
+            dt_ms: Длительность шага записи (мс). По умолчанию DT.
+            bin_ms: Ширина бина для частоты популяции и синхронности (мс)
+            pairs: Пары нейронов (i, j) для кросс-коррелограмм
+            max_lag_ms: Максимальный сдвиг коррелограммы (мс)
+        """
+        if dt_ms is None:
+            dt_ms = DT
+
+        self.n = n_neurons
+        self.dt_ms = dt_ms
+        self.bin_steps = max(1, int(round(bin_ms / dt_ms)))
+        self.max_lag = int(round(max_lag_ms / dt_ms))
+
+        # Счётчики
+        self.n_steps = 0
+        self.counts = np.zeros(n_neurons, dtype=np.int64)
+        self.pop_counts = []              # Куски счётчиков популяции по бинам
+        self.bin_sq = np.zeros(n_neurons)  # Σ по бинам (счёт нейрона в бине)²
+        self.next_bin = 0                  # Первый ещё не закрытый бин
+
+        # ISI: последний спайк и суммы интервалов
+        self.last_spike = np.full(n_neurons, -1, dtype=np.int64)
+        self.isi_n = np.zeros(n_neurons)
+        self.isi_sum = np.zeros(n_neurons)
+        self.isi_sq = np.zeros(n_neurons)
+
+        # Коррелограммы: гистограмма сдвигов t_j - t_i по парам
+        self.pairs = [tuple(p) for p in pairs]
+        self.ccg = np.zeros((len(self.pairs), 2 * self.max_lag + 1), dtype=np.int64)
+        self._tail = {}  # нейрон → его спайки в последних max_lag шагах
+
+        # События незакрытого бина ждут следующего куска
+        self._pending_steps = np.zeros(0, dtype=np.int64)
+        self._pending_ids = np.zeros(0, dtype=np.int64)
+
+    def update(self, steps, ids, end_step):
+        """
+        Добавить кусок записи.
+
+        Args:
+            steps: Шаги спайков (абсолютные, по возрастанию)
+            ids: Номера нейронов
+            end_step: Шаг, до которого (не включая) запись просмотрена
+        """
+        steps = np.concatenate([self._pending_steps, np.asarray(steps, dtype=np.int64)])
+        ids = np.concatenate([self._pending_ids, np.asarray(ids, dtype=np.int64)])
+
+        # Закрываем только целые бины, остальное — в следующий раз
+        closed_until = (end_step // self.bin_steps) * self.bin_steps
+        split = np.searchsorted(steps, closed_until, side="left")
+
+        self._process(steps[:split], ids[:split], closed_until)
+        self._pending_steps = steps[split:]
+        self._pending_ids = ids[split:]
+        self.n_steps = max(self.n_steps, end_step)
+
+    def result(self):
+        """
+        Итоговая статистика.
+
+        Returns:
+            dict: rates, population_rate, isi_mean_ms, isi_cv,
+                  synchrony, fano_factor, ccg, ccg_lags_ms, duration_ms
+        """
+        # Закрываем последний (возможно неполный) бин
+        if len(self._pending_steps) or self.next_bin * self.bin_steps < self.n_steps:
+            self._process(self._pending_steps, self._pending_ids, self.n_steps)
+            self._pending_steps = self._pending_steps[:0]
+            self._pending_ids = self._pending_ids[:0]
+
+        duration_ms = self.n_steps * self.dt_ms
+        duration_s = duration_ms / 1000.0
+
+        # Частоты (Гц)
+        rates = self.counts / duration_s if duration_s > 0 else np.zeros(self.n)
+
+        pop_counts = np.concatenate(self.pop_counts) if self.pop_counts else np.zeros(0)
+        n_bins = len(pop_counts)
+        widths = np.full(n_bins, self.bin_steps * self.dt_ms / 1000.0)
+        if n_bins:
+            last_width = self.n_steps - (n_bins - 1) * self.bin_steps
+            widths[-1] = last_width * self.dt_ms / 1000.0
+        population_rate = pop_counts / (max(self.n, 1) * widths) if n_bins else pop_counts
+
+        # ISI (мс) и CV
+        with np.errstate(divide="ignore", invalid="ignore"):
+            isi_mean = self.isi_sum / self.isi_n
+            isi_var = np.maximum(self.isi_sq / self.isi_n - isi_mean ** 2, 0.0)
+            isi_cv = np.sqrt(isi_var) / isi_mean
+        isi_mean = np.where(self.isi_n > 0, isi_mean * self.dt_ms, np.nan)
+        isi_cv = np.where(self.isi_n > 1, isi_cv, np.nan)
+
+        # Синхронность (Голомб): дисперсия среднего / средняя дисперсия
+        synchrony = 0.0
+        fano = 0.0
+        if n_bins > 0 and self.n > 0:
+            mean_i = self.counts / n_bins
+            var_i = self.bin_sq / n_bins - mean_i ** 2
+            var_pop = np.var(pop_counts / self.n)
+            if np.mean(var_i) > 0:
+                synchrony = float(np.sqrt(var_pop / np.mean(var_i)))
+            if np.mean(pop_counts) > 0:
+                fano = float(np.var(pop_counts) / np.mean(pop_counts))
+
+        lags_ms = np.arange(-self.max_lag, self.max_lag + 1) * self.dt_ms
+
+        return {
+            "duration_ms": duration_ms,
+            "rates": rates,
+            "population_rate": population_rate,
+            "isi_mean_ms": isi_mean,
+            "isi_cv": isi_cv,
+            "synchrony": synchrony,
+            "fano_factor": fano,
+            "ccg": {pair: self.ccg[k] for k, pair in enumerate(self.pairs)},
+            "ccg_lags_ms": lags_ms,
+        }
+
+    def _process(self, steps, ids, until_step):
+        """Учесть события, все бины до until_step закрыты"""
+        until_bin = -(-until_step // self.bin_steps)  # Округление вверх
+        n_new_bins = until_bin - self.next_bin
+
+        # Частоты
+        self.counts += np.bincount(ids, minlength=self.n)
+
+        # Популяция по бинам и Σ квадратов счётов нейрона в бине
+        if n_new_bins > 0:
+            bins = steps // self.bin_steps - self.next_bin
+            self.pop_counts.append(np.bincount(bins, minlength=n_new_bins)[:n_new_bins])
+
+            keys, per_bin = np.unique(ids * n_new_bins + bins, return_counts=True)
+            self.bin_sq += np.bincount(
+                keys // n_new_bins, weights=per_bin.astype(float) ** 2, minlength=self.n
+            )
+            self.next_bin = until_bin
+
+        self._update_isi(steps, ids)
+        self._update_ccg(steps, ids, until_step)
+
+    def _update_isi(self, steps, ids):
+        """Межспайковые интервалы с учётом предыдущих кусков"""
+        if len(steps) == 0:
+            return
+
+        order = np.lexsort((steps, ids))
+        s = steps[order]
+        i = ids[order]
+
+        first = np.r_[True, i[1:] != i[:-1]]
+        last = np.r_[i[1:] != i[:-1], True]
+
+        # Интервалы внутри куска
+        inner = ~first[1:]
+        isi = np.diff(s)[inner]
+        owner = i[1:][inner]
+
+        # Интервал от последнего спайка прошлого куска
+        first_ids = i[first]
+        prev = self.last_spike[first_ids]
+        has_prev = prev >= 0
+        isi = np.concatenate([isi, s[first][has_prev] - prev[has_prev]])
+        owner = np.concatenate([owner, first_ids[has_prev]])
+
+        isi = isi.astype(float)
+        self.isi_n += np.bincount(owner, minlength=self.n)
+        self.isi_sum += np.bincount(owner, weights=isi, minlength=self.n)
+        self.isi_sq += np.bincount(owner, weights=isi ** 2, minlength=self.n)
+
+        self.last_spike[i[last]] = s[last]
+
+    def _update_ccg(self, steps, ids, until_step):
+        """Коррелограммы: новые пары (новый × всё) + (хвост × новый)"""
+        if not self.pairs:
+            return
+
+        neurons = {n for pair in self.pairs for n in pair}
+        new = {n: steps[ids == n] for n in neurons}
+        tail = {n: self._tail.get(n, np.zeros(0, dtype=np.int64)) for n in neurons}
+
+        for k, (a, b) in enumerate(self.pairs):
+            all_b = np.concatenate([tail[b], new[b]])
+            self.ccg[k] += self._lag_histogram(new[a], all_b)
+            self.ccg[k] += self._lag_histogram(tail[a], new[b])
+
+        # Хвост — только то, что ещё может попасть в окно
+        horizon = until_step - self.max_lag
+        for n in neurons:
+            merged = np.concatenate([tail[n], new[n]])
+            self._tail[n] = merged[merged >= horizon]
+
+    def _lag_histogram(self, a_steps, b_steps):
+        """Гистограмма сдвигов (b - a) в пределах ±max_lag"""
+        L = self.max_lag
+        hist = np.zeros(2 * L + 1, dtype=np.int64)
+        if len(a_steps) == 0 or len(b_steps) == 0:
+            return hist
+
+        lo = np.searchsorted(b_steps, a_steps - L, side="left")
+        hi = np.searchsorted(b_steps, a_steps + L, side="right")
+        c = hi - lo
+        total = int(c.sum())
+        if total == 0:
+            return hist
+
+        a_idx = np.repeat(np.arange(len(a_steps)), c)
+        b_idx = np.repeat(lo, c) + np.arange(total) - np.repeat(np.cumsum(c) - c, c)
+        lags = b_steps[b_idx] - a_steps[a_idx] + L
+
+        return np.bincount(lags, minlength=2 * L + 1)
+
+
+def analyze_raster(raster, dt_ms=None, bin_ms=10.0, pairs=(), max_lag_ms=50.0,
+                   max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Статистика по растру (в том числе memmap — читается кусками).
+
+    Args:
+        raster: bool массив (n_steps, n_neurons)
+        dt_ms: Длительность шага (мс). По умолчанию DT.
+        bin_ms: Ширина бина (мс)
+        pairs: Пары нейронов для коррелограмм
+        max_lag_ms: Максимальный сдвиг коррелограммы (мс)
+        max_bytes: Сколько байт растра читать за раз
+
+    Returns:
+        dict: См. SpikeTrainStats.result()
+    """
+    n_steps, n_neurons = raster.shape
+    stats = SpikeTrainStats(n_neurons, dt_ms, bin_ms, pairs, max_lag_ms)
+
+    row_bytes = max(1, n_neurons * raster.itemsize)
+    chunk_steps = max(1, max_bytes // row_bytes)
+
+    for start in range(0, n_steps, chunk_steps):
+        chunk = np.asarray(raster[start:start + chunk_steps], dtype=bool)
+        steps, ids = np.nonzero(chunk)
+        stats.update(steps + start, ids, start + len(chunk))
+
+    return stats.result()
+
+
+def analyze_file(path, n_neurons=None, n_steps=None, dt_ms=None, bin_ms=10.0,
+                 pairs=(), max_lag_ms=50.0, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Статистика по записи на диске (.npy растр или файл событий).
+
+    Файл открывается через memmap и читается кусками,
+    поэтому размер записи может быть больше памяти.
+
+    Args:
+        path: Путь к .npy файлу
+        n_neurons: Количество нейронов (для событий; иначе — max id + 1)
+        n_steps: Длина записи в шагах (для событий; иначе — последний шаг + 1)
+        остальные: см. analyze_raster
+
+    Returns:
+        dict: См. SpikeTrainStats.result()
+    """
+    data = np.load(path, mmap_mode="r")
+
+    if data.dtype == bool:
+        return analyze_raster(data, dt_ms, bin_ms, pairs, max_lag_ms, max_bytes)
+
+    if data.ndim != 2 or data.shape[1] != 2:
+        raise ValueError("Файл событий должен иметь форму (n_events, 2): [шаг, нейрон]")
+
+    chunk_events = max(1, max_bytes // (2 * data.itemsize))
+    n_events = data.shape[0]
+
+    if n_neurons is None:
+        n_neurons = 0
+        for start in range(0, n_events, chunk_events):
+            ids = data[start:start + chunk_events, 1]
+            if len(ids):
+                n_neurons = max(n_neurons, int(ids.max()) + 1)
+    if n_steps is None:
+        n_steps = int(data[-1, 0]) + 1 if n_events else 0
+
+    stats = SpikeTrainStats(n_neurons, dt_ms, bin_ms, pairs, max_lag_ms)
+
+    for start in range(0, n_events, chunk_events):
+        chunk = np.asarray(data[start:start + chunk_events], dtype=np.int64)
+        # Кусок закрывает время до своего последнего шага (он может продолжиться)
+        stats.update(chunk[:, 0], chunk[:, 1], int(chunk[-1, 0]))
+
+    stats.update(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), n_steps)
+
+    return stats.result()
@@ -137,12 +137,14 @@ class TextEncoder:
     Простой вариант: каждое слово → хэш → паттерн активации.
     """
     
-    def __init__(self, n_neurons=100):
+    def __init__(self, n_neurons=100, sparsity=0.1):
         """
         Args:
             n_neurons: Размер паттерна (количество нейронов)
+            sparsity: Доля активных нейронов в паттерне слова
         """
         self.n = n_neurons
+        self.n_active = max(1, int(n_neurons * sparsity))
     
     def encode_word(self, word):
         """
@@ -155,7 +157,7 @@ class TextEncoder:
             word: Строка
         
         Returns:
-            numpy array: Бинарный паттерн (0/1), ~10% единиц
+            numpy array: Бинарный паттерн (0/1), ~sparsity единиц (10%)
         """
         # Используем хэш слова как seed для генератора
         seed = hash(word.lower().strip()) % (2**31)
@@ -163,7 +165,7 @@ class TextEncoder:
         
         # Разреженный паттерн (~10% активных нейронов)
         pattern = np.zeros(self.n, dtype=float)
-        active_indices = rng.choice(self.n, size=max(1, self.n // 10), replace=False)
+        active_indices = rng.choice(self.n, size=self.n_active, replace=False)
         pattern[active_indices] = 1.0
         
         return pattern
@@ -82,31 +82,184 @@ class STDPRule:
             return -self.a_minus * np.exp(dt / self.tau_minus)
         else:
             return 0.0
+    
+    def compute_dw_array(self, dts):
+        """
+        Векторная версия compute_dw — сразу для массива разниц.
+        
+        Args:
+            dts: Массив (t_post - t_pre) в мс
+        
+        Returns:
+            numpy array: Изменения весов той же формы
+        """
+        dts = np.asarray(dts, dtype=float)
+        dw = np.zeros_like(dts)
+        
+        ltp = dts > 0
+        ltd = dts < 0
+        dw[ltp] = self.a_plus * np.exp(-dts[ltp] / self.tau_plus)
+        dw[ltd] = -self.a_minus * np.exp(dts[ltd] / self.tau_minus)
+        
+        return dw
+
+
+class OfflineSTDP:
+    """
+    Офлайн STDP: обучение по записанным спайковым растрам.
+    
+    Вместо пошагового прогона через следы берёт все спайки сразу,
+    упорядочивает их по времени и для каждой пары pre/post
+    в пределах окна считает Δw по правилу STDPRule.
+    Поиск пар — бинарный (searchsorted), суммирование — bincount.
+    """
+    
+    def __init__(self, rule=None, window_ms=None, max_pairs=1_000_000):
+        """
+        Args:
+            rule: STDPRule (по умолчанию — стандартное)
+            window_ms: Окно STDP (мс). По умолчанию 5 * tau.
+            max_pairs: Сколько пар обрабатывать за один блок (ограничение памяти)
+        """
+        self.rule = rule if rule is not None else STDPRule()
+        
+        if window_ms is None:
+            window_ms = 5.0 * max(self.rule.tau_plus, self.rule.tau_minus)
+        self.window_ms = window_ms
+        self.max_pairs = max_pairs
+    
+    def compute(self, pre_raster, post_raster, dt_ms=None):
+        """
+        Полное изменение весов по записанным растрам.
+        
+        Args:
+            pre_raster: Спайки pre нейронов, форма (n_steps, n_pre)
+            post_raster: Спайки post нейронов, форма (n_steps, n_post)
+            dt_ms: Длительность шага записи (мс). По умолчанию DT.
+        
+        Returns:
+            numpy array: Матрица Δw формы (n_pre, n_post)
+        """
+        if dt_ms is None:
+            dt_ms = DT
+        
+        pre_raster = np.asarray(pre_raster, dtype=bool)
+        post_raster = np.asarray(post_raster, dtype=bool)
+        if pre_raster.ndim != 2 or post_raster.ndim != 2:
+            raise ValueError("Растры должны быть двумерными: (n_steps, n_neurons)")
+        if pre_raster.shape[0] != post_raster.shape[0]:
+            raise ValueError("У растров pre и post должна быть одинаковая длина")
+        
+        n_pre = pre_raster.shape[1]
+        n_post = post_raster.shape[1]
+        
+        # События (время, нейрон) — nonzero идёт по строкам, т.е. уже по времени
+        pre_steps, pre_ids = np.nonzero(pre_raster)
+        post_steps, post_ids = np.nonzero(post_raster)
+        pre_t = pre_steps * dt_ms
+        post_t = post_steps * dt_ms
+        
+        dw = np.zeros(n_pre * n_post)
+        
+        # LTP: для каждого post спайка — pre спайки в окне ДО него
+        self._accumulate(dw, post_t, post_ids, pre_t, pre_ids, n_post, ltp=True)
+        
+        # LTD: для каждого pre спайка — post спайки в окне ДО него
+        self._accumulate(dw, pre_t, pre_ids, post_t, post_ids, n_post, ltp=False)
+        
+        return dw.reshape(n_pre, n_post)
+    
+    def _accumulate(self, out, ref_t, ref_ids, other_t, other_ids, n_post, ltp):
+        """
+        Добавить в out вклад всех пар (ref, other), где other
+        спайкнул строго раньше ref, но не дальше окна.
+        """
+        if len(ref_t) == 0 or len(other_t) == 0:
+            return
+        
+        lo = np.searchsorted(other_t, ref_t - self.window_ms, side="left")
+        hi = np.searchsorted(other_t, ref_t, side="left")
+        counts = hi - lo
+        cum = np.cumsum(counts)
+        
+        # Блоки опорных спайков, в каждом не больше max_pairs пар
+        start = 0
+        n_ref = len(ref_t)
+        while start < n_ref:
+            base = cum[start - 1] if start > 0 else 0
+            end = int(np.searchsorted(cum, base + self.max_pairs, side="right"))
+            end = max(end, start + 1)
+            
+            c = counts[start:end]
+            total = int(c.sum())
+            if total > 0:
+                ref_idx = np.repeat(np.arange(start, end), c)
+                offsets = np.arange(total) - np.repeat(np.cumsum(c) - c, c)
+                other_idx = np.repeat(lo[start:end], c) + offsets
+                
+                if ltp:
+                    dts = ref_t[ref_idx] - other_t[other_idx]
+                    flat = other_ids[other_idx] * n_post + ref_ids[ref_idx]
+                else:
+                    dts = other_t[other_idx] - ref_t[ref_idx]
+                    flat = ref_ids[ref_idx] * n_post + other_ids[other_idx]
+                
+                out += np.bincount(
+                    flat, weights=self.rule.compute_dw_array(dts), minlength=len(out)
+                )
+            
+            start = end
 
 
 class SynapticNetwork:
     """
     Сеть синапсов с STDP обучением.
     Соединяет два слоя нейронов.
+    
+    Связи хранятся компактно — только существующие синапсы:
+    pre_idx[k] → post_idx[k] с весом w[k].
+    Структурная пластичность (prune) удаляет связи, которые
+    долго остаются слабыми, и сеть со временем становится дешевле.
     """
     
-    def __init__(self, n_pre, n_post, connectivity=1.0, initial_weight=0.5):
+    def __init__(
+        self,
+        n_pre,
+        n_post,
+        connectivity=1.0,
+        initial_weight=0.5,
+        prune_threshold=0.05,
+        prune_patience=3,
+        prune_interval=0,
+        regrow=0,
+    ):
         """
         Args:
             n_pre: Количество пресинаптических нейронов
             n_post: Количество постсинаптических нейронов
             connectivity: Доля связей (1.0 = все со всеми)
-            initial_weight: Начальный вес
+            initial_weight: Начальный вес (и вес новых связей)
+            prune_threshold: Связь слабее этого считается слабой
+            prune_patience: Сколько проверок подряд связь может быть слабой
+            prune_interval: Раз во сколько шагов делать prune (0 = вручную)
+            regrow: Сколько новых связей выращивать при каждом prune
         """
         self.n_pre = n_pre
         self.n_post = n_post
+        self.initial_weight = initial_weight
         
-        # Матрица весов
-        self.weights = np.full((n_pre, n_post), initial_weight)
+        # Существующие связи (какие есть в маске)
+        mask = np.random.random((n_pre, n_post)) < connectivity
+        self.pre_idx, self.post_idx = np.nonzero(mask)
+        self.w = np.full(len(self.pre_idx), initial_weight, dtype=float)
         
-        # Маска связей (какие существуют)
-        self.mask = np.random.random((n_pre, n_post)) < connectivity
-        self.weights *= self.mask
+        # Структурная пластичность
+        self.prune_threshold = prune_threshold
+        self.prune_patience = prune_patience
+        self.prune_interval = prune_interval
+        self.regrow = regrow
+        self.weak_age = np.zeros(len(self.w), dtype=int)  # Сколько проверок подряд связь слабая
+        self.steps = 0
         
         # STDP правило
         self.stdp = STDPRule()
@@ -119,6 +272,47 @@ class SynapticNetwork:
         # Скорость затухания следов
         self.trace_decay_pre = np.exp(-DT / self.stdp.tau_plus)
         self.trace_decay_post = np.exp(-DT / self.stdp.tau_minus)
+        
+        # Следы для пачки параллельных прогонов (step_batch)
+        self.batch_pre_trace = None
+        self.batch_post_trace = None
+    
+    @property
+    def weights(self):
+        """
+        Плотная матрица весов (n_pre, n_post) — копия только для чтения.
+        
+        Запись по элементу (net.weights[i, j] = ...) даёт ошибку:
+        веса меняются присваиванием всей матрицы (net.weights = dense).
+        """
+        dense = np.zeros((self.n_pre, self.n_post))
+        dense[self.pre_idx, self.post_idx] = self.w
+        dense.setflags(write=False)
+        return dense
+    
+    @weights.setter
+    def weights(self, dense):
+        """
+        Записать веса из плотной матрицы (n_pre, n_post).
+        Берутся только существующие связи, веса ограничиваются [0, 1].
+        """
+        dense = np.asarray(dense, dtype=float)
+        if dense.shape != (self.n_pre, self.n_post):
+            raise ValueError(f"Ожидалась матрица {(self.n_pre, self.n_post)}, получена {dense.shape}")
+        self.w = np.clip(dense[self.pre_idx, self.post_idx], 0.0, 1.0)
+    
+    @property
+    def mask(self):
+        """Плотная маска существующих связей — копия только для чтения"""
+        dense = np.zeros((self.n_pre, self.n_post), dtype=bool)
+        dense[self.pre_idx, self.post_idx] = True
+        dense.setflags(write=False)
+        return dense
+    
+    @property
+    def n_connections(self):
+        """Количество существующих связей"""
+        return len(self.w)
     
     def step(self, pre_spikes, post_spikes):
         """
@@ -142,50 +336,218 @@ class SynapticNetwork:
         self.pre_trace += pre_spikes
         self.post_trace += post_spikes
         
-        # 3. STDP обучение
+        # 3. STDP обучение (только по существующим связям)
         # Если post спайкает → усиление связей от недавно активных pre
         if np.any(post_spikes > 0):
-            for j in range(self.n_post):
-                if post_spikes[j]:
-                    # Усиление пропорционально pre_trace
-                    self.weights[:, j] += self.stdp.a_plus * self.pre_trace * self.mask[:, j]
+            post_fired = (post_spikes > 0)[self.post_idx]
+            self.w += self.stdp.a_plus * self.pre_trace[self.pre_idx] * post_fired
         
         # Если pre спайкает → ослабление связей к недавно активным post
         if np.any(pre_spikes > 0):
-            for i in range(self.n_pre):
-                if pre_spikes[i]:
-                    # Ослабление пропорционально post_trace
-                    self.weights[i, :] -= self.stdp.a_minus * self.post_trace * self.mask[i, :]
+            pre_fired = (pre_spikes > 0)[self.pre_idx]
+            self.w -= self.stdp.a_minus * self.post_trace[self.post_idx] * pre_fired
         
         # 4. Ограничение весов
-        self.weights = np.clip(self.weights, 0.0, 1.0)
+        np.clip(self.w, 0.0, 1.0, out=self.w)
         
         # 5. Вычисление входных токов для post нейронов
-        # Ток = сумма (вес * спайк) по всем пресинаптическим
-        currents = pre_spikes @ self.weights
+        currents = self.propagate(pre_spikes)
+        
+        # 6. Периодическая структурная пластичность
+        self.steps += 1
+        if self.prune_interval and self.steps % self.prune_interval == 0:
+            self.prune(regrow=self.regrow)
         
         return currents
     
+    def propagate(self, pre_spikes):
+        """
+        Токи для post нейронов при текущих весах (без обучения).
+        Ток = сумма (вес * спайк) по всем пресинаптическим.
+        
+        Args:
+            pre_spikes: Массив спайков пресинаптических нейронов
+            
+        Returns:
+            numpy array: Входные токи для постсинаптических нейронов
+        """
+        pre_spikes = np.asarray(pre_spikes, dtype=float)
+        return np.bincount(
+            self.post_idx, weights=self.w * pre_spikes[self.pre_idx], minlength=self.n_post
+        )
+    
+    def step_batch(self, pre_spikes, post_spikes):
+        """
+        Шаг сразу для пачки независимых прогонов (например, replay во сне).
+        
+        Веса общие: изменения от всех прогонов складываются,
+        как если бы прогоны шли один за другим.
+        Следы у каждого прогона свои.
+        
+        Args:
+            pre_spikes: Спайки pre нейронов, форма (batch, n_pre)
+            post_spikes: Спайки post нейронов, форма (batch, n_post)
+            
+        Returns:
+            numpy array: Входные токи, форма (batch, n_post)
+        """
+        self.learn_batch(pre_spikes, post_spikes)
+        return self.propagate_batch(pre_spikes)
+    
+    def learn_batch(self, pre_spikes, post_spikes):
+        """
+        STDP для пачки прогонов: следы и веса (без токов).
+        
+        Args:
+            pre_spikes: Спайки pre нейронов, форма (batch, n_pre)
+            post_spikes: Спайки post нейронов, форма (batch, n_post)
+        """
+        pre_spikes = np.asarray(pre_spikes, dtype=float)
+        post_spikes = np.asarray(post_spikes, dtype=float)
+        batch = len(pre_spikes)
+        
+        if self.batch_pre_trace is None or len(self.batch_pre_trace) != batch:
+            self.reset_batch_traces(batch)
+        
+        # 1-2. Следы
+        self.batch_pre_trace *= self.trace_decay_pre
+        self.batch_post_trace *= self.trace_decay_post
+        self.batch_pre_trace += pre_spikes
+        self.batch_post_trace += post_spikes
+        
+        # 3. STDP по существующим связям, суммируем по пачке
+        if np.any(post_spikes > 0):
+            post_fired = (post_spikes > 0)[:, self.post_idx]
+            ltp = (self.batch_pre_trace[:, self.pre_idx] * post_fired).sum(axis=0)
+            self.w += self.stdp.a_plus * ltp
+        
+        if np.any(pre_spikes > 0):
+            pre_fired = (pre_spikes > 0)[:, self.pre_idx]
+            ltd = (self.batch_post_trace[:, self.post_idx] * pre_fired).sum(axis=0)
+            self.w -= self.stdp.a_minus * ltd
+        
+        # 4. Ограничение весов
+        np.clip(self.w, 0.0, 1.0, out=self.w)
+        
+        # 5. Периодическая структурная пластичность
+        self.steps += 1
+        if self.prune_interval and self.steps % self.prune_interval == 0:
+            self.prune(regrow=self.regrow)
+    
+    def propagate_batch(self, pre_spikes):
+        """
+        Токи для каждого прогона пачки при текущих весах (без обучения).
+        
+        Args:
+            pre_spikes: Спайки pre нейронов, форма (batch, n_pre)
+            
+        Returns:
+            numpy array: Входные токи, форма (batch, n_post)
+        """
+        pre_spikes = np.asarray(pre_spikes, dtype=float)
+        batch = len(pre_spikes)
+        contrib = pre_spikes[:, self.pre_idx] * self.w
+        flat = (np.arange(batch)[:, None] * self.n_post + self.post_idx).ravel()
+        currents = np.bincount(flat, weights=contrib.ravel(), minlength=batch * self.n_post)
+        return currents.reshape(batch, self.n_post)
+    
+    def reset_batch_traces(self, batch):
+        """Сброс следов пачки (новая пачка прогонов)"""
+        self.batch_pre_trace = np.zeros((batch, self.n_pre))
+        self.batch_post_trace = np.zeros((batch, self.n_post))
+    
+    def prune(self, regrow=0):
+        """
+        Структурная пластичность: удалить связи, которые слабы
+        уже prune_patience проверок подряд, и вырастить новые.
+        
+        Массивы связей уплотняются — шаги после этого дешевле.
+        
+        Args:
+            regrow: Сколько максимум новых случайных связей вырастить
+        
+        Returns:
+            dict: {pruned, grown, connections}
+        """
+        weak = self.w < self.prune_threshold
+        self.weak_age = np.where(weak, self.weak_age + 1, 0)
+        
+        keep = self.weak_age < self.prune_patience
+        pruned = int(len(keep) - np.count_nonzero(keep))
+        if pruned > 0:
+            self.pre_idx = self.pre_idx[keep]
+            self.post_idx = self.post_idx[keep]
+            self.w = self.w[keep]
+            self.weak_age = self.weak_age[keep]
+        
+        grown = self._grow(regrow) if regrow > 0 else 0
+        
+        return {
+            "pruned": pruned,
+            "grown": grown,
+            "connections": self.n_connections,
+        }
+    
+    def _grow(self, n):
+        """Вырастить до n новых связей между ещё не связанными нейронами"""
+        total = self.n_pre * self.n_post
+        n = min(n, total - self.n_connections)
+        if n <= 0:
+            return 0
+        
+        # Случайные кандидаты с запасом, занятые отбрасываем
+        existing = self.pre_idx * self.n_post + self.post_idx
+        candidates = np.unique(np.random.randint(0, total, size=2 * n + 16))
+        candidates = candidates[~np.isin(candidates, existing)]
+        candidates = np.random.permutation(candidates)[:n]
+        
+        self.pre_idx = np.concatenate([self.pre_idx, candidates // self.n_post])
+        self.post_idx = np.concatenate([self.post_idx, candidates % self.n_post])
+        self.w = np.concatenate([self.w, np.full(len(candidates), self.initial_weight)])
+        self.weak_age = np.concatenate([self.weak_age, np.zeros(len(candidates), dtype=int)])
+        
+        return len(candidates)
+    
+    def learn_offline(self, pre_raster, post_raster, dt_ms=None):
+        """
+        Обучить веса по записанным растрам (без пошагового прогона).
+        
+        В отличие от step(), веса ограничиваются один раз в конце,
+        а не после каждого шага.
+        
+        Args:
+            pre_raster: Спайки pre нейронов, форма (n_steps, n_pre)
+            post_raster: Спайки post нейронов, форма (n_steps, n_post)
+            dt_ms: Длительность шага записи (мс). По умолчанию DT.
+        
+        Returns:
+            numpy array: Применённая матрица Δw (до ограничения)
+        """
+        dw = OfflineSTDP(self.stdp).compute(pre_raster, post_raster, dt_ms)
+        dw *= self.mask
+        
+        self.w = np.clip(self.w + dw[self.pre_idx, self.post_idx], 0.0, 1.0)
+        
+        return dw
+    
     def get_mean_weight(self):
         """Средний вес активных связей"""
-        active = self.weights[self.mask]
-        if len(active) == 0:
+        if len(self.w) == 0:
             return 0.0
-        return np.mean(active)
+        return np.mean(self.w)
     
     def get_weight_stats(self):
         """Статистика весов"""
-        active = self.weights[self.mask]
-        if len(active) == 0:
+        if len(self.w) == 0:
             return {"mean": 0, "std": 0, "min": 0, "max": 0}
         return {
-            "mean": float(np.mean(active)),
-            "std": float(np.std(active)),
-            "min": float(np.min(active)),
-            "max": float(np.max(active)),
+            "mean": float(np.mean(self.w)),
+            "std": float(np.std(self.w)),
+            "min": float(np.min(self.w)),
+            "max": float(np.max(self.w)),
         }
     
     def reset_traces(self):
         """Сброс следов (не весов!)"""
         self.pre_trace = np.zeros(self.n_pre)
-        self.post_trace = np.zeros(self.n_post)
\ No newline at end of file
+        self.post_trace = np.zeros(self.n_post)
@@ -17,6 +17,7 @@ from limbic.emotion_core import EmotionCore
 from hippocampus.episodic import EpisodicMemory
 from hippocampus.semantic import SemanticMemory
 from hippocampus.consolidation import Consolidation
+from hippocampus.associative import AssociativeMemory
 
 def test_lif_neuron():
     """Тест одиночного LIF нейрона"""
@@ -204,7 +205,7 @@ def test_izhikevich_population():
     
     print("Izhikevich Population: OK\n")
 
-from neurons.stdp import STDPRule, SynapticNetwork
+from neurons.stdp import STDPRule, SynapticNetwork, OfflineSTDP
 
 
 def test_stdp():
@@ -273,6 +274,153 @@ def test_synaptic_network():
     
     print("Synaptic Network: OK\n")
 
+
+def test_offline_stdp():
+    """Тест офлайн STDP по растрам"""
+    print("Testing Offline STDP...")
+    
+    rng = np.random.RandomState(0)
+    pre = rng.random_sample((400, 6)) < 0.02
+    post = rng.random_sample((400, 4)) < 0.02
+    
+    # Тест 1: Совпадает с перебором всех пар через compute_dw
+    offline = OfflineSTDP(window_ms=10.0)
+    dw = offline.compute(pre, post, dt_ms=1.0)
+    
+    expected = np.zeros((6, 4))
+    for t_pre, i in zip(*np.nonzero(pre)):
+        for t_post, j in zip(*np.nonzero(post)):
+            dt = float(t_post - t_pre)
+            if abs(dt) <= 10.0:
+                expected[i, j] += offline.rule.compute_dw(dt)
+    assert np.allclose(dw, expected), "Офлайн STDP должен совпадать с перебором пар"
+    print(f"  ✓ Совпадает с перебором: |Δw| = {np.abs(dw).sum():.4f}")
+    
+    # Тест 2: Маленькие блоки дают тот же результат
+    chunked = OfflineSTDP(window_ms=10.0, max_pairs=3).compute(pre, post, dt_ms=1.0)
+    assert np.allclose(dw, chunked), "Разбиение на блоки не должно менять результат"
+    print("  ✓ Разбиение на блоки не меняет результат")
+    
+    # Тест 3: Pre до post → усиление в сети
+    net = SynapticNetwork(n_pre=2, n_post=1, initial_weight=0.5)
+    pre_r = np.zeros((100, 2), dtype=bool)
+    post_r = np.zeros((100, 1), dtype=bool)
+    pre_r[10::20, 0] = True
+    post_r[15::20, 0] = True
+    net.learn_offline(pre_r, post_r)
+    assert net.weights[0, 0] > 0.5, "Pre до post → вес должен вырасти"
+    assert net.weights[1, 0] == 0.5, "Молчащий нейрон не должен меняться"
+    print(f"  ✓ learn_offline: вес {net.weights[0, 0]:.4f} (> 0.5)")
+    
+    print("Offline STDP: OK\n")
+
+
+def test_synaptic_pruning():
+    """Тест структурной пластичности"""
+    print("Testing Synaptic Pruning...")
+    
+    net = SynapticNetwork(n_pre=20, n_post=10, initial_weight=0.5, prune_patience=2)
+    assert net.n_connections == 200, "Полная связность → 200 связей"
+    
+    # Тест 1: Слабые связи удаляются только после patience проверок
+    net.w[:50] = 0.0
+    result = net.prune()
+    assert result["pruned"] == 0, "Одна проверка — ещё рано удалять"
+    result = net.prune()
+    assert result["pruned"] == 50, "После двух проверок слабые связи удалены"
+    assert net.n_connections == 150 and len(net.w) == 150, "Хранилище должно уплотниться"
+    assert not net.mask.ravel()[:50].any(), "Удалённых связей нет в маске"
+    print(f"  ✓ Удалено {result['pruned']} слабых связей, осталось {net.n_connections}")
+    
+    # Тест 2: Шаг после prune работает и токи идут только по живым связям
+    pre = np.zeros(20)
+    pre[10] = 1
+    currents = net.step(pre, np.zeros(10))
+    assert np.allclose(currents, net.weights[10]), "Токи должны идти по оставшимся связям"
+    print(f"  ✓ Шаг после prune: токи от нейрона 10 = {currents.sum():.2f}")
+    
+    # Тест 3: Отрастание ограничено и не дублирует связи
+    result = net.prune(regrow=30)
+    assert 0 < result["grown"] <= 30, "Должны вырасти новые связи (не больше 30)"
+    keys = net.pre_idx * net.n_post + net.post_idx
+    assert len(np.unique(keys)) == len(keys), "Связи не должны дублироваться"
+    print(f"  ✓ Выросло {result['grown']} новых связей, всего {net.n_connections}")
+    
+    # Тест 4: Плотные веса — только для чтения, запись — целой матрицей
+    try:
+        net.weights[10, 0] = 0.9
+        assert False, "Запись в копию не должна молча теряться"
+    except ValueError:
+        pass
+    dense = net.weights.copy()
+    dense[net.pre_idx[0], net.post_idx[0]] = 0.9
+    dense[~net.mask] = 0.7  # Несуществующие связи не появляются
+    net.weights = dense
+    assert net.weights[net.pre_idx[0], net.post_idx[0]] == 0.9, "Вес записан"
+    assert not net.weights[~net.mask].any() and len(net.w) == net.n_connections
+    print("  ✓ Веса: чтение — копия только для чтения, запись — присваиванием матрицы")
+    
+    print("Synaptic Pruning: OK\n")
+
+from neurons.analysis import analyze_raster, analyze_file, save_events
+
+
+def test_spike_analysis():
+    """Тест анализа спайковых записей"""
+    print("Testing Spike Analysis...")
+    
+    rng = np.random.RandomState(1)
+    raster = rng.random_sample((3000, 8)) < 0.01
+    raster[::50, :] = True  # Синхронные залпы
+    
+    # Тест 1: Частоты совпадают с прямым подсчётом
+    full = analyze_raster(raster, dt_ms=1.0, bin_ms=10.0, pairs=[(0, 1)], max_lag_ms=20.0)
+    expected_rates = raster.sum(axis=0) / 3.0
+    assert np.allclose(full["rates"], expected_rates), "Частоты должны совпадать"
+    assert np.isclose(full["population_rate"].mean(), expected_rates.mean()), \
+        "Средняя частота популяции = средняя частота нейронов"
+    print(f"  ✓ Частоты: {full['rates'].mean():.1f} Гц в среднем")
+    
+    # Тест 2: ISI и коррелограмма как у прямого расчёта
+    t0 = np.nonzero(raster[:, 0])[0]
+    isi = np.diff(t0)
+    assert np.isclose(full["isi_mean_ms"][0], isi.mean()), "Средний ISI должен совпадать"
+    assert np.isclose(full["isi_cv"][0], isi.std() / isi.mean()), "CV должен совпадать"
+    t1 = np.nonzero(raster[:, 1])[0]
+    lags = (t1[None, :] - t0[:, None]).ravel()
+    lags = lags[np.abs(lags) <= 20]
+    assert np.array_equal(full["ccg"][(0, 1)], np.bincount(lags + 20, minlength=41)), \
+        "Коррелограмма должна совпадать"
+    print(f"  ✓ ISI={full['isi_mean_ms'][0]:.1f} мс, CV={full['isi_cv'][0]:.2f}")
+    
+    # Тест 3: Кусками (маленький бюджет памяти) — тот же результат
+    chunked = analyze_raster(raster, dt_ms=1.0, bin_ms=10.0, pairs=[(0, 1)],
+                             max_lag_ms=20.0, max_bytes=37 * 8)
+    for key in ("rates", "population_rate", "isi_mean_ms", "isi_cv"):
+        assert np.allclose(full[key], chunked[key], equal_nan=True), f"{key} должен совпадать"
+    assert np.isclose(full["synchrony"], chunked["synchrony"]), "Синхронность должна совпадать"
+    assert np.array_equal(full["ccg"][(0, 1)], chunked["ccg"][(0, 1)])
+    print(f"  ✓ Кусками то же самое, синхронность χ={full['synchrony']:.2f}")
+    
+    # Тест 4: Синхронные залпы → синхронность выше, чем у независимых
+    indep = analyze_raster(rng.random_sample((3000, 8)) < 0.03, dt_ms=1.0)
+    assert full["synchrony"] > indep["synchrony"], "Залпы должны давать большую синхронность"
+    print(f"  ✓ Независимые нейроны: χ={indep['synchrony']:.2f}")
+    
+    # Тест 5: Файл событий читается кусками
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "events.npy")
+        save_events(path, raster)
+        from_file = analyze_file(path, n_neurons=8, n_steps=3000, dt_ms=1.0,
+                                 pairs=[(0, 1)], max_lag_ms=20.0, max_bytes=160)
+    assert np.allclose(full["population_rate"], from_file["population_rate"])
+    assert np.isclose(full["synchrony"], from_file["synchrony"])
+    assert np.array_equal(full["ccg"][(0, 1)], from_file["ccg"][(0, 1)])
+    print("  ✓ Файл событий даёт тот же результат")
+    
+    print("Spike Analysis: OK\n")
+
 from neurons.homeostasis import HomeostaticRegulator
 
 
@@ -426,6 +574,189 @@ def test_amygdala():
     
     print("Amygdala: OK\n")
 
+def test_amygdala_batch():
+    """Тест пакетной оценки текстов"""
+    print("Testing Amygdala Batch...")
+    
+    amygdala = Amygdala()
+    texts = ["привет, друг!", "ты тупая дура", "абракадабра", "", "Спасибо, это отлично и красиво"] * 200
+    
+    # Тест 1: Состояние не меняется
+    tick = amygdala.word_valence.tick
+    scores = amygdala.score_batch(texts)
+    assert amygdala.valence == 0.0 and len(amygdala.valence_history) == 0, "score_batch без побочных эффектов"
+    assert amygdala.word_valence.tick == tick, "Счётчики словаря не трогаются"
+    print("  ✓ Состояние амигдалы не изменилось")
+    
+    # Тест 2: Совпадает с поштучной оценкой
+    for i, text in enumerate(texts[:5]):
+        single = amygdala.appraise(text) or {"valence": 0.0, "arousal": 0.0}
+        assert abs(scores["valence"][i] - single["valence"]) < 1e-9, f"Валентность '{text}'"
+        assert abs(scores["arousal"][i] - single["arousal"]) < 1e-9, f"Arousal '{text}'"
+    print(f"  ✓ {len(texts)} текстов, совпадает с appraise()")
+    
+    print("Amygdala Batch: OK\n")
+
+def test_lexicon_training():
+    """Тест пакетного обучения словаря"""
+    print("Testing Lexicon Training...")
+    
+    from limbic.training import train_lexicon
+    
+    corpus = [("кирпич на голову", -0.8), ("котик мурчит", 0.9), ("спасибо за котик", None)] * 3000
+    
+    # Тест 1: Результат совпадает с поштучным обучением (в замкнутой форме)
+    amygdala = Amygdala()
+    train_lexicon(amygdala, corpus[:3], workers=1)
+    reference = Amygdala()
+    for text, target in corpus[:2]:
+        reference.learn(text, target, n_iterations=5)
+    assert abs(amygdala.valence_of("кирпич") - reference.valence_of("кирпич")) < 1e-6
+    print(f"  ✓ Как learn(): 'кирпич' = {amygdala.valence_of('кирпич'):+.3f}")
+    
+    # Тест 2: Пул процессов даёт тот же словарь, что и один процесс
+    serial = Amygdala()
+    train_lexicon(serial, corpus, workers=1, shard_size=1000)
+    parallel = Amygdala()
+    stats = train_lexicon(parallel, corpus, workers=2, shard_size=1000)
+    assert serial.word_valence.items() == parallel.word_valence.items(), "Слияние детерминировано"
+    assert parallel.valence_of("котик") > 0.5 and parallel.valence_of("кирпич") < -0.5
+    print(f"  ✓ {stats['samples']} текстов, {stats['shards']} шардов, новых слов: {stats['new_words']}")
+    
+    print("Lexicon Training: OK\n")
+
+def test_morphology():
+    """Тест приведения слов к основам"""
+    print("Testing Morphology...")
+    
+    from limbic.morphology import normalize
+    
+    # Тест 1: Формы одного слова → одна основа, латиница не меняется
+    assert normalize("рад") == normalize("радость") == normalize("радостью") == "рад"
+    assert normalize("хороший") == normalize("хорошо")
+    assert normalize("awesome") == "awesome" and normalize("привет") == "привет"
+    print("  ✓ рад / радость / радостью → 'рад'")
+    
+    # Тест 1б: Разные слова не сливаются в одну основу
+    assert normalize("цены") != normalize("ценю"), "цены ≠ ценю"
+    assert normalize("ради") != normalize("рад"), "ради ≠ рад"
+    assert normalize("другой") != "друг" and normalize("другие") != "друг", "другой ≠ друг"
+    assert normalize("друга") == normalize("другу") == "друг", "Формы слова 'друг' — по-прежнему вместе"
+    neutral = Amygdala()
+    for text in ("цены выросли", "другие люди", "ради этого"):
+        assert neutral.appraise(text)["direct_valence"] == 0, f"'{text}' должно быть нейтральным"
+    print("  ✓ цены / ради / другие — нейтральны")
+    
+    # Тест 2: Незнакомая форма знакомого слова — не нейтральна
+    amygdala = Amygdala()
+    appraisal = amygdala.appraise("С радостью!")
+    assert appraisal["direct_valence"] > 0.5, "'радостью' должна узнаваться"
+    print(f"  ✓ 'С радостью!' → {appraisal['direct_valence']:+.2f}")
+    
+    # Тест 3: Старый словарь по словоформам сливается по основам
+    amygdala.load_lexicon({"котик": 0.8, "котика": 0.6})
+    assert abs(amygdala.valence_of("котиком") - 0.7) < 1e-6, "Формы усредняются"
+    print("  ✓ Старый словарь приведён к основам")
+    
+    print("Morphology: OK\n")
+
+def test_tokenizer():
+    """Тест общего токенизатора"""
+    print("Testing Tokenizer...")
+    
+    from limbic.tokenizer import tokenize, PUNCTUATION
+    
+    # Тест 1: То же, что split + strip, за один проход
+    for text in ["Привет, друг!", "«ну» (да) ... а.б!", "  ", "Ура!!! Я рада… (очень)", "a,b!! — c"]:
+        expected = [w.strip(PUNCTUATION) for w in text.lower().split()]
+        expected = [w for w in expected if w]
+        assert tokenize(text).tokens == expected, f"Токены не совпали для {text!r}"
+    print("  ✓ Совпадает с split + strip")
+    
+    # Тест 2: Разобранное сообщение не разбирается повторно
+    message = tokenize("Привет, друг!")
+    assert tokenize(message) is message
+    print(f"  ✓ {message.tokens}")
+    
+    # Тест 3: appraise не меняет состояние амигдалы
+    amygdala = Amygdala()
+    tick = amygdala.word_valence.tick
+    appraisal = amygdala.appraise(message)
+    assert amygdala.valence == 0.0 and not amygdala.valence_history, "appraise не меняет состояние"
+    assert amygdala.word_valence.tick == tick, "appraise не трогает счётчики словаря"
+    assert appraisal["direct_valence"] > 0, "Прямая оценка позитивного текста > 0"
+    result = amygdala.integrate(appraisal)
+    assert amygdala.word_valence.tick == tick + len(appraisal["words"]) > tick, "Обращения учтены при integrate"
+    assert result == Amygdala().process("Привет, друг!"), "appraise + integrate = process"
+    print(f"  ✓ appraise без побочных эффектов: {appraisal}")
+    
+    print("Tokenizer: OK\n")
+
+def test_lexicon():
+    """Тест ограниченного эмоционального словаря"""
+    print("Testing Lexicon...")
+    
+    from limbic.lexicon import Lexicon
+    
+    lex = Lexicon(capacity=100, innate={"люблю": 0.9, "ужас": -0.8})
+    
+    # Тест 1: Размер не растёт выше capacity
+    for i in range(1000):
+        lex[f"слово{i}"] = 0.1
+    assert len(lex) <= 100, f"Словарь вырос до {len(lex)}"
+    print(f"  ✓ 1000 новых слов, в словаре {len(lex)}")
+    
+    # Тест 2: Врождённые слова не вытесняются
+    assert lex["люблю"] == np.float32(0.9) and "ужас" in lex, "Врождённые слова потеряны"
+    print("  ✓ Врождённые слова на месте")
+    
+    # Тест 3: Частое слово переживает поток редких
+    for _ in range(50):
+        lex.lookup("слово999")
+    for i in range(1000, 1500):
+        lex[f"слово{i}"] = 0.1
+    assert "слово999" in lex, "Частое слово вытеснено"
+    print("  ✓ Частое слово не вытеснено")
+    
+    # Тест 4: Компактный снимок восстанавливается
+    restored = Lexicon(capacity=100)
+    restored.load_state(lex.to_state())
+    assert len(restored) == len(lex), "Снимок должен восстанавливаться"
+    print("  ✓ Снимок восстановлен")
+    
+    print("Lexicon: OK\n")
+
+def test_history():
+    """Тест кольцевой истории со статистикой"""
+    print("Testing History...")
+    
+    from limbic.history import History
+    
+    hist = History(capacity=100, n_buckets=24)
+    values = np.sin(np.arange(10000) / 50.0)
+    for i, v in enumerate(values):
+        hist.append(v, now=i * 3.6)  # 10000 значений за 10 часов
+    
+    # Тест 1: Память ограничена, последние значения на месте
+    assert len(hist) == 100, "Буфер не должен расти"
+    assert np.allclose(hist.recent(), values[-100:]), "Последние значения"
+    assert hist.last() == values[-1]
+    print(f"  ✓ Хранится {len(hist)} последних из {hist.count}")
+    
+    # Тест 2: Статистика за всё время совпадает с точной
+    stats = hist.stats()
+    assert abs(stats["mean"] - values.mean()) < 1e-3, "Среднее"
+    assert abs(stats["var"] - values.var()) < 1e-3, "Дисперсия"
+    print(f"  ✓ mean={stats['mean']}, var={stats['var']}")
+    
+    # Тест 3: Почасовые корзины
+    hourly = hist.hourly(hours=24, now=10000 * 3.6)
+    assert len(hourly) == 10 and hourly[0]["count"] == 1000, "10 часов по 1000 значений"
+    assert abs(hourly[0]["mean"] - values[:1000].mean()) < 1e-3
+    print(f"  ✓ {len(hourly)} часовых корзин")
+    
+    print("History: OK\n")
+
 def test_dopamine():
     """Тест дофаминовой системы"""
     print("Testing Dopamine...")
@@ -465,7 +796,10 @@ def test_emotion_core():
     """Тест эмоционального ядра"""
     print("Testing Emotion Core...")
     
-    core = EmotionCore()
+    import tempfile
+    
+    # Своё состояние — во временном файле (data/emotion_state.json не трогаем)
+    core = EmotionCore(state_file=os.path.join(tempfile.mkdtemp(), "emotion_state.json"))
     
     # Тест 1: Позитивный текст
     result = core.process("привет друг!")
@@ -503,8 +837,157 @@ def test_emotion_core():
     assert core.energy > 0.9, "Отдых должен восстановить энергию"
     print(f"  ✓ Энергия после отдыха: {core.energy:.2f}")
     
+    # Тест 7: Время простоя учитывается лениво и точно
+    core.amygdala.valence = 0.8
+    core.energy = 0.5
+    core.updated_at -= 30 * 60  # Полчаса без общения
+    status = core.get_status()
+    assert abs(status["energy"] - 0.53) < 1e-3, "Энергия за 30 минут: +0.03"
+    assert abs(status["valence"] - round(0.8 * 0.95 ** 30, 3)) < 1e-3, "Валентность затухла как за 30 шагов"
+    print(f"  ✓ 30 минут простоя: энергия {status['energy']}, валентность {status['valence']}")
+    
+    # Тест 7б: Чтения после простоя видят затухание, но состояние не меняют
+    valence, arousal = core.get_affect()
+    assert abs(valence - 0.8 * 0.95 ** 30) < 1e-3, "Валентность для голоса и эпизода — уже затухшая"
+    assert core.amygdala.valence == 0.8 and core.energy == 0.5, "Чтение не пишет состояние"
+    assert core.get_state_key()[1] == "neutral", "Тон — по затухшей валентности"
+    core.rest(minutes=0)
+    assert abs(core.amygdala.valence - valence) < 1e-3, "Изменение применяет тот же простой"
+    print(f"  ✓ После простоя: валентность {valence:.3f} (было 0.8)")
+    
+    # Тест 8: Близкие состояния → побайтно одинаковый контекст
+    core.amygdala.valence = 0.61
+    first = core.get_context_for_llm()
+    core.amygdala.valence = 0.64
+    assert core.get_context_for_llm() is first, "Тот же квантованный ключ → тот же текст из кэша"
+    print(f"  ✓ Ключ состояния: {core.get_state_key()}")
+    
     print("Emotion Core: OK\n")
 
+def test_sessions():
+    """Тест многопользовательского эмоционального ядра"""
+    print("Testing Sessions...")
+    
+    import shutil
+    from limbic.sessions import SessionEngine
+    
+    if os.path.exists("data/sessions"):
+        shutil.rmtree("data/sessions")
+    
+    engine = SessionEngine()
+    now = 1_000_000.0
+    
+    # Тест 1: Тысячи сессий одной пачкой, состояния независимы
+    pairs = [(f"user{i}", "спасибо, ты супер" if i % 2 else "ты тупая дура") for i in range(2000)]
+    result = engine.process_batch(pairs, now=now)
+    assert len(engine) == 2000, "Должно быть 2000 сессий"
+    assert result["valence"][1] > 0 > result["valence"][0], "Сессии не смешиваются"
+    assert engine.get_status("user1", now=now)["trust"] > engine.get_status("user0", now=now)["trust"]
+    print("  ✓ 2000 сессий за один вызов")
+    
+    # Тест 2: Несколько сообщений одной сессии в пачке = по одному
+    # (у каждого движка свой словарь — обучение не смешивается)
+    texts = ["привет друг", "ты молодец", "спасибо"]
+    batch_engine = SessionEngine(state_dir="data/sessions/batch")
+    single_engine = SessionEngine(state_dir="data/sessions/single")
+    batched = batch_engine.process_batch([("a", t) for t in texts], now=now)
+    for t in texts:
+        single = single_engine.process_batch([("a", t)], now=now)
+    assert batched["valence"][-1] == single["valence"][0], "Порядок внутри сессии сохраняется"
+    assert batch_engine.get_status("a", now=now) == single_engine.get_status("a", now=now)
+    print("  ✓ Повторы сессии в пачке обрабатываются по порядку")
+    
+    # Тест 3: Каждая сессия сохраняется в свой файл
+    written = engine.flush()
+    assert written == 2000, f"Записано {written}"
+    restored = SessionEngine()
+    assert restored.get_status("user0", now=now)["trust"] == engine.get_status("user0", now=now)["trust"]
+    print(f"  ✓ Записано {written} сессий, состояние восстанавливается")
+    
+    # Тест 4: Сессия "_lexicon" не затирает общий словарь
+    lexicon_path = restored._lexicon_path()
+    words = len(engine.amygdala.word_valence)
+    engine.process_batch([("_lexicon", "спасибо, ты супер")], now=now)
+    engine.flush()
+    assert engine._session_path("_lexicon") != lexicon_path, "Служебные имена хэшируются"
+    assert len(SessionEngine().amygdala.word_valence) >= words, "Словарь на месте"
+    print("  ✓ Служебные файлы отделены от сессий")
+    
+    # Тест 5: Запись при выходе не держит движок живым
+    import gc
+    import weakref
+    alive = weakref.ref(engine)
+    del engine
+    gc.collect()
+    assert alive() is None, "Движок освобождается"
+    print("  ✓ Движок не удерживается после удаления")
+    
+    print("Sessions: OK\n")
+
+def test_emotion_persistence():
+    """Тест отложенной атомарной записи состояния"""
+    print("Testing Emotion Persistence...")
+    
+    import gc
+    import json
+    import tempfile
+    import time
+    import weakref
+    
+    state_file = os.path.join(tempfile.mkdtemp(), "emotion_state.json")
+    core = EmotionCore(state_file=state_file)
+    core._persister.interval = 60.0
+    
+    # Тест 1: Обработка сообщения не пишет на диск
+    core.process("привет друг")
+    assert not os.path.exists(state_file), "Запись должна быть отложенной"
+    assert core._persister.dirty, "Состояние должно быть помечено грязным"
+    print("  ✓ process() не трогает диск")
+    
+    # Тест 2: flush пишет атомарно, временных файлов не остаётся
+    core._persister.close()
+    with open(state_file, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["mood"] == core.mood, "На диске должно быть текущее состояние"
+    leftovers = [name for name in os.listdir(os.path.dirname(state_file)) if name.startswith(".tmp-")]
+    assert not leftovers, "Временные файлы должны удаляться"
+    print(f"  ✓ flush записал {os.path.getsize(state_file)} байт")
+    
+    # Тест 3: Без изменений повторный flush ничего не пишет
+    assert not core._persister.flush(), "Чистое состояние не пишется"
+    print("  ✓ Повторный flush без изменений — без записи")
+    
+    # Тест 4: Неудачная запись по таймеру повторяется
+    os.remove(state_file)
+    core._persister.interval = 0.05
+    snapshot = core._persister.snapshot
+    failures = []
+    
+    def flaky():
+        if not failures:
+            failures.append(1)
+            raise OSError("диск занят")
+        return snapshot()
+    
+    core._persister.snapshot = flaky
+    core.process("спасибо")
+    deadline = time.monotonic() + 2.0
+    while not os.path.exists(state_file) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert failures and os.path.exists(state_file), "После сбоя запись повторяется"
+    print("  ✓ Повтор записи после сбоя")
+    
+    # Тест 5: Писатель не держит ядро живым (нет ссылки из atexit)
+    core._persister.close()
+    time.sleep(0.1)  # Поток таймера завершается
+    alive = weakref.ref(core)
+    del core, snapshot, flaky
+    gc.collect()
+    assert alive() is None, "Ядро освобождается"
+    print("  ✓ Ядро не удерживается после удаления")
+    
+    print("Emotion Persistence: OK\n")
+
 def test_episodic_memory():
     """Тест эпизодической памяти"""
     print("Testing Episodic Memory...")
@@ -552,9 +1035,139 @@ def test_episodic_memory():
     assert stats["count"] == 2, "Должно быть 2 эпизода"
     print(f"  ✓ Статистика: {stats}")
     
+    # Тест 5: Индекс следит за вытеснением
+    small = EpisodicMemory(max_episodes=50)
+    for i in range(200):
+        small.store(f"Эпизод номер{i} про котов", [], valence=(i % 10) / 10, arousal=0.1)
+    alive_ids = {ep.id for ep in small.episodes}
+    indexed = set().union(*small._postings.values())
+    assert indexed == alive_ids, "В индексе только живые эпизоды"
+    kept = {ep.summary for ep in small.episodes}
+    evicted = next(i for i in range(200) if f"Эпизод номер{i} про котов" not in kept)
+    assert small.recall(f"номер{evicted}") == [], "Вытесненный эпизод не вспоминается"
+    results = small.recall("котов", top_k=5)
+    cats = [ep for ep in small.episodes if "котов" in ep.summary]
+    best = sorted(cats, key=lambda e: e.strength * e.importance, reverse=True)[0]
+    assert len(results) == 5 and results[0]["summary"] == best.summary, "Top-k по оценке"
+    print(f"  ✓ Индекс: {len(small._postings)} слов, {len(alive_ids)} эпизодов")
+
+    # Тест 6: Забывание всех разом = забывание по одному
+    import math
+    import time
+    past = time.time() - 48 * 3600
+    for i, ep in enumerate(small.episodes):
+        small._cols["timestamp"][ep.row] = past + i * 3600
+    expected = {}
+    for ep in small.episodes:
+        rate = 24 / (ep.importance + 0.1)
+        hours = (time.time() - ep.timestamp) / 3600
+        expected[ep.id] = min(1.0, (ep.importance + ep.recall_count * 0.1) * math.exp(-hours / (rate * 24)))
+    forgotten = small.decay_all()
+    assert forgotten == sum(s <= 0.05 for s in expected.values()), "Забыты слабые"
+    for ep in small.episodes:
+        assert abs(ep.strength - expected[ep.id]) < 1e-6, "Та же кривая забывания"
+    recent = small.get_recent(3)
+    assert [r["id"] for r in recent] == [ep.id for ep in small.episodes[::-1][:3]], "Последние — по времени"
+    print(f"  ✓ Забывание столбцами: забыто {forgotten}, осталось {len(small.episodes)}")
+
     print("Episodic Memory: OK\n")
 
 
+def test_episode_journal():
+    """Тест журнала эпизодической памяти"""
+    print("Testing Episode Journal...")
+    
+    import shutil
+    if os.path.exists("data/memory"):
+        shutil.rmtree("data/memory")
+    
+    mem = EpisodicMemory()
+    for i in range(30):
+        mem.store(f"Разговор {i} про погоду", [{"role": "user", "content": f"дождь {i}"}],
+                  valence=0.8, arousal=0.6)
+    mem.recall("погоду", top_k=3)
+    mem.decay_all()
+    
+    # Тест 1: Каждое изменение — одна строка журнала, снимок не переписывается
+    with open(mem.journal.journal_path, encoding="utf-8") as f:
+        lines = f.readlines()
+    assert len(lines) == 32, f"Ожидалось 32 записи, в журнале {len(lines)}"
+    assert not os.path.exists(EpisodicMemory.SAVE_PATH), "Снимок ещё не нужен"
+    print(f"  ✓ {len(lines)} записей в журнале")
+    
+    def state(m):
+        return sorted((ep.id, ep.summary, round(ep.strength, 3), ep.recall_count) for ep in m.episodes)
+    
+    # Тест 2: Старт = снимок + хвост журнала
+    assert state(EpisodicMemory()) == state(mem), "Состояние восстанавливается из журнала"
+    print("  ✓ Восстановление из журнала")
+    
+    # Тест 3: Свёртка в снимок, дальше снова журнал
+    mem.compact(background=False)
+    mem.recall("дождь", top_k=2)
+    assert os.path.exists(EpisodicMemory.SAVE_PATH), "Снимок записан"
+    assert state(EpisodicMemory()) == state(mem), "Снимок + новый журнал"
+    print("  ✓ Снимок + хвост журнала")
+
+    # Тест 4: Сообщения — на диске, читаются по требованию
+    import json
+    with open(EpisodicMemory.SAVE_PATH, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    assert all("messages" not in d for d in snapshot["data"]["episodes"]), "В снимке только метаданные"
+    fresh = EpisodicMemory()
+    assert len(fresh.segment._cache) == 0, "При старте тела не читаются"
+    assert fresh.episodes[7].messages == [{"role": "user", "content": "дождь 7"}], "Тело читается с диска"
+    assert len(fresh.segment._cache) == 1
+    assert fresh.recall("7")[0]["messages"][0]["content"] == "дождь 7", "Поиск по словам сообщений"
+    print("  ✓ Ленивые тела эпизодов")
+
+    # Тест 5а: Свёртка в снимок тела не читает
+    fresh = EpisodicMemory()
+    assert fresh.compact(background=False), "Снимок записан"
+    assert len(fresh.segment._cache) == 0, "Снимок строится из столбцов"
+    assert state(EpisodicMemory()) == state(fresh)
+    print("  ✓ Свёртка без чтения тел")
+
+    # Тест 5б: Тела удалённых эпизодов убираются из сегмента при старте
+    import hippocampus.episodic as episodic_module
+    shutil.rmtree("data/memory")
+    reclaim = episodic_module.EPISODE_BODY_RECLAIM
+    episodic_module.EPISODE_BODY_RECLAIM = 0
+    try:
+        small = EpisodicMemory(max_episodes=5)
+        for i in range(40):
+            small.store(f"Разговор {i} про море", [{"role": "user", "content": f"волна {i}"}],
+                        valence=0.1 * (i % 7), arousal=0.5)
+        small.journal.close()
+        old_path, old_size = small.segment.path, small.segment.size()
+        reopened = EpisodicMemory(max_episodes=5)
+        assert reopened.segment.path != old_path and not os.path.exists(old_path), "Новое поколение"
+        assert reopened.segment.size() < old_size / 4, "Остались только живые тела"
+        assert state(reopened) == state(small)
+        again = EpisodicMemory(max_episodes=5)
+        assert again.segment.path == reopened.segment.path, "Повторно не переписывается"
+        for ep in again.episodes:
+            assert ep.messages[0]["content"] == ep.summary.replace("Разговор", "волна").replace(" про море", "")
+        print(f"  ✓ Сегмент тел: {old_size} → {reopened.segment.size()} байт")
+    finally:
+        episodic_module.EPISODE_BODY_RECLAIM = reclaim
+
+    # Тест 5: Старый формат (сообщения в снимке) переносится в сегмент
+    shutil.rmtree("data/memory")
+    legacy = [{"timestamp": 0.0, "summary": "Старый разговор", "valence": 0.5, "arousal": 0.5,
+               "importance": 0.5, "strength": 0.9, "recall_count": 0,
+               "messages": [{"role": "user", "content": "снег"}]}]
+    os.makedirs("data/memory")
+    with open(EpisodicMemory.SAVE_PATH, "w", encoding="utf-8") as f:
+        json.dump(legacy, f)
+    old = EpisodicMemory()
+    assert old.recall("снег")[0]["messages"] == legacy[0]["messages"], "Старые сообщения доступны"
+    assert state(EpisodicMemory()) == state(old), "После переноса — новый формат"
+    print("  ✓ Перенос старого формата")
+
+    print("Episode Journal: OK\n")
+
+
 def test_semantic_memory():
     """Тест семантической памяти"""
     print("Testing Semantic Memory...")
@@ -590,10 +1203,175 @@ def test_semantic_memory():
     new_strength = mem.facts["иван любит джаз"]["strength"]
     assert new_strength > old_strength, "Повторный факт должен усилиться"
     print(f"  ✓ Повторение усиливает: {old_strength:.2f} → {new_strength:.2f}")
-    
+
+    # Тест 5: Все факты сообщения — за один проход и одну запись
+    saves = []
+    original_save = mem._save
+    mem._save = lambda: (saves.append(1), original_save())
+    mem.extract_facts("Я живу в Казани, я боюсь пауков! Мой любимый цвет синий. Я живу в Москве")
+    assert len(saves) == 1, f"Одна запись на сообщение, а не {len(saves)}"
+    facts = mem.get_all()
+    for fact in ("Собеседник живёт в Казани", "Собеседник боится пауков",
+                 "Любимый у собеседника — цвет синий"):
+        assert fact in facts, f"Не извлечён: {fact}"
+    assert "Собеседник живёт в Москве" not in facts, "Триггер — по первому вхождению"
+    mem.extract_facts("Просто привет")
+    assert len(saves) == 1, "Нет фактов — нет записи"
+    print("  ✓ Один проход, одна запись")
+
     print("Semantic Memory: OK\n")
 
 
+def test_semantic_sqlite():
+    """Тест семантической памяти на SQLite"""
+    print("Testing SQLite Semantic Memory...")
+    
+    import shutil
+    import json
+    from hippocampus.semantic_sqlite import SQLiteSemanticMemory
+    if os.path.exists("data/memory"):
+        shutil.rmtree("data/memory")
+    
+    # Тест 1: Перенос из facts.json
+    os.makedirs("data/memory")
+    with open(SemanticMemory.SAVE_PATH, "w", encoding="utf-8") as f:
+        json.dump({"иван любит джаз": {"text": "Иван любит джаз", "source": "разговор",
+                                       "strength": 0.9, "importance": 0.8,
+                                       "created": "2024-01-01 10:00", "updated": "2024-01-01 10:00"}}, f)
+    mem = SQLiteSemanticMemory()
+    assert len(mem.facts) == 1 and mem.facts["иван любит джаз"]["strength"] == 0.9, "Факт перенесён"
+    print("  ✓ Перенос из facts.json")
+    
+    # Тест 2: Upsert усиливает, поиск ранжирует по силе
+    mem.store("Иван программист", importance=0.0)
+    mem.store("Мария любит рок", importance=0.0)
+    mem.store("Иван любит джаз")
+    assert mem.facts["иван любит джаз"]["strength"] == 1.0, "Повторный факт усилился"
+    assert mem.recall("джаз музыка") == ["Иван любит джаз"], "Поиск по слову"
+    assert mem.recall("иван")[0] == "Иван любит джаз", "Сильный факт — первым"
+    assert mem.recall("!!!") == [], "Пустой запрос"
+    print(f"  ✓ Поиск FTS5: {mem.recall('любит')}")
+    
+    # Тест 3: Извлечение фактов и статистика
+    mem.extract_facts("Меня зовут Иван и я люблю пиццу")
+    assert mem.get_stats() == {"count": 5, "strong": 3}, mem.get_stats()
+    print(f"  ✓ Статистика: {mem.get_stats()}")
+    
+    # Тест 4: Забывание одним запросом, база переживает перезапуск
+    forgotten = mem.decay_all(cycles=2400)
+    assert forgotten == 2 and len(mem.facts) == 3, "Слабые факты забыты"
+    mem.close()
+    assert SQLiteSemanticMemory().recall("рок") == [], "Забытое не вспоминается"
+    assert len(SQLiteSemanticMemory().facts) == 3, "Факты на диске"
+    print(f"  ✓ Забывание: {forgotten} забыто")
+    
+    # Тест 5: Ошибка в пачке откатывается, соединение остаётся рабочим
+    mem = SQLiteSemanticMemory()
+    for bad in ((["ok", None], {}), (["ok"], {"source": object()})):
+        try:
+            mem.store_many(bad[0], **bad[1])
+            assert False, "Плохая пачка должна падать"
+        except Exception as e:
+            assert not isinstance(e, AssertionError), e
+    assert "ok" not in mem.facts, "Пачка — целиком или никак"
+    mem.store_many(["Иван любит чай"])
+    assert mem.decay_all() == 0 and "иван любит чай" in mem.facts, "После ошибки запись работает"
+    print("  ✓ Откат транзакции при ошибке")
+    
+    print("SQLite Semantic Memory: OK\n")
+
+
+def test_associative_memory():
+    """Тест ассоциативной памяти"""
+    print("Testing Associative Memory...")
+    
+    import time
+    
+    mem = AssociativeMemory(buffer_size=64)
+    rng = np.random.RandomState(2)
+    vocab = [f"слово{i}" for i in range(1500)]
+    texts = {}
+    for i in range(1000):
+        texts[i] = " ".join(rng.choice(vocab, size=8, replace=False))
+        mem.store(i, texts[i])
+    mem.store("джаз", "Иван любит джаз и играет на саксофоне по вечерам")
+    
+    # Тест 1: Частичная подсказка → полное воспоминание
+    results = mem.recall("саксофоне джаз", top_k=3)
+    assert results and results[0][0] == "джаз", f"Должна вспомнить эпизод о джазе: {results}"
+    print(f"  ✓ 'саксофоне джаз' → {results[0]}")
+    
+    # Тест 2: Подсказка из части слов эпизода из индекса (не из буфера)
+    cue = " ".join(texts[7].split()[:3])
+    results = mem.recall(cue, top_k=1)
+    assert results[0][0] == 7, "Должна достроить эпизод 7 по трём словам"
+    assert results[0][1] > 0.9, "После завершения паттерна сходство ~1"
+    print(f"  ✓ Три слова из восьми → эпизод 7 (сходство {results[0][1]})")
+    
+    # Тест 3: Удаление
+    mem.remove("джаз")
+    results = mem.recall("саксофоне джаз", top_k=3)
+    assert all(key != "джаз" for key, _ in results), "Удалённое не вспоминается"
+    print("  ✓ Удалённый элемент не вспоминается")
+    
+    # Тест 4: Незнакомая подсказка → ничего
+    # (отдельная память: среди 1000 случайных текстов возможны совпадения нейронов)
+    small = AssociativeMemory()
+    small.store("джаз", "Иван любит джаз и играет на саксофоне по вечерам")
+    assert small.recall("абракадабра", top_k=3) == [], "Незнакомое → пусто"
+    print("  ✓ Незнакомая подсказка → пусто")
+    
+    # Тест 5: Совпадает с полным перебором (плотная матрица, косинус по всем элементам)
+    live = [key for key in mem.keys if key in mem.key_to_id]
+    dense = np.zeros((len(live), mem.n))
+    for i, key in enumerate(live):
+        dense[i, mem.encode(texts[key])] = 1.0
+    norms = np.sqrt(dense.sum(axis=1))
+    
+    def cosine(x):
+        return dense[:, x].sum(axis=1) / (norms * np.sqrt(len(x)))
+    
+    def brute_recall(cue, top_k):
+        x = mem.encode(cue)
+        scores = cosine(x)
+        for _ in range(mem.n_iterations):
+            top = np.argsort(-scores, kind="stable")[:top_k]
+            winners = top[scores[top] >= mem.min_score]
+            if len(winners) == 0:
+                return []
+            votes = (dense[winners] * scores[winners][:, None]).sum(axis=0)
+            x_new = np.nonzero(votes >= 0.5 * votes.max())[0]
+            if np.array_equal(x_new, x):
+                break
+            x = x_new
+            scores = cosine(x)
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [(live[i], round(float(scores[i]), 3)) for i in top if scores[i] >= mem.min_score]
+    
+    ids = np.array([mem.key_to_id[key] for key in live])
+    cues = [" ".join(texts[i].split()[:3]) for i in range(0, 1000, 37)]
+    cues += [" ".join(rng.choice(vocab, size=2, replace=False)) for _ in range(20)]
+    start = time.perf_counter()
+    for cue in cues:
+        x = mem.encode(cue)
+        assert np.allclose(mem._similarity(x)[ids], cosine(x)), f"Сходство '{cue}'"
+        got, expected = mem.recall(cue, top_k=3), brute_recall(cue, top_k=3)
+        assert got == expected, f"Вспоминание '{cue}': {got} != {expected}"
+    per_query_ms = (time.perf_counter() - start) / len(cues) * 1000
+    print(f"  ✓ {len(mem)} элементов: как полный перебор ({len(cues)} подсказок, {per_query_ms:.2f} мс на проверку)")
+    
+    # Тест 6: После уплотнения (удалено больше четверти) паттерны те же
+    for i in range(300):
+        mem.remove(i)
+    mem._rebuild()
+    assert mem.n_indexed == len(mem) == 700, "Удалённые убраны из индекса"
+    results = mem.recall(" ".join(texts[500].split()[:3]), top_k=1)
+    assert results[0][0] == 500 and results[0][1] > 0.9, "Паттерны сдвинулись вместе с элементами"
+    print("  ✓ Уплотнение индекса")
+    
+    print("Associative Memory: OK\n")
+
+
 def test_consolidation():
     """Тест консолидации (сон)"""
     print("Testing Consolidation...")
@@ -626,9 +1404,286 @@ def test_consolidation():
     for ep in ep_mem.episodes:
         assert ep.strength > 0.5, "После replay сила должна быть высокой"
     print(f"  ✓ Сила эпизодов после replay > 0.5")
-    
+
+    # Тест 2: Циклы в замкнутой форме = циклы по очереди, одна запись на диск
+    assert results["replayed"] == 15 and all(ep.recall_count == 3 for ep in ep_mem.episodes)
+    with open(ep_mem.journal.journal_path, encoding="utf-8") as f:
+        lines_before = len(f.readlines())
+    weak = EpisodicMemory()
+    weak._cols["strength"][:weak._n_rows] = 0.2
+    replayed, _ = weak.consolidate(cycles=4)
+    assert replayed == 15, "Слабые пропускают первый цикл, потом прокручиваются"
+    with open(ep_mem.journal.journal_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == lines_before + 1, "Одна запись на весь сон"
+    print("  ✓ Циклы сна одним проходом")
+
+    # Тест 3: Обобщения — только по темам, которые впервые стали частыми
+    assert results["extracted_facts"] == 4, "разговор, номер, музыке, джазе"
+    assert consolidation.run(cycles=1)["extracted_facts"] == 0, "Старые темы не повторяются"
+    for i in range(3):
+        ep_mem.store(f"Говорили про футбол {i}", [], valence=0.5, arousal=0.4)
+    assert consolidation.run(cycles=1)["extracted_facts"] == 2, "Новые частые темы: говорили, футбол"
+    assert "Часто обсуждаемая тема: футбол" in sem_mem.get_all()
+    assert ep_mem.topic_counts["музыке"] == 5 and ep_mem.topic_counts["футбол"] == 3
+    print(f"  ✓ Новые обобщения: футбол ({len(ep_mem.topic_counts)} тем)")
+
+    # Тест 4: После перезапуска старые обобщения не повторяются
+    restarted = Consolidation(EpisodicMemory(), SemanticMemory())
+    assert "футбол" in restarted.generalized_topics, "Темы — из семантической памяти"
+    assert restarted.run(cycles=1)["extracted_facts"] == 0, "Факты не выпускаются заново"
+    print(f"  ✓ Обобщения после перезапуска: {len(restarted.generalized_topics)} тем")
+
     print("Consolidation: OK\n")
 
+
+def test_sleep_replay():
+    """Тест replay эпизодов через спайковую сеть"""
+    print("Testing Sleep Replay...")
+    
+    import shutil
+    import time
+    if os.path.exists("data/memory"):
+        shutil.rmtree("data/memory")
+    
+    ep_mem = EpisodicMemory()
+    sem_mem = SemanticMemory()
+    for i in range(10):
+        ep_mem.store(
+            summary=f"Эпизод {i}: обсуждали кошек и собак",
+            messages=[{"role": "user", "content": f"Люблю кошек {i}"}],
+            valence=0.9,
+            arousal=0.8
+        )
+    
+    # Тест 1: Эпизоды прогоняются через сеть пачками и меняют веса
+    net = SynapticNetwork(n_pre=100, n_post=20, initial_weight=0.5)
+    before = net.w.copy()
+    consolidation = Consolidation(ep_mem, sem_mem, network=net, replay_batch=4)
+    results = consolidation.run(cycles=1)
+    assert results["network_replayed"] == 10, "Все важные эпизоды должны пройти через сеть"
+    assert not np.allclose(before, net.w), "Сон должен менять веса сети"
+    print(f"  ✓ Прогнано через сеть: {results['network_replayed']}, "
+          f"средний вес {before.mean():.3f} → {net.w.mean():.3f}")
+    
+    # Тест 2: Бюджет времени соблюдается
+    consolidation = Consolidation(ep_mem, sem_mem, network=net, replay_budget_s=0.05,
+                                  replay_batch=2, replay_ms=1000.0)
+    start = time.monotonic()
+    results = consolidation.run(cycles=1)
+    elapsed = time.monotonic() - start
+    assert results["network_replayed"] < 10, "При маленьком бюджете — не всё"
+    assert elapsed < 1.0, "Бюджет времени должен соблюдаться"
+    print(f"  ✓ Бюджет 0.05 с: прогнано {results['network_replayed']} за {elapsed:.2f} с")
+
+    # Тест 3: Сон по шагам — можно прервать и продолжить, забытое пропускается
+    consolidation = Consolidation(ep_mem, sem_mem, network=net, replay_batch=2)
+    sleep = consolidation.steps(cycles=1)
+    first = dict(next(sleep))
+    assert first["network_replayed"] == 2, "Шаг = одна пачка"
+    # Пауза: пока сон ждёт, память меняется
+    victim = ep_mem.episodes[-1]  # Все одинаково важны — он в последней пачке
+    ep_mem._remove(np.array([victim.row]))
+    assert not victim.alive
+    steps = 1
+    for results in sleep:
+        steps += 1
+    assert steps > 3 and results["network_replayed"] == 9, "Забытый эпизод не прокручивается"
+    print(f"  ✓ Сон по шагам: {steps} шагов, прогнано {results['network_replayed']}")
+
+    # Тест 4: Пачка из одного эпизода = пошаговый прогон step(): STDP по pre и post одного шага
+    from config import DT
+    net_batch = SynapticNetwork(n_pre=100, n_post=20, initial_weight=0.5)
+    net_single = SynapticNetwork(n_pre=100, n_post=20, initial_weight=0.5)
+    consolidation = Consolidation(ep_mem, sem_mem, network=net_batch)
+    pattern = consolidation.encoder.encode_text(ep_mem.replay_texts([ep_mem.episodes[0].id])[0])
+    spike_prob = (pattern * consolidation.replay_rate * DT / 1000.0)[None]
+    n_steps = int(consolidation.replay_ms / DT)
+    np.random.seed(7)
+    assert consolidation._simulate(spike_prob, n_steps, time.monotonic() + 60.0)
+    np.random.seed(7)
+    v = np.full(20, -65.0)
+    n_post_spikes = 0
+    for _ in range(n_steps):
+        pre = (np.random.random_sample(spike_prob.shape) < spike_prob)[0]
+        currents = net_single.propagate(pre)
+        v += (-(v + 65.0) + currents * consolidation.replay_gain) / 20.0 * DT
+        post = v >= -50.0
+        v[post] = -65.0
+        net_single.step(pre, post)
+        n_post_spikes += int(post.sum())
+    assert n_post_spikes > 0, "Post нейроны должны спайкать"
+    assert np.allclose(net_batch.w, net_single.w), "Пачка = пошаговый прогон"
+    print(f"  ✓ Пачка из одного эпизода = пошаговый прогон ({n_post_spikes} post спайков)")
+
+    print("Sleep Replay: OK\n")
+
+def test_concurrency():
+    """Тест блокировок для общих подсистем"""
+    print("Testing Concurrency...")
+    
+    import shutil
+    import threading
+    from brain.concurrency import RWLock, Guarded
+    if os.path.exists("data/memory"):
+        shutil.rmtree("data/memory")
+    
+    # Тест 1: Читатели вместе, писатель — один
+    lock = RWLock()
+    inside = threading.Barrier(2, timeout=2.0)
+    
+    def reader():
+        with lock.read():
+            inside.wait()  # Оба читателя внутри одновременно
+    
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for t in readers:
+        t.start()
+    for t in readers:
+        t.join()
+    assert not inside.broken, "Читатели не должны ждать друг друга"
+    
+    events = []
+    
+    def writer():
+        with lock.write():
+            events.append("write")
+    
+    with lock.read():
+        t = threading.Thread(target=writer)
+        t.start()
+        t.join(timeout=0.1)
+        assert events == [], "Писатель ждёт читателя"
+    t.join()
+    assert events == ["write"]
+    with lock.write():
+        with lock.read(), lock.write():
+            pass  # Писатель может читать и писать внутри своей записи
+    print("  ✓ RWLock: читатели параллельно, писатель исключительно")
+    
+    # Тест 2: Память под блокировкой из нескольких потоков
+    episodic = Guarded(EpisodicMemory(max_episodes=100), reads=("get_recent", "get_stats"))
+    errors = []
+    
+    def store(k):
+        try:
+            for i in range(50):
+                episodic.store(f"Поток {k} эпизод {i}", [], valence=0.5, arousal=0.5)
+        except Exception as e:
+            errors.append(e)
+    
+    def read():
+        try:
+            for _ in range(50):
+                stats = episodic.get_stats()
+                assert stats["count"] <= 100
+                episodic.recall("эпизод", top_k=3)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=store, args=(k,)) for k in range(3)]
+    threads += [threading.Thread(target=read) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, errors
+    assert episodic.get_stats()["count"] == 100 and len(episodic.episodes) == 100
+    print(f"  ✓ 3 писателя + 2 читателя: {episodic.get_stats()['count']} эпизодов, без ошибок")
+    
+    # Тест 3: Фоновая запись эмоций берёт ту же блокировку
+    import tempfile
+    emotion = Guarded(
+        EmotionCore(state_file=os.path.join(tempfile.mkdtemp(), "emotion_state.json")),
+        reads=("get_affect", "get_context_for_llm", "get_state_key", "get_status"),
+    )
+    assert emotion.state_lock is emotion.rwlock
+    emotion.process("привет")
+    emotion.flush()  # Запись под записью — без взаимоблокировки
+    print("  ✓ EmotionCore: снимок под блокировкой")
+    
+    # Тест 3б: Чтения состояния эмоций не ждут других читателей
+    got = []
+    
+    def read_emotion():
+        got.append((emotion.get_affect(), emotion.get_context_for_llm(),
+                    emotion.get_state_key(), emotion.get_status()))
+    
+    with emotion.rwlock.read():
+        t = threading.Thread(target=read_emotion, daemon=True)
+        t.start()
+        t.join(timeout=2.0)
+        assert not t.is_alive() and len(got) == 1, "Геттеры эмоций — под общей блокировкой"
+    print("  ✓ EmotionCore: геттеры читают параллельно")
+    
+    # Тест 4: flush через блокировку и flush по таймеру одновременно
+    import time
+    core = emotion._obj
+    core._persister.interval = 60.0
+    emotion.process("как дела")
+    
+    def proxied_flush():
+        with emotion.rwlock.write():
+            time.sleep(0.05)  # Таймер успевает начать запись
+            emotion.flush()
+    
+    def timer_flush():
+        time.sleep(0.01)
+        core._persister._on_timer()
+    
+    threads = [threading.Thread(target=proxied_flush, daemon=True),
+               threading.Thread(target=timer_flush, daemon=True)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=2.0)
+    assert not any(t.is_alive() for t in threads), "flush из двух потоков не должен зависать"
+    assert not core._persister.dirty, "Состояние записано"
+    print("  ✓ Таймер + flush под блокировкой: без взаимоблокировки")
+    
+    # Тест 5: Сон с replay через сеть, пока другой поток пишет и вытесняет эпизоды
+    from neurons.stdp import SynapticNetwork
+    shutil.rmtree("data/memory")
+    reads = ("get_recent", "get_stats", "get_topic_counts", "replay_candidates", "replay_texts")
+    episodic = Guarded(EpisodicMemory(max_episodes=20), reads=reads)
+    semantic = Guarded(SemanticMemory(), reads=("recall", "get_all", "get_stats"))
+    for i in range(20):
+        episodic.store(f"Сон {i} про море", [{"role": "user", "content": f"волна {i}"}],
+                       valence=0.9, arousal=0.8)
+    assert episodic.episodes is not episodic._obj.episodes, "Контейнеры — копией"
+    assert episodic.topic_counts is not episodic._obj.topic_counts
+    consolidation = Consolidation(episodic, semantic, network=SynapticNetwork(n_pre=64, n_post=8),
+                                  replay_batch=2, replay_ms=2.0)
+    errors = []
+    stop = threading.Event()
+    
+    def churn():
+        i = 20
+        while not stop.is_set():
+            episodic.store(f"Сон {i} про лес", [], valence=0.9, arousal=0.8)
+            i += 1
+            time.sleep(0.0005)
+    
+    def sleep():
+        try:
+            for _ in range(5):
+                for _ in consolidation.steps(cycles=1):
+                    pass
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=churn, daemon=True), threading.Thread(target=sleep, daemon=True)]
+    for t in threads:
+        t.start()
+    threads[1].join(timeout=30.0)
+    stop.set()
+    threads[0].join(timeout=2.0)
+    assert not errors, errors
+    assert not any(t.is_alive() for t in threads)
+    print("  ✓ Сон читает память только её методами: без гонок с записью")
+    
+    print("Concurrency: OK\n")
+
+
 def main():
     print("=" * 50)
     print("ТЕСТИРОВАНИЕ ЭЛЛИ")
@@ -642,14 +1697,30 @@ def main():
         test_izhikevich_population()
         test_stdp()
         test_synaptic_network()
+        test_offline_stdp()
+        test_synaptic_pruning()
+        test_spike_analysis()
         test_homeostasis()
         test_encoding()
         test_amygdala()
+        test_amygdala_batch()
+        test_lexicon_training()
+        test_morphology()
+        test_tokenizer()
+        test_lexicon()
+        test_history()
         test_dopamine()
         test_emotion_core()
+        test_emotion_persistence()
+        test_sessions()
         test_episodic_memory()
+        test_episode_journal()
         test_semantic_memory()
+        test_semantic_sqlite()
+        test_associative_memory()
         test_consolidation()
+        test_sleep_replay()
+        test_concurrency()
         
         print("=" * 50)
         print("ВСЕ ТЕСТЫ ПРОЙДЕНЫ ✓")